@@ -7,6 +7,9 @@ import mimetypes
 import zipfile
 import io
 
+from dir_cache import invalidate_path
+from ignore_rules import get_ignore_rules, walk_files
+
 class AdvancedFileOperations:
     """Advanced file operations for the IDE."""
     
@@ -22,9 +25,11 @@ class AdvancedFileOperations:
             
             if path.is_file():
                 path.unlink()
+                invalidate_path(path)
                 return True, f"File deleted: {path.name}"
             elif path.is_dir():
                 shutil.rmtree(path)
+                invalidate_path(path)
                 return True, f"Directory deleted: {path.name}"
                 
         except Exception as e:
@@ -42,6 +47,8 @@ class AdvancedFileOperations:
                 return False, f"{new_name} already exists"
                 
             old_path.rename(new_path)
+            invalidate_path(old_path)
+            invalidate_path(new_path)
             return True, f"Renamed to {new_name}"
                 
         except Exception as e:
@@ -64,6 +71,8 @@ class AdvancedFileOperations:
                 return False, f"A file with the same name already exists in the destination"
                 
             shutil.move(str(source), str(dest))
+            invalidate_path(source)
+            invalidate_path(new_path)
             return True, f"Moved {source.name} to {dest.name}/"
                 
         except Exception as e:
@@ -89,6 +98,7 @@ class AdvancedFileOperations:
                 shutil.copy2(str(source), str(dest))
             else:
                 shutil.copytree(str(source), str(dest / source.name))
+            invalidate_path(new_path)
                 
             return True, f"Copied {source.name} to {dest.name}/"
                 
@@ -106,6 +116,7 @@ class AdvancedFileOperations:
             # Create the file
             with open(file_path, 'w') as f:
                 f.write(content)
+            invalidate_path(file_path)
                 
             return True, f"File created: {file_path.name}"
                 
@@ -117,6 +128,7 @@ class AdvancedFileOperations:
         try:
             dir_path = Path(path)
             dir_path.mkdir(parents=True, exist_ok=True)
+            invalidate_path(dir_path)
             return True, f"Directory created: {dir_path.name}"
                 
         except Exception as e:
@@ -132,6 +144,7 @@ class AdvancedFileOperations:
                 
                 extract_path = self.root_path
                 zip_ref.extractall(extract_path)
+                invalidate_path(extract_path)
                 
             return True, f"Imported files from {zip_file.name}"
                 
@@ -139,7 +152,7 @@ class AdvancedFileOperations:
             return False, f"Error importing from zip: {str(e)}"
     
     def export_to_zip(self, directory=None):
-        """Export a directory (or the entire project) to a zip file."""
+        """Export a directory (or the entire project) to a zip file, leaving out ignored files."""
         try:
             if directory is None:
                 directory = self.root_path
@@ -153,13 +166,12 @@ class AdvancedFileOperations:
             zip_buffer = io.BytesIO()
             
             with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, _, files in os.walk(directory):
-                    for file in files:
-                        file_path = Path(root) / file
-                        zipf.write(
-                            file_path, 
-                            Path(root).relative_to(directory) / file
-                        )
+                rules = get_ignore_rules(self.root_path)
+                for file_path in walk_files(directory, rules):
+                    zipf.write(
+                        file_path, 
+                        Path(file_path).relative_to(directory)
+                    )
             
             zip_buffer.seek(0)
             return True, zip_buffer, f"Directory {directory.name} exported successfully"
@@ -12,6 +12,7 @@ import io
 from file_explorer import FileExplorer
 from terminal import Terminal
 from cline_interface import ClineInterface
+from ignore_rules import get_ignore_rules, walk_files
 
 # Configure page
 st.set_page_config(
@@ -89,13 +90,12 @@ with st.sidebar:
     if st.button("Download Project"):
         zip_buffer = io.BytesIO()
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(st.session_state.project_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    zipf.write(
-                        file_path, 
-                        os.path.relpath(file_path, st.session_state.project_path)
-                    )
+            rules = get_ignore_rules(st.session_state.project_path)
+            for file_path in walk_files(st.session_state.project_path, rules):
+                zipf.write(
+                    file_path, 
+                    os.path.relpath(file_path, st.session_state.project_path)
+                )
         
         zip_buffer.seek(0)
         st.download_button(
@@ -111,7 +111,9 @@ col1, col2 = st.columns([1, 3])
 # File explorer in the first column
 with col1:
     st.subheader("File Explorer")
-    selected_file = file_explorer.render()
+    quick_file = file_explorer.render_quick_open()
+    searched_file = file_explorer.render_search()
+    selected_file = file_explorer.render() or searched_file or quick_file
     if selected_file and selected_file != st.session_state.current_file:
         st.session_state.current_file = selected_file
         if selected_file not in st.session_state.open_files:
@@ -119,6 +121,7 @@ with col1:
                 with open(selected_file, 'r') as f:
                     content = f.read()
                 st.session_state.open_files[selected_file] = content
+                cline_interface.note_recent_file(selected_file)
             except Exception as e:
                 st.error(f"Error opening file: {str(e)}")
 
@@ -165,6 +168,7 @@ with col2:
                 try:
                     with open(st.session_state.current_file, 'w') as f:
                         f.write(new_content)
+                    cline_interface.note_file_saved(st.session_state.project_path, st.session_state.current_file)
                     st.success("File saved successfully!")
                 except Exception as e:
                     st.error(f"Error saving file: {str(e)}")
@@ -177,6 +181,9 @@ with col2:
         terminal_output = terminal.render()
         if terminal_output:
             st.session_state.terminal_history.append(terminal_output)
+        terminal.render_jobs()
+        terminal.render_output_viewer()
+        terminal.render_stats()
         
     # Cline Assistant tab
     with tabs[2]:
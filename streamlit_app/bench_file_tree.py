@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark for FileExplorer.get_file_tree
+Builds synthetic project trees and times building the file tree over them
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+from dir_cache import get_directory_cache
+from file_explorer import build_file_tree, iter_file_tree
+
+def make_tree(root, entries, files_per_dir=10, subdirs_per_dir=4):
+    """Create a synthetic tree of about `entries` files and directories under root."""
+    created = 0
+    queue = [root]
+    while queue and created < entries:
+        dir_path = queue.pop(0)
+        for i in range(files_per_dir):
+            if created >= entries:
+                break
+            with open(os.path.join(dir_path, f"file_{i}.py"), "w") as f:
+                f.write("x = 1\n")
+            created += 1
+        for i in range(subdirs_per_dir):
+            if created >= entries:
+                break
+            sub = os.path.join(dir_path, f"dir_{i}")
+            os.mkdir(sub)
+            queue.append(sub)
+            created += 1
+    return created
+
+def count_nodes(tree):
+    total = 0
+    stack = list(tree)
+    while stack:
+        node = stack.pop()
+        total += 1
+        stack.extend(node["children"])
+    return total
+
+def benchmark(entries, repeat):
+    """Time cold and cached builds, a depth-limited build and the first streamed node for one tree size."""
+    root = tempfile.mkdtemp(prefix="bench-tree-")
+    try:
+        created = make_tree(root, entries)
+        
+        cache = get_directory_cache()
+        # Hold every directory so the cached builds are not measuring evictions, and trust
+        # listings of the directories just created, which are otherwise rescanned as racy
+        cache.max_entries = max(cache.max_entries, created)
+        cache.RACY_WINDOW_NS = 0
+        
+        best = float("inf")
+        for _ in range(repeat):
+            cache.clear()
+            started = time.perf_counter()
+            tree = build_file_tree(root)
+            best = min(best, time.perf_counter() - started)
+        assert count_nodes(tree) == created
+        
+        started = time.perf_counter()
+        build_file_tree(root)
+        cached = time.perf_counter() - started
+        
+        cache.clear()
+        started = time.perf_counter()
+        build_file_tree(root, max_depth=2)
+        shallow = time.perf_counter() - started
+        
+        cache.clear()
+        started = time.perf_counter()
+        next(iter_file_tree(root))
+        first = time.perf_counter() - started
+        
+        print(f"{created:>8} entries  full {best * 1000:8.1f} ms  "
+              f"({best / created * 1e6:5.2f} us/entry)  cached {cached * 1000:7.1f} ms  depth<=2 {shallow * 1000:7.1f} ms  "
+              f"first node {first * 1000:6.2f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark building the file explorer tree")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Number of entries in each synthetic tree")
+    parser.add_argument("--repeat", type=int, default=3, help="Builds per size; the best is reported")
+    
+    args = parser.parse_args()
+    
+    print(f"Python {sys.version.split()[0]} on {sys.platform}")
+    for entries in args.sizes:
+        benchmark(entries, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,43 @@
 import streamlit as st
 import os
-import json
 import time
+import hashlib
 import google.generativeai as genai
 import sys
 import re
-from pathlib import Path
+
+from config_loader import get_config, get_data_dir
+from code_retrieval import format_chunks, get_chunk_index
+from command_stats import format_record
+from context_assembler import ContextAssembler
+from dir_cache import invalidate_path
+from ignore_rules import get_ignore_rules
+from file_edits import EditError, apply_hunks, parse_edits
+from fs_tools import (
+    DEFAULT_MAX_BYTES, DEFAULT_PAGE_SIZE, format_directory_listing, format_file_window,
+    atomic_write, list_directory_page, read_file_window
+)
+from job_manager import format_job
+from output_spool import STREAMS
+from conversation_compactor import ConversationCompactor, history_bytes
+from response_cache import TREE_DEPENDENCY, ResponseCache
+from search_index import format_search_results, get_search_index
+from symbol_index import format_references, format_symbols, get_symbol_index
+from tool_parser import IncrementalToolCallParser, parse_tool_calls
+from tool_scheduler import ToolScheduler
+from streaming import StreamingReply, cancel_stream, iter_chunk_text
+
+# Models that reject a system instruction and need it sent as a chat turn instead
+LEGACY_MODELS = {"gemini-pro", "gemini-1.0-pro"}
+
+# Tools that never modify the project; only turns limited to these are cached
+READ_ONLY_TOOLS = {
+    "read_file", "list_directory", "search_files", "find_symbol", "find_references", "read_command_output"
+}
+
+# Read-only tools whose answer depends on more than the one path they are given;
+# command output lives only as long as the app process, as the tree generation does
+TREE_TOOLS = {"list_directory", "search_files", "find_symbol", "find_references", "read_command_output"}
 
 class ClineInterface:
     def __init__(self):
@@ -15,6 +47,31 @@ class ClineInterface:
             st.session_state.chat_history = []
         if 'conversation_history' not in st.session_state:
             st.session_state.conversation_history = []
+        if 'context_assembler' not in st.session_state:
+            st.session_state.context_assembler = ContextAssembler()
+        if 'context_report' not in st.session_state:
+            st.session_state.context_report = None
+        if 'retrieval_report' not in st.session_state:
+            st.session_state.retrieval_report = []
+        if 'recent_files' not in st.session_state:
+            st.session_state.recent_files = []
+        if 'gemini_chat' not in st.session_state:
+            st.session_state.gemini_chat = None
+        if 'context_digest' not in st.session_state:
+            st.session_state.context_digest = None
+        if 'conversation_compactor' not in st.session_state:
+            st.session_state.conversation_compactor = ConversationCompactor(
+                max_bytes=int(get_config("max_history_bytes", 65536)),
+                keep_turns=int(get_config("history_keep_turns", 4)),
+                max_tool_result_bytes=int(get_config("max_tool_result_bytes", 8192))
+            )
+        if 'history_saved_bytes' not in st.session_state:
+            st.session_state.history_saved_bytes = 0
+        if 'response_cache' not in st.session_state:
+            st.session_state.response_cache = ResponseCache(
+                get_data_dir("response_cache"),
+                max_disk_bytes=int(get_config("response_cache_max_bytes", 50 * 1024 * 1024))
+            )
     
     def set_api_key(self, api_key):
         """Set up the client with the provided API key."""
@@ -23,6 +80,8 @@ class ClineInterface:
                 # Configure the Gemini API
                 genai.configure(api_key=api_key)
                 st.session_state.client = genai
+                # A chat bound to the previous key cannot be reused
+                st.session_state.gemini_chat = None
                 # Add a test message to verify configuration
                 print("Google Gemini API configured successfully.")
                 return True
@@ -31,9 +90,24 @@ class ClineInterface:
                 return False
         return False
     
-    def generate_system_prompt(self, project_path):
-        """Generate system prompt with project context."""
-        system_prompt = """You are Cline, an AI programming assistant.
+    def note_recent_file(self, file_path):
+        """Remember a file the user or the assistant just touched, newest first."""
+        recent = st.session_state.recent_files
+        if file_path in recent:
+            recent.remove(file_path)
+        recent.insert(0, file_path)
+        del recent[20:]
+    
+    def note_file_saved(self, project_path, file_path):
+        """Record a file the editor or a tool just wrote and reindex it."""
+        self.note_recent_file(file_path)
+        invalidate_path(file_path)
+        get_search_index(project_path).update_file(file_path)
+        get_symbol_index(project_path).update_file(file_path)
+    
+    def generate_system_prompt(self):
+        """Generate the static instructions sent once per chat session."""
+        return """You are Cline, an AI programming assistant.
 You help users build software projects by understanding their requirements and providing practical code solutions.
 You can assist with code writing, debugging, and explaining concepts.
 
@@ -54,168 +128,436 @@ The user is working in a web-based IDE with:
 - This chat interface to communicate with you
 
 The user can download their complete project when finished.
+
+You can use function calls in this format when needed:
+```function_call
+{
+  "name": "function_name",
+  "args": {
+    "arg1": "value1"
+  }
+}
+```
+Available functions:
+- read_file(path, start_line=None, end_line=None, offset=None, length=None): Read content of a file; large files are truncated, so request line or byte ranges to see more
+- write_file(path, content): Write content to a file; use it for new files or complete rewrites only
+- apply_edit(path, edits): Change part of an existing file. edits holds one or more blocks of the form
+  <<<<<<< SEARCH
+  exact lines currently in the file
+  =======
+  lines to put in their place
+  >>>>>>> REPLACE
+  or a unified diff with @@ hunk headers. Each SEARCH text must match exactly once; if any block conflicts nothing is written and each block's status is reported
+- execute_command(command, timeout=None): Execute a command in the terminal; it is killed after timeout seconds (default 300), so do not start servers or other commands that never exit
+- read_command_output(output_id, page=0, stream="stdout", search=None): Read a page (64 KB) of a command's full output when execute_command shortened it, or list the lines matching search with their page numbers
+- start_job(command): Start a long-running command (dev server, watcher) in the background; returns a job id
+- job_output(job_id, max_bytes=4000): Show a background job's status and the end of its output
+- stop_job(job_id, force=False): Stop a background job and everything it started
+- list_directory(path, depth=1, include=None, exclude=None, cursor=None, limit=500): List a directory as tab-separated type/size/path rows; depth recurses, include/exclude take glob patterns, and a listing that does not fit ends with a cursor to pass back for the next page
+- search_files(query, regex=False, case_sensitive=False, include=None, exclude=None, context_lines=2, max_results=50): Search the contents of all project files; include/exclude take glob patterns and matches come back grep-style with surrounding lines. Prefer this to reading files one by one or running grep
+- find_symbol(name): Find where a Python class, function, method or module variable is defined (name may be qualified, e.g. "Class.method"); returns file, line and signature
+- find_references(name): Find the call sites and imports of a Python name across the project
+
+Project context is sent in a "Current Project Context" block whenever it changes; the most recent one is current.
 """
+    
+    def generate_project_context(self, project_path):
+        """Generate the project context, filled in priority order up to the token budget."""
+        token_budget = int(get_config("context_token_budget", 6000))
+        context, report = st.session_state.context_assembler.assemble(
+            project_path,
+            token_budget,
+            recent_files=st.session_state.recent_files
+        )
+        st.session_state.context_report = report
+        return context
+    
+    def retrieve_relevant_code(self, project_path, user_input):
+        """Return the code chunks that best match a message, within the retrieval byte budget."""
+        max_bytes = int(get_config("retrieval_max_bytes", 12000))
+        if max_bytes <= 0:
+            st.session_state.retrieval_report = []
+            return ""
+        chunks = get_chunk_index(project_path).search(user_input, int(get_config("retrieval_top_k", 6)))
+        text, included = format_chunks(chunks, max_bytes)
+        st.session_state.retrieval_report = [
+            f"{chunk.path}:{chunk.start_line}-{chunk.end_line}" for chunk in included
+        ]
+        return text
+    
+    def handle_tool_calls(self, tool_calls, file_explorer, terminal, project_path, open_files, scheduler=None):
+        """Handle tool calls from the AI.
         
-        # Add project files information
-        files_info = "\n\nCurrent Project Structure:\n"
-        for root, dirs, files in os.walk(project_path):
-            if "__pycache__" in root or ".git" in root:
-                continue
-                
-            rel_path = os.path.relpath(root, project_path)
-            level = len(Path(rel_path).parts)
-            indent = "  " * level
-            
-            if rel_path != ".":
-                files_info += f"{indent}📁 {os.path.basename(root)}/\n"
-            
-            for file in sorted(files):
-                if file.startswith(".") or file.endswith(".pyc"):
-                    continue
-                files_info += f"{indent}  📄 {file}\n"
+        Independent read-only calls run concurrently; writes and commands stay
+        ordered against anything touching the same paths. Results are
+        returned in the original order, each with its own "elapsed" time.
+        Pass the scheduler used while streaming to reuse calls started early.
+        """
+        if not tool_calls:
+            return []
         
-        system_prompt += files_info
-        return system_prompt
+        if scheduler is not None:
+            return scheduler.run(tool_calls)
+        scheduler = self._make_tool_scheduler(terminal, project_path, open_files)
+        try:
+            return scheduler.run(tool_calls)
+        finally:
+            scheduler.close()
     
-    def handle_tool_calls(self, tool_calls, file_explorer, terminal, project_path, open_files):
-        """Handle tool calls from the AI."""
-        results = []
-        if not tool_calls:
-            return results
+    def _make_tool_scheduler(self, terminal, project_path, open_files):
+        """Create a scheduler that runs this session's tool calls."""
+        return ToolScheduler(
+            lambda tool_call: self._run_tool_call(tool_call, terminal, project_path, open_files),
+            lambda tool_call: tool_call.get('name') in READ_ONLY_TOOLS,
+            self._tool_call_paths,
+            max_workers=int(get_config("tool_workers", 4))
+        )
+    
+    def _tool_call_paths(self, tool_call):
+        """Return the project paths a tool call touches, or None if it may touch anything."""
+        if tool_call.get('name') not in READ_ONLY_TOOLS | {"write_file", "apply_edit"}:
+            return None
+        if tool_call.get('name') == "read_command_output":
+            # Reads the output spool, not the project
+            return set()
+        path = tool_call.get('args', {}).get("path", ".")
+        return {os.path.normpath(path)}
+    
+    def _run_tool_call(self, tool_call, terminal, project_path, open_files):
+        """Run a single tool call and return its result.
+        
+        Read-only tools may run on a worker thread and must not touch
+        Streamlit state.
+        """
+        # For Gemini, we'll extract function calls from the response
+        # This is a simplified implementation since Gemini doesn't have native function calling like Claude
+        try:
+            function_name = tool_call.get('name', '')
+            args = tool_call.get('args', {})
             
-        for tool_call in tool_calls:
-            # For Gemini, we'll extract function calls from the response
-            # This is a simplified implementation since Gemini doesn't have native function calling like Claude
-            try:
-                function_name = tool_call.get('name', '')
-                args = tool_call.get('args', {})
-                
-                if function_name == "read_file":
-                    try:
-                        file_path = os.path.join(project_path, args.get("path", ""))
-                        
-                        if os.path.exists(file_path):
-                            with open(file_path, 'r') as f:
-                                content = f.read()
-                            results.append({
-                                "role": "tool",
-                                "name": function_name,
-                                "content": f"Content of {args.get('path')}:\n\n```\n{content}\n```"
-                            })
-                        else:
-                            results.append({
-                                "role": "tool",
-                                "name": function_name,
-                                "content": f"Error: File '{args.get('path')}' not found."
-                            })
-                    except Exception as e:
-                        results.append({
+            if function_name == "read_file":
+                try:
+                    file_path = os.path.join(project_path, args.get("path", ""))
+                    
+                    if os.path.isfile(file_path):
+                        max_bytes = int(get_config("read_file_max_bytes", DEFAULT_MAX_BYTES))
+                        window = read_file_window(
+                            file_path,
+                            start_line=args.get("start_line"),
+                            end_line=args.get("end_line"),
+                            offset=args.get("offset"),
+                            length=args.get("length"),
+                            max_bytes=max_bytes
+                        )
+                        return {
                             "role": "tool",
                             "name": function_name,
-                            "content": f"Error reading file: {str(e)}"
-                        })
-                        
-                elif function_name == "write_file":
-                    try:
-                        file_path = os.path.join(project_path, args.get("path", ""))
-                        content = args.get("content", "")
-                        
-                        # Ensure directory exists
-                        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                        
-                        with open(file_path, 'w') as f:
-                            f.write(content)
-                        
-                        # Update open file if it's currently open
-                        if file_path in open_files:
-                            open_files[file_path] = content
-                        
-                        results.append({
+                            "content": format_file_window(args.get("path"), window, max_bytes)
+                        }
+                    else:
+                        return {
                             "role": "tool",
                             "name": function_name,
-                            "content": f"File '{args.get('path')}' has been created/updated successfully."
-                        })
-                    except Exception as e:
-                        results.append({
+                            "content": f"Error: File '{args.get('path')}' not found."
+                        }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error reading file: {str(e)}"
+                    }
+                    
+            elif function_name == "write_file":
+                try:
+                    file_path = os.path.join(project_path, args.get("path", ""))
+                    content = args.get("content", "")
+                    
+                    # Ensure directory exists
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    
+                    atomic_write(file_path, content)
+                    
+                    # Update open file if it's currently open
+                    if file_path in open_files:
+                        open_files[file_path] = content
+                    self.note_file_saved(project_path, file_path)
+                    
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"File '{args.get('path')}' has been created/updated successfully."
+                    }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error writing file: {str(e)}"
+                    }
+                    
+            elif function_name == "apply_edit":
+                try:
+                    rel_path = args.get("path", "")
+                    file_path = os.path.join(project_path, rel_path)
+                    hunks = parse_edits(args.get("edits", ""))
+                    
+                    if os.path.exists(file_path):
+                        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                            original = f.read()
+                    else:
+                        original = ""
+                    
+                    new_content, report = apply_hunks(original, hunks)
+                    if new_content is None:
+                        return {
                             "role": "tool",
                             "name": function_name,
-                            "content": f"Error writing file: {str(e)}"
-                        })
-                        
-                elif function_name == "execute_command":
-                    try:
+                            "content": f"No changes were written to '{rel_path}':\n" + "\n".join(report)
+                        }
+                    
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    atomic_write(file_path, new_content)
+                    
+                    # Update open file if it's currently open
+                    if file_path in open_files:
+                        open_files[file_path] = new_content
+                    self.note_file_saved(project_path, file_path)
+                    
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Edited '{rel_path}':\n" + "\n".join(report)
+                    }
+                except EditError as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error: {str(e)}"
+                    }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error editing file: {str(e)}"
+                    }
+                    
+            elif function_name == "execute_command":
+                try:
+                    command = args.get("command", "")
+                    timeout = args.get("timeout")
+                    
+                    stdout, stderr, returncode = terminal.execute_command(
+                        command, timeout=float(timeout) if timeout else None
+                    )
+                    
+                    result = f"Command: {command}\n"
+                    if stdout:
+                        result += f"\nStandard Output:\n{stdout}"
+                    if stderr:
+                        result += f"\nStandard Error:\n{stderr}"
+                    result += f"\nReturn Code: {returncode}"
+                    if terminal.last_record is not None:
+                        result += f"\nResources: {format_record(terminal.last_record)}"
+                    spooled = terminal.last_output
+                    if spooled is not None and terminal.last_truncated:
+                        result += (
+                            f"\nOutput was shortened. The full output is saved as output {spooled.id}; "
+                            f"use read_command_output({spooled.id}, page=..., search=...) to read it."
+                        )
+                    
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": result
+                    }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error executing command: {str(e)}"
+                    }
+                    
+            elif function_name == "read_command_output":
+                try:
+                    spooled = terminal.spool.get(args.get("output_id"))
+                    stream = args.get("stream", "stdout")
+                    if spooled is None:
+                        available = ", ".join(f"{o.id} ({o.command[:40]})" for o in terminal.spool.recent()[:10])
+                        content = f"Error: no output '{args.get('output_id')}'. Recent outputs: {available or '(none)'}"
+                    elif stream not in STREAMS:
+                        content = f"Error: stream must be one of {', '.join(STREAMS)}."
+                    elif args.get("search"):
+                        hits = spooled.search(stream, str(args["search"]))
+                        lines = [f"page {page}: {line}" for page, line in hits]
+                        content = (
+                            f"Output {spooled.id} ({spooled.command}), {stream}: "
+                            f"{len(hits)} matching lines{' (first 50)' if len(hits) >= 50 else ''}\n" + "\n".join(lines)
+                        )
+                    else:
+                        pages = spooled.page_count(stream)
+                        page = min(max(int(args.get("page", 0)), 0), pages - 1)
+                        content = (
+                            f"Output {spooled.id} ({spooled.command}), {stream} page {page} of 0-{pages - 1}:\n"
+                            f"{spooled.page(stream, page)}"
+                        )
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": content
+                    }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error reading command output: {str(e)}"
+                    }
+                    
+            elif function_name in ("start_job", "job_output", "stop_job"):
+                try:
+                    jobs = terminal.jobs
+                    if function_name == "start_job":
                         command = args.get("command", "")
-                        
-                        stdout, stderr, returncode = terminal.execute_command(command)
-                        
-                        result = f"Command: {command}\n"
-                        if stdout:
-                            result += f"\nStandard Output:\n{stdout}"
-                        if stderr:
-                            result += f"\nStandard Error:\n{stderr}"
-                        result += f"\nReturn Code: {returncode}"
-                        
-                        results.append({
+                        if not command:
+                            content = "Error: start_job needs a command."
+                        else:
+                            job = jobs.start(command, terminal.shell.cwd if terminal.shell is not None else project_path)
+                            content = (
+                                f"Started job {job.id} (pid {job.process.pid}): {command}\n"
+                                f"Use job_output({job.id}) to see its output and stop_job({job.id}) to stop it."
+                            )
+                    else:
+                        job = jobs.get(args.get("job_id"))
+                        if job is None:
+                            listing = "\n".join(format_job(j) for j in jobs.jobs()) or "(none)"
+                            content = f"Error: no job '{args.get('job_id')}'. Current jobs:\n{listing}"
+                        elif function_name == "job_output":
+                            tail = jobs.tail(job.id, min(int(args.get("max_bytes", 4000)), 65536))
+                            content = f"{format_job(job)}\n\nLast output:\n{tail or '(no output yet)'}"
+                        else:
+                            jobs.stop(job.id, force=bool(args.get("force", False)))
+                            content = format_job(job)
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": content
+                    }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error managing job: {str(e)}"
+                    }
+                    
+            elif function_name == "list_directory":
+                try:
+                    dir_path = args.get("path", ".")
+                    full_path = os.path.join(project_path, dir_path)
+                    
+                    if os.path.exists(full_path) and os.path.isdir(full_path):
+                        rows, next_cursor = list_directory_page(
+                            full_path,
+                            depth=max(1, int(args.get("depth", 1))),
+                            include=args.get("include"),
+                            exclude=args.get("exclude"),
+                            cursor=args.get("cursor"),
+                            limit=args.get("limit", DEFAULT_PAGE_SIZE),
+                            rules=get_ignore_rules(project_path)
+                        )
+                        return {
                             "role": "tool",
                             "name": function_name,
-                            "content": result
-                        })
-                    except Exception as e:
-                        results.append({
+                            "content": format_directory_listing(dir_path, rows, next_cursor)
+                        }
+                    else:
+                        return {
                             "role": "tool",
                             "name": function_name,
-                            "content": f"Error executing command: {str(e)}"
-                        })
-                        
-                elif function_name == "list_directory":
-                    try:
-                        dir_path = args.get("path", ".")
-                        full_path = os.path.join(project_path, dir_path)
-                        
-                        if os.path.exists(full_path) and os.path.isdir(full_path):
-                            files = os.listdir(full_path)
-                            file_info = []
-                            
-                            for file in sorted(files):
-                                file_path = os.path.join(full_path, file)
-                                is_dir = os.path.isdir(file_path)
-                                file_type = "directory" if is_dir else "file"
-                                
-                                file_info.append({
-                                    "name": file,
-                                    "type": file_type,
-                                    "size": os.path.getsize(file_path) if not is_dir else None
-                                })
-                            
-                            results.append({
-                                "role": "tool",
-                                "name": function_name,
-                                "content": json.dumps(file_info, indent=2)
-                            })
-                        else:
-                            results.append({
-                                "role": "tool",
-                                "name": function_name,
-                                "content": f"Error: Directory '{dir_path}' not found."
-                            })
-                    except Exception as e:
-                        results.append({
+                            "content": f"Error: Directory '{dir_path}' not found."
+                        }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error listing directory: {str(e)}"
+                    }
+            
+            elif function_name == "search_files":
+                try:
+                    query = args.get("query", "")
+                    if not query:
+                        return {
                             "role": "tool",
                             "name": function_name,
-                            "content": f"Error listing directory: {str(e)}"
-                        })
-            except Exception as e:
-                results.append({
-                    "role": "tool",
-                    "name": "error",
-                    "content": f"Error processing tool call: {str(e)}"
-                })
-                    
-        return results
+                            "content": "Error: search_files needs a non-empty query."
+                        }
+                    max_results = min(int(args.get("max_results", 50)), 500)
+                    matches, candidate_count = get_search_index(project_path).search(
+                        query,
+                        regex=bool(args.get("regex", False)),
+                        case_sensitive=bool(args.get("case_sensitive", False)),
+                        include=args.get("include"),
+                        exclude=args.get("exclude"),
+                        context_lines=min(int(args.get("context_lines", 2)), 10),
+                        max_results=max_results
+                    )
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": format_search_results(query, matches, candidate_count, max_results)
+                    }
+                except re.error as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error: invalid regular expression: {str(e)}"
+                    }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error searching files: {str(e)}"
+                    }
+            
+            elif function_name in ("find_symbol", "find_references"):
+                try:
+                    name = args.get("name", "").strip()
+                    if not name:
+                        return {
+                            "role": "tool",
+                            "name": function_name,
+                            "content": f"Error: {function_name} needs a name."
+                        }
+                    index = get_symbol_index(project_path)
+                    if function_name == "find_symbol":
+                        content = format_symbols(name, index.find_symbol(name))
+                    else:
+                        content = format_references(project_path, name, index.find_references(name))
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": content
+                    }
+                except Exception as e:
+                    return {
+                        "role": "tool",
+                        "name": function_name,
+                        "content": f"Error looking up symbols: {str(e)}"
+                    }
+            
+            return {
+                "role": "tool",
+                "name": function_name,
+                "content": f"Error: Unknown function '{function_name}'."
+            }
+        except Exception as e:
+            return {
+                "role": "tool",
+                "name": "error",
+                "content": f"Error processing tool call: {str(e)}"
+            }
     
     def parse_tool_calls(self, response_text):
         """Parse tool calls from the model response."""
-        # Simple regex-based parsing for tool calls in the format:
+        # Tool calls use the format:
         # ```function_call
         # {
         #   "name": "function_name",
@@ -224,18 +566,171 @@ The user can download their complete project when finished.
         #   }
         # }
         # ```
-        tool_calls = []
-        pattern = r"```(?:function_call|json)\s*({[\s\S]*?})\s*```"
-        matches = re.findall(pattern, response_text)
+        tool_calls, errors = parse_tool_calls(response_text)
+        for error in errors:
+            st.warning(f"Failed to parse function call: {error}")
+        
+        return tool_calls
+    
+    def _model_name(self):
+        """Return the configured Gemini model name."""
+        return get_config("gemini_model", "gemini-pro")
+    
+    def _response_cache_key(self, user_input, project_path):
+        """Return the response-cache key for a message against the current project files."""
+        known_files = st.session_state.context_assembler.project_files(project_path)
+        return st.session_state.response_cache.make_key(
+            self._model_name(), user_input, project_path, known_files
+        )
+    
+    def _store_cached_turn(self, cache_key, turn_messages, tool_calls, project_path):
+        """Cache a finished turn unless it was stopped or its tools changed anything."""
+        if any(message.get("stopped") for message in turn_messages):
+            return
+        if any(call.get("name") not in READ_ONLY_TOOLS for call in tool_calls):
+            return
+        dependencies = [
+            TREE_DEPENDENCY if call.get("name") in TREE_TOOLS else call.get("args", {}).get("path", ".")
+            for call in tool_calls
+        ]
+        messages = [
+            {key: message[key] for key in ("role", "name", "content", "metrics", "elapsed") if key in message}
+            for message in turn_messages
+        ]
+        st.session_state.response_cache.put(cache_key, messages, project_path, dependencies)
+    
+    def _history_for_model(self, messages):
+        """Convert chat history messages into Gemini turns that alternate user/model."""
+        turns = []
+        for message in messages:
+            if message["role"] == "user":
+                role, text = "user", f"User message: {message['content']}"
+            elif message["role"] == "assistant":
+                role, text = "model", message["content"]
+            elif message["role"] == "tool_result":
+                role, text = "user", f"Tool: {message['name']}\nResult: {message['content']}"
+            else:
+                continue
+            if turns and turns[-1]["role"] == role:
+                turns[-1]["parts"][0] += "\n\n" + text
+            else:
+                turns.append({"role": role, "parts": [text]})
+        # The next message sent is a user turn, so history has to end on the model
+        while turns and turns[-1]["role"] == "user":
+            turns.pop()
+        return turns
+    
+    def _get_chat(self, previous_messages):
+        """Return the session's persistent Gemini chat, creating it on first use.
+        
+        The static instructions go into the model's system-instruction slot
+        where the SDK and model support it; otherwise they are sent once as
+        the opening exchange of the chat. previous_messages seeds the history
+        when a chat has to be recreated mid-conversation, after compaction.
+        """
+        if st.session_state.gemini_chat is not None:
+            return st.session_state.gemini_chat
         
-        for match in matches:
+        model_name = self._model_name()
+        instructions = self.generate_system_prompt()
+        history = self._history_for_model(
+            st.session_state.conversation_compactor.compact(previous_messages)
+        )
+        model = None
+        if model_name not in LEGACY_MODELS:
             try:
-                function_data = json.loads(match)
-                tool_calls.append(function_data)
-            except json.JSONDecodeError:
-                st.warning(f"Failed to parse function call: {match}")
+                model = st.session_state.client.GenerativeModel(model_name, system_instruction=instructions)
+            except TypeError:
+                # SDK predates system instructions
+                model = None
+        if model is None:
+            model = st.session_state.client.GenerativeModel(model_name)
+            history = [
+                {"role": "user", "parts": [instructions]},
+                {"role": "model", "parts": ["Understood. I will follow these instructions."]},
+            ] + history
         
-        return tool_calls
+        st.session_state.gemini_chat = model.start_chat(history=history)
+        # A new chat has not seen any project context yet
+        st.session_state.context_digest = None
+        return st.session_state.gemini_chat
+    
+    def _send_message(self, chat, content, stream, spinner_text="Cline is thinking...", on_tool_call=None):
+        """Send a message to the chat and add the reply to the chat history.
+        
+        In streaming mode the reply is rendered as it arrives, with a Stop
+        button. Pressing Stop interrupts this script run; the partial reply
+        is still recorded, marked as stopped. on_tool_call receives each tool
+        call as soon as its closing fence has streamed in.
+        """
+        reply = StreamingReply()
+        message = {"role": "assistant", "content": ""}
+        try:
+            if stream:
+                placeholder = st.empty()
+                st.button("Stop", key=f"stop_generation_{len(st.session_state.chat_history)}")
+                placeholder.markdown("**Cline**: ▌")
+                response = chat.send_message(content, stream=True)
+                parser = IncrementalToolCallParser()
+                try:
+                    for text in iter_chunk_text(response):
+                        reply.add(text)
+                        placeholder.markdown(f"**Cline**: {reply.text}▌")
+                        if on_tool_call is not None:
+                            for tool_call in parser.feed(text):
+                                on_tool_call(tool_call)
+                except BaseException:
+                    # Includes Streamlit's rerun interrupt raised by the Stop button
+                    cancel_stream(response)
+                    raise
+            else:
+                with st.spinner(spinner_text):
+                    response = chat.send_message(content)
+                    reply.add(response.text)
+            reply.finish()
+        finally:
+            # Only reached without finish() when the reply was cut short
+            reply.finish(stopped=True)
+            message["content"] = reply.text
+            message["metrics"] = reply.metrics()
+            if reply.stopped:
+                message["stopped"] = True
+                # The SDK chat still holds the unfinished exchange; rebuild it next turn
+                st.session_state.gemini_chat = None
+            if message["content"] or not reply.stopped:
+                st.session_state.chat_history.append(message)
+        return message
+    
+    def _replace_sent_text(self, chat, sent_text, kept_text):
+        """Keep kept_text in the chat history in place of the user turn just sent as sent_text.
+        
+        Retrieved code is only useful to the turn it was retrieved for;
+        left in the persistent chat it would be resent with every later
+        turn. If the history cannot be edited the chat is reseeded instead.
+        """
+        try:
+            for content in reversed(chat.history):
+                if content.role == "user" and content.parts and content.parts[0].text == sent_text:
+                    content.parts[0].text = kept_text
+                    return
+        except Exception:
+            pass
+        st.session_state.gemini_chat = None
+    
+    def _format_metrics(self, message):
+        """Format the timing figures recorded for an assistant message."""
+        metrics = message["metrics"]
+        parts = []
+        if message.get("cached"):
+            parts.append("from cache")
+        if message.get("stopped"):
+            parts.append("stopped")
+        if metrics.get("time_to_first_token") is not None:
+            parts.append(f"first token {metrics['time_to_first_token']:.1f}s")
+        if metrics.get("tokens_per_second") is not None:
+            parts.append(f"{metrics['tokens_per_second']:.0f} tok/s")
+        parts.append(f"{metrics['tokens']} tokens in {metrics['total_time']:.1f}s")
+        return " · ".join(parts)
     
     def render(self, file_explorer, terminal, open_files, project_path):
         """Render the Cline Assistant interface."""
@@ -264,15 +759,62 @@ The user can download their complete project when finished.
             for message in st.session_state.chat_history:
                 if message["role"] == "user":
                     st.markdown(f"**You**: {message['content']}")
+                    usage = message.get("history_bytes")
+                    if usage and usage["saved"] > 0:
+                        st.caption(
+                            f"History replayed: {usage['held'] / 1024:.1f} KB "
+                            f"(compaction saved {usage['saved'] / 1024:.1f} KB)"
+                        )
                 elif message["role"] == "assistant":
                     st.markdown(f"**Cline**: {message['content']}")
+                    if message.get("metrics"):
+                        st.caption(self._format_metrics(message))
                 elif message["role"] == "tool_result":
-                    with st.expander(f"Tool Result: {message['name']}"):
+                    label = f"Tool Result: {message['name']}"
+                    if message.get("elapsed") is not None:
+                        label += f" ({message['elapsed'] * 1000:.0f} ms)"
+                    with st.expander(label):
                         st.code(message['content'], language="plaintext")
         
+        # Token usage of the project context sent with the last message
+        report = st.session_state.context_report
+        if report:
+            st.caption(
+                f"Project context: {report['total']} of {report['budget']} tokens "
+                f"(map {report['structure']}, collapsed {report['collapsed']}, "
+                f"signatures {report['signatures']})"
+            )
+        if st.session_state.retrieval_report:
+            st.caption(f"Retrieved code: {', '.join(st.session_state.retrieval_report)}")
+        
         # User input
         user_input = st.text_area("Message Cline", height=100, key="user_message")
-        submit_button = st.button("Send")
+        col1, col2, col3, col4 = st.columns([1, 2, 2, 2])
+        submit_button = col1.button("Send")
+        stream = col2.checkbox("Stream responses", value=True, key="stream_responses")
+        use_cache = col3.checkbox(
+            "Cache responses",
+            value=str(get_config("response_cache", "false")).lower() in ("1", "true", "yes", "on"),
+            key="use_response_cache"
+        )
+        use_retrieval = col4.checkbox(
+            "Retrieve code",
+            value=str(get_config("code_retrieval", "true")).lower() in ("1", "true", "yes", "on"),
+            key="use_code_retrieval"
+        )
+        if use_retrieval:
+            # Builds the index in the background; the first turns may retrieve nothing
+            get_chunk_index(project_path).refresh()
+        else:
+            st.session_state.retrieval_report = []
+        if use_cache:
+            cache_stats = st.session_state.response_cache.stats()
+            if cache_stats["hits"] + cache_stats["misses"]:
+                st.caption(
+                    f"Response cache: {cache_stats['hits']} hits of "
+                    f"{cache_stats['hits'] + cache_stats['misses']} lookups "
+                    f"({cache_stats['hit_rate']:.0%})"
+                )
         
         if submit_button and user_input:
             # Add user message to chat history
@@ -283,100 +825,127 @@ The user can download their complete project when finished.
             
             # Clear the input area
             st.session_state.user_message = ""
+            turn_start = len(st.session_state.chat_history)
             
-            # Generate system prompt with project context
-            system_prompt = self.generate_system_prompt(project_path)
+            # Serve a repeated question about unchanged files from the cache
+            cache_key = None
+            if use_cache:
+                # Starts a rescan if one is due, so edits made outside the app expire tree-wide
+                # entries; even the first build runs in the background, off this script run
+                get_search_index(project_path).refresh(background=True)
+                cache_key = self._response_cache_key(user_input, project_path)
+                cached_messages = st.session_state.response_cache.get(cache_key, project_path)
+                if cached_messages is not None:
+                    st.session_state.chat_history.extend(
+                        dict(message, cached=True) for message in cached_messages
+                    )
+                    # Reseed the chat on the next turn so it sees the cached exchange
+                    st.session_state.gemini_chat = None
+                    st.rerun()
             
+            # Read-only tool calls start while the reply is still streaming
+            scheduler = self._make_tool_scheduler(terminal, project_path, open_files)
             try:
-                with st.spinner("Cline is thinking..."):
-                    # Create conversation history for Gemini
-                    gemini_history = []
-                    for message in st.session_state.chat_history:
-                        if message["role"] == "user":
-                            gemini_history.append({"role": "user", "parts": [message["content"]]})
-                        elif message["role"] == "assistant":
-                            gemini_history.append({"role": "model", "parts": [message["content"]]})
-                    
-                    # Initialize Gemini model
-                    model = st.session_state.client.GenerativeModel('gemini-pro')
-                    
-                    # Start the chat
-                    chat = model.start_chat(history=gemini_history)
-                    
-                    # Generate response with system prompt
-                    response = chat.send_message(
-                        f"{system_prompt}\n\nUser message: {user_input}\n\n"
-                        "You can use function calls in this format when needed:\n"
-                        "```function_call\n"
-                        "{\n"
-                        '  "name": "function_name",\n'
-                        '  "args": {\n'
-                        '    "arg1": "value1"\n'
-                        '  }\n'
-                        "}\n"
-                        "```\n"
-                        "Available functions:\n"
-                        "- read_file(path): Read content of a file\n"
-                        "- write_file(path, content): Write content to a file\n"
-                        "- execute_command(command): Execute a command in the terminal\n"
-                        "- list_directory(path): List files in a directory"
+                # Reseed the chat from a compacted history once what it holds outgrows
+                # the ceiling; that includes context, retrieved code and tool results
+                previous_messages = st.session_state.chat_history[:-1]
+                compactor = st.session_state.conversation_compactor
+                chat = st.session_state.gemini_chat
+                if chat is not None:
+                    outgrown_bytes = history_bytes(chat.history)
+                    if outgrown_bytes > compactor.max_bytes:
+                        st.session_state.gemini_chat = None
+                        chat = self._get_chat(previous_messages)
+                        st.session_state.history_saved_bytes += max(0, outgrown_bytes - history_bytes(chat.history))
+                chat = self._get_chat(previous_messages)
+                
+                # Record what the model is sent as history and what compaction saved so far
+                held_bytes = history_bytes(chat.history)
+                st.session_state.chat_history[-1]["history_bytes"] = {
+                    "raw": held_bytes + st.session_state.history_saved_bytes,
+                    "held": held_bytes,
+                    "saved": st.session_state.history_saved_bytes
+                }
+                
+                # Only resend the project context when it changed since the chat last saw it
+                context = self.generate_project_context(project_path)
+                context_digest = hashlib.sha1(context.encode("utf-8")).hexdigest()
+                message_text = f"User message: {user_input}"
+                if context_digest != st.session_state.context_digest:
+                    message_text = f"Current Project Context:\n{context}\n\n{message_text}"
+                
+                # Put the code most relevant to the message in front of the model, for this turn only
+                sent_text = message_text
+                relevant_code = self.retrieve_relevant_code(project_path, user_input) if use_retrieval else ""
+                if relevant_code:
+                    sent_text = (
+                        "Relevant code from the project (retrieved automatically for this "
+                        f"message only; read the files for more):\n\n{relevant_code}\n\n{message_text}"
+                    )
+                
+                # Generate response; only the new message travels with the request
+                assistant_message = self._send_message(
+                    chat, sent_text, stream, on_tool_call=scheduler.offer
+                )
+                st.session_state.context_digest = context_digest
+                if sent_text is not message_text and not assistant_message.get("stopped"):
+                    self._replace_sent_text(chat, sent_text, message_text)
+                
+                # Check for tool calls in the response; a stopped reply runs none
+                tool_calls = []
+                if not assistant_message.get("stopped"):
+                    tool_calls = self.parse_tool_calls(assistant_message["content"])
+                
+                if tool_calls:
+                    # Handle tool calls
+                    tool_results = self.handle_tool_calls(
+                        tool_calls,
+                        file_explorer,
+                        terminal,
+                        project_path,
+                        open_files,
+                        scheduler=scheduler
                     )
                     
-                    # Extract the response text
-                    assistant_message_content = response.text
-                    
-                    # Add assistant message to chat history
-                    st.session_state.chat_history.append({
-                        "role": "assistant",
-                        "content": assistant_message_content
-                    })
+                    for tool_result in tool_results:
+                        # Add tool result to chat history
+                        st.session_state.chat_history.append({
+                            "role": "tool_result",
+                            "name": tool_result["name"],
+                            "content": tool_result["content"],
+                            "elapsed": tool_result.get("elapsed")
+                        })
                     
-                    # Check for tool calls in the response
-                    tool_calls = self.parse_tool_calls(assistant_message_content)
+                    # Format tool results for the model
+                    tool_results_text = "\n\n".join([
+                        f"Tool: {result['name']}\nResult: {result['content']}"
+                        for result in tool_results
+                    ])
                     
-                    if tool_calls:
-                        # Handle tool calls
-                        tool_results = self.handle_tool_calls(
-                            tool_calls,
-                            file_explorer,
-                            terminal,
-                            project_path,
-                            open_files
-                        )
-                        
-                        for tool_result in tool_results:
-                            # Add tool result to chat history
-                            st.session_state.chat_history.append({
-                                "role": "tool_result",
-                                "name": tool_result["name"],
-                                "content": tool_result["content"]
-                            })
-                        
-                        # Make a follow-up API call with the tool results
-                        with st.spinner("Processing tool results..."):
-                            # Format tool results for the model
-                            tool_results_text = "\n\n".join([
-                                f"Tool: {result['name']}\nResult: {result['content']}"
-                                for result in tool_results
-                            ])
-                            
-                            # Send follow-up message with tool results
-                            follow_up_response = chat.send_message(
-                                f"Here are the results of the function calls:\n\n{tool_results_text}\n\n"
-                                "Please provide your response based on these results."
-                            )
-                            
-                            follow_up_content = follow_up_response.text
-                            
-                            # Add follow-up message to chat history
-                            st.session_state.chat_history.append({
-                                "role": "assistant",
-                                "content": follow_up_content
-                            })
+                    # Make a follow-up API call with the tool results
+                    self._send_message(
+                        chat,
+                        f"Here are the results of the function calls:\n\n{tool_results_text}\n\n"
+                        "Please provide your response based on these results.",
+                        stream,
+                        spinner_text="Processing tool results..."
+                    )
+                
+                if cache_key is not None:
+                    self._store_cached_turn(
+                        cache_key,
+                        st.session_state.chat_history[turn_start:],
+                        tool_calls,
+                        project_path
+                    )
                 
             except Exception as e:
+                # The chat may hold a half-finished exchange; rebuild it next time
+                st.session_state.gemini_chat = None
                 st.error(f"Error communicating with Gemini: {str(e)}")
                 st.error("Please check your API key and internet connection.")
+            finally:
+                scheduler.close()
             
             # Force a rerun to update the chat container
             st.rerun()
@@ -0,0 +1,346 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+
+from dir_cache import add_change_listener
+from fs_tools import SNIFF_BYTES, is_binary
+from ignore_rules import get_ignore_rules, walk_files
+
+# NumPy is in requirements.txt (Streamlit needs it too), but scoring falls back to plain Python without it
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_WORD_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Words too common in questions to say anything about the code wanted
+STOP_WORDS = {
+    "a", "an", "and", "are", "be", "can", "do", "does", "for", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "please", "that", "the", "this",
+    "to", "what", "where", "why", "with", "you",
+}
+
+
+def tokenize(text):
+    """Split text into lower-cased terms, adding the parts of snake_case and camelCase words."""
+    terms = []
+    for word in _WORD.findall(text):
+        terms.append(word.lower())
+        parts = _WORD_PART.findall(word)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return [term for term in terms if len(term) > 1 and term not in STOP_WORDS]
+
+
+class CodeChunk:
+    """A retrieved range of lines and its score."""
+
+    def __init__(self, path, start_line, end_line, text, score):
+        self.path = path
+        self.start_line = start_line
+        self.end_line = end_line
+        self.text = text
+        self.score = score
+
+
+class ChunkIndex:
+    """BM25 index over fixed-size line chunks of the text files in a workspace.
+
+    Each file is split into CHUNK_LINES-line chunks. Term frequencies are
+    kept as sparse postings (term -> {chunk id: count}), and a query scores
+    only the chunks in the postings of its own terms; with NumPy the
+    postings are scored as arrays. The index is built, and rescanned at most
+    every REFRESH_INTERVAL seconds, on a background thread; searches made
+    meanwhile use what is indexed so far. Files the app writes are
+    rechunked straight away by update_file() through dir_cache's change
+    notifications. Hidden files and directories are never indexed.
+    """
+
+    CHUNK_LINES = 40
+    MAX_FILE_BYTES = 512 * 1024
+    REFRESH_INTERVAL = 30.0
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        # rel_path -> (size, mtime_ns, [chunk ids])
+        self._files = {}
+        # chunk id -> (rel_path, start_line, end_line, {term: count}), None once removed
+        self._chunks = []
+        self._lengths = []
+        self._free = []
+        self._postings = {}
+        self._total_length = 0
+        self._live = 0
+        self._refreshed_at = None
+        self._refreshing = False
+
+    def stats(self):
+        """Return the number of indexed files, chunks and terms."""
+        with self._lock:
+            return {"files": len(self._files), "chunks": self._live, "terms": len(self._postings)}
+
+    def refresh(self, wait=False):
+        """Bring the index up to date with the files on disk.
+
+        With wait=True the rescan runs here; otherwise one is started in the
+        background if none has run yet or REFRESH_INTERVAL has passed.
+        """
+        if wait:
+            self._rescan()
+            return
+        with self._lock:
+            due = self._refreshed_at is None or \
+                time.monotonic() - self._refreshed_at >= self.REFRESH_INTERVAL
+            if not due or self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._rescan, daemon=True).start()
+
+    def expire(self):
+        """Make the next refresh() rescan, e.g. after a directory was created, moved or deleted."""
+        with self._lock:
+            if self._refreshed_at is not None:
+                self._refreshed_at -= self.REFRESH_INTERVAL
+
+    def update_file(self, path):
+        """Rechunk one file after it was saved, given as an absolute or relative path."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        rel_path = path.replace(os.sep, "/")
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            with self._lock:
+                self._remove_file(rel_path)
+            return
+        self._index_file(rel_path, stat)
+
+    def search(self, query, top_k=6):
+        """Return up to top_k CodeChunks ranked by BM25 score against query."""
+        self.refresh()
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._live:
+                return []
+            if NUMPY_AVAILABLE:
+                ranked = self._score_numpy(terms, top_k)
+            else:
+                ranked = self._score_python(terms, top_k)
+            hits = [(self._chunks[chunk_id], score) for chunk_id, score in ranked]
+
+        chunks = []
+        for (rel_path, start_line, end_line, _), score in hits:
+            text = self._read_lines(rel_path, start_line, end_line)
+            if text is not None:
+                chunks.append(CodeChunk(rel_path, start_line, end_line, text, score))
+        return chunks
+
+    def _idf(self, term):
+        document_count = len(self._postings[term])
+        return math.log(1 + (self._live - document_count + 0.5) / (document_count + 0.5))
+
+    def _score_numpy(self, terms, top_k):
+        """Score with each term's postings as arrays; returns [(chunk id, score)]."""
+        lengths = np.asarray(self._lengths, dtype=np.float64)
+        average = self._total_length / self._live
+        scores = np.zeros(len(self._chunks))
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            ids = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            counts = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            norm = self.K1 * (1 - self.B + self.B * lengths[ids] / average)
+            scores[ids] += self._idf(term) * counts * (self.K1 + 1) / (counts + norm)
+
+        top_k = min(top_k, int(np.count_nonzero(scores)))
+        if top_k <= 0:
+            return []
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(chunk_id), float(scores[chunk_id])) for chunk_id in best]
+
+    def _score_python(self, terms, top_k):
+        """Score with dictionaries when NumPy is not installed; returns [(chunk id, score)]."""
+        average = self._total_length / self._live
+        scores = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for chunk_id, count in postings.items():
+                norm = self.K1 * (1 - self.B + self.B * self._lengths[chunk_id] / average)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * count * (self.K1 + 1) / (count + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def _rescan(self):
+        """Stat every candidate file and rechunk those whose size or mtime changed."""
+        try:
+            seen = set()
+            for rel_path, stat in self._text_files():
+                seen.add(rel_path)
+                known = self._files.get(rel_path)
+                if known is None or known[:2] != (stat.st_size, stat.st_mtime_ns):
+                    self._index_file(rel_path, stat)
+            with self._lock:
+                for rel_path in [path for path in self._files if path not in seen]:
+                    self._remove_file(rel_path)
+        finally:
+            with self._lock:
+                self._refreshed_at = time.monotonic()
+                self._refreshing = False
+
+    def _text_files(self):
+        """Yield (rel_path, stat) for candidate files under the workspace that are not ignored."""
+        start = len(os.path.abspath(self.root)) + 1
+        for path in walk_files(self.root, get_ignore_rules(self.root), hidden=False):
+            rel_path = path[start:].replace(os.sep, "/")
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_size <= self.MAX_FILE_BYTES:
+                yield rel_path, stat
+
+    def _index_file(self, rel_path, stat):
+        """Replace a file's chunks with ones built from its current content.
+
+        The file is read and tokenized before the lock is taken.
+        """
+        chunks = []
+        data = None
+        if stat.st_size <= self.MAX_FILE_BYTES:
+            try:
+                with open(os.path.join(self.root, rel_path), "rb") as f:
+                    data = f.read(self.MAX_FILE_BYTES + 1)
+            except OSError:
+                with self._lock:
+                    self._remove_file(rel_path)
+                return
+
+        if data and len(data) <= self.MAX_FILE_BYTES and not is_binary(data[:SNIFF_BYTES]):
+            lines = data.decode("utf-8", errors="replace").splitlines()
+            for start in range(0, len(lines), self.CHUNK_LINES):
+                terms = tokenize("\n".join(lines[start:start + self.CHUNK_LINES]))
+                if not terms:
+                    continue
+                counts = {}
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+                end = min(len(lines), start + self.CHUNK_LINES)
+                chunks.append(((rel_path, start + 1, end, counts), len(terms)))
+
+        with self._lock:
+            self._remove_file(rel_path)
+            chunk_ids = [self._add_chunk(chunk, length) for chunk, length in chunks]
+            self._files[rel_path] = (stat.st_size, stat.st_mtime_ns, chunk_ids)
+
+    def _add_chunk(self, chunk, length):
+        """Store a chunk, reusing a freed id when there is one, and post its terms."""
+        if self._free:
+            chunk_id = self._free.pop()
+            self._chunks[chunk_id] = chunk
+            self._lengths[chunk_id] = length
+        else:
+            chunk_id = len(self._chunks)
+            self._chunks.append(chunk)
+            self._lengths.append(length)
+        for term, count in chunk[3].items():
+            self._postings.setdefault(term, {})[chunk_id] = count
+        self._total_length += length
+        self._live += 1
+        return chunk_id
+
+    def _remove_file(self, rel_path):
+        """Drop a file's chunks from the postings and free their ids."""
+        known = self._files.pop(rel_path, None)
+        if known is None:
+            return
+        for chunk_id in known[2]:
+            for term in self._chunks[chunk_id][3]:
+                postings = self._postings[term]
+                del postings[chunk_id]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths[chunk_id]
+            self._live -= 1
+            self._chunks[chunk_id] = None
+            self._lengths[chunk_id] = 0
+            self._free.append(chunk_id)
+
+    def _read_lines(self, rel_path, start_line, end_line):
+        """Return lines start_line..end_line of a file, or None if it can no longer be read."""
+        try:
+            with open(os.path.join(self.root, rel_path), "r", encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        return "\n".join(lines[start_line - 1:end_line])
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_chunk_index(root):
+    """Return the shared ChunkIndex for a workspace, creating it on first use."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = ChunkIndex(root)
+        return index
+
+
+def note_path_changed(path):
+    """Rechunk a file the app wrote, or expire the index when a directory changed.
+
+    Registered with dir_cache; indexes that have not finished their first
+    scan pick the change up from it.
+    """
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        indexes = [index for root, index in _indexes.items() if path.startswith(root + os.sep)]
+    for index in indexes:
+        if index._refreshed_at is None:
+            continue
+        rel_path = os.path.relpath(path, index.root).replace(os.sep, "/")
+        if os.path.isdir(path) or not os.path.exists(path) and any(
+                known.startswith(rel_path + "/") for known in list(index._files)):
+            index.expire()
+        elif "/." not in "/" + rel_path and not get_ignore_rules(index.root).is_ignored(rel_path, False):
+            index.update_file(rel_path)
+
+
+add_change_listener(note_path_changed)
+
+
+def format_chunks(chunks, max_bytes):
+    """Format retrieved chunks for the prompt, best first, stopping at max_bytes.
+
+    Returns (text, included chunks).
+    """
+    parts = []
+    included = []
+    used = 0
+    for chunk in chunks:
+        part = f"{chunk.path} (lines {chunk.start_line}-{chunk.end_line}):\n```\n{chunk.text}\n```"
+        size = len(part.encode("utf-8"))
+        if used + size > max_bytes:
+            continue
+        parts.append(part)
+        included.append(chunk)
+        used += size
+    return "\n\n".join(parts), included
@@ -0,0 +1,210 @@
+import codecs
+import os
+import platform
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+IS_WINDOWS = platform.system() == "Windows"
+
+# os.wait4 reports a child's resource usage as it is reaped (POSIX only)
+HAS_WAIT4 = hasattr(os, "wait4")
+
+# Seconds a terminated process group gets to exit before it is killed outright
+KILL_GRACE = 2.0
+
+# Seconds to keep reading after the shell exits while something else holds its pipes
+PIPE_GRACE = 0.5
+
+
+class CommandRun:
+    """A shell command whose output is read incrementally in the background.
+
+    The command runs in its own process group (a new session on POSIX, a
+    new process group on Windows) so a timeout or cancellation stops it
+    along with everything it started. One reader thread per stream decodes
+    output as it arrives and queues it; poll() hands the queued chunks to
+    the caller without ever blocking on the pipes. With keep_output off
+    the chunks are only handed to the caller, and wait() returns empty
+    strings, so output of any size passes through in bounded memory.
+
+    The process is reaped with os.wait4 where available, so once it has
+    exited rusage holds the CPU time and peak memory of the shell and
+    every descendant it waited for, and wall_time its run time. Popen's
+    own poll() and wait() are then never called, since either could reap
+    the process first and lose its resource usage.
+    """
+
+    def __init__(self, command, cwd, env=None, keep_output=True):
+        self.command = command
+        self.keep_output = keep_output
+        self.started = time.monotonic()
+        self.timed_out = False
+        self.wall_time = None
+        self.rusage = None
+        self.stdout = []
+        self.stderr = []
+        self._chunks = queue.Queue()
+
+        self.process = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            **popen_group_kwargs()
+        )
+        self._readers = [
+            threading.Thread(target=self._read, args=(self.process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self._read, args=(self.process.stderr, "stderr"), daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+
+    def _read(self, pipe, name):
+        """Queue decoded chunks from one pipe until it closes."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            for data in iter(lambda: pipe.read1(65536), b""):
+                text = decoder.decode(data)
+                if text:
+                    self._chunks.put((name, text))
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                self._chunks.put((name, tail))
+        finally:
+            pipe.close()
+
+    @property
+    def done(self):
+        """True once the process has exited and both pipes are drained."""
+        return self.returncode is not None and not any(r.is_alive() for r in self._readers) \
+            and self._chunks.empty()
+
+    @property
+    def returncode(self):
+        """The exit code once the process has exited (negative for a signal), else None."""
+        if not HAS_WAIT4:
+            return self.process.poll()
+        if self.process.returncode is None:
+            self._reap(os.WNOHANG)
+        return self.process.returncode
+
+    def _reap(self, flags=0):
+        """Collect the exit status and resource usage of the process with wait4."""
+        try:
+            pid, status, rusage = os.wait4(self.process.pid, flags)
+        except ChildProcessError:
+            # Reaped by someone else after all; its usage is lost but the run still ends
+            self.process.returncode = 0 if self.process.returncode is None else self.process.returncode
+            return
+        if pid:
+            self.wall_time = time.monotonic() - self.started
+            self.rusage = rusage
+            if os.WIFSIGNALED(status):
+                self.process.returncode = -os.WTERMSIG(status)
+            else:
+                self.process.returncode = os.WEXITSTATUS(status)
+
+    def _wait_exit(self, timeout=None):
+        """Wait for the process to exit, raising subprocess.TimeoutExpired after timeout."""
+        if not HAS_WAIT4:
+            return self.process.wait(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.returncode is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(self.command, timeout)
+            time.sleep(0.02)
+        return self.process.returncode
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def poll(self, timeout=0.1):
+        """Return [(stream, text)] received since the last call, waiting up to timeout for the first."""
+        chunks = []
+        try:
+            chunks.append(self._chunks.get(timeout=timeout))
+            while True:
+                chunks.append(self._chunks.get_nowait())
+        except queue.Empty:
+            pass
+        if self.keep_output:
+            for name, text in chunks:
+                (self.stdout if name == "stdout" else self.stderr).append(text)
+        return chunks
+
+    def wait(self, timeout=None, on_output=None):
+        """Run until the command exits or timeout seconds pass, then return its result.
+
+        on_output, if given, is called with each batch of new chunks. A
+        command still running at the deadline has its process group killed.
+        If the caller is interrupted (e.g. a Streamlit rerun) the command is
+        killed too rather than left running unattended.
+        """
+        exited_at = None
+        try:
+            while not self.done:
+                if timeout is not None and self.elapsed > timeout:
+                    self.timed_out = True
+                    self.kill()
+                chunks = self.poll()
+                if chunks and on_output is not None:
+                    on_output(chunks)
+                if self.returncode is not None:
+                    # A background child may keep the pipes open after the shell exits
+                    exited_at = exited_at or time.monotonic()
+                    if time.monotonic() - exited_at > PIPE_GRACE and self._chunks.empty():
+                        break
+        finally:
+            if self.returncode is None:
+                self.kill()
+        if self.wall_time is None:
+            self.wall_time = self.elapsed
+        return "".join(self.stdout), "".join(self.stderr), self.process.returncode
+
+    def kill(self):
+        """Terminate the command's whole process group, escalating to a kill after KILL_GRACE."""
+        if self.returncode is None:
+            kill_process_group(self.process, wait=self._wait_exit, poll=lambda: self.returncode)
+
+
+def popen_group_kwargs():
+    """Return Popen keyword arguments that start a process in its own process group."""
+    if IS_WINDOWS:
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_group(process, grace=KILL_GRACE, wait=None, poll=None):
+    """Terminate a process started with popen_group_kwargs() and everything in its group.
+
+    SIGTERM goes to the group first and SIGKILL follows after grace seconds
+    (on Windows the whole tree is killed with taskkill). wait and poll, if
+    given, replace process.wait and process.poll for callers that reap the
+    process themselves.
+    """
+    wait = wait or process.wait
+    poll = poll or process.poll
+    if poll() is not None:
+        return
+    try:
+        if IS_WINDOWS:
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                wait(grace)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        process.kill()
+    wait()
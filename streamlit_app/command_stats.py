@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import platform
+import re
+import sys
+import threading
+from collections import deque
+
+# Fields of a CommandRecord, in export order
+FIELDS = (
+    "started", "host", "command", "cwd", "runner", "returncode", "timed_out",
+    "wall_time", "user_cpu", "system_cpu", "peak_rss", "stdout_bytes", "stderr_bytes",
+)
+
+# Orders offered for the history: label -> sort key
+SORT_KEYS = {
+    "Most recent": lambda r: r.started,
+    "Wall time": lambda r: r.wall_time,
+    "CPU time": lambda r: r.cpu_time or 0.0,
+    "Peak memory": lambda r: r.peak_rss or 0,
+    "Output size": lambda r: r.output_bytes,
+}
+
+# Recorded with each command so exports from several hosts can be combined
+HOST = platform.node()
+
+_TIMES_VALUE = re.compile(r"(\d+)m([\d.]+)s")
+
+
+def rusage_fields(rusage):
+    """Return (user_cpu, system_cpu, peak_rss_bytes) from a resource.struct_rusage."""
+    # ru_maxrss is in kilobytes on Linux and the BSDs, in bytes on macOS
+    peak = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    return rusage.ru_utime, rusage.ru_stime, peak
+
+
+def parse_times(text):
+    """Return the total (user, system) CPU seconds in the output of the shell's times builtin.
+
+    times prints the shell's own user and system time and then its
+    children's; both are summed, so builtins run by the shell count too.
+    """
+    values = [int(minutes) * 60 + float(seconds) for minutes, seconds in _TIMES_VALUE.findall(text)]
+    if len(values) < 4:
+        return None
+    return values[0] + values[2], values[1] + values[3]
+
+
+class CommandRecord:
+    """The resources one command used: wall and CPU time, peak memory and output size.
+
+    CPU times and peak_rss are None when they could not be measured (peak
+    memory is only known for commands the app ran as its own child).
+    """
+
+    def __init__(self, command, cwd, runner, started, wall_time, returncode, timed_out=False,
+                 user_cpu=None, system_cpu=None, peak_rss=None, stdout_bytes=0, stderr_bytes=0):
+        self.host = HOST
+        self.command = command
+        self.cwd = cwd
+        self.runner = runner
+        self.started = started
+        self.wall_time = wall_time
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.user_cpu = user_cpu
+        self.system_cpu = system_cpu
+        self.peak_rss = peak_rss
+        self.stdout_bytes = stdout_bytes
+        self.stderr_bytes = stderr_bytes
+
+    @property
+    def cpu_time(self):
+        if self.user_cpu is None or self.system_cpu is None:
+            return None
+        return self.user_cpu + self.system_cpu
+
+    @property
+    def output_bytes(self):
+        return self.stdout_bytes + self.stderr_bytes
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+def format_bytes(size):
+    """Format a byte count with a binary unit, e.g. 1536 -> '1.5 KB'."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+
+def format_record(record):
+    """Describe a record's resource use in one line."""
+    parts = [f"wall {record.wall_time:.2f}s"]
+    if record.cpu_time is not None:
+        parts.append(f"user {record.user_cpu:.2f}s")
+        parts.append(f"sys {record.system_cpu:.2f}s")
+    if record.peak_rss is not None:
+        parts.append(f"peak RSS {format_bytes(record.peak_rss)}")
+    parts.append(f"output {format_bytes(record.output_bytes)}")
+    return ", ".join(parts)
+
+
+class CommandHistory:
+    """The resource records of a session's commands, newest kept, with sorting and export."""
+
+    def __init__(self, max_records=1000):
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self, sort_by="Most recent", descending=True):
+        """Return the records ordered by one of SORT_KEYS."""
+        with self._lock:
+            records = list(self._records)
+        return sorted(records, key=SORT_KEYS[sort_by], reverse=descending)
+
+    def totals(self):
+        """Return (commands, wall seconds, CPU seconds, output bytes) over the history."""
+        records = self.records()
+        return (
+            len(records),
+            sum(r.wall_time for r in records),
+            sum(r.cpu_time or 0.0 for r in records),
+            sum(r.output_bytes for r in records),
+        )
+
+    def export_json(self):
+        """Return the history as JSON lines, one record per line, oldest first."""
+        return "".join(json.dumps(r.to_dict()) + "\n" for r in self.records(descending=False))
+
+    def export_csv(self):
+        """Return the history as CSV with a header row, oldest first."""
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in self.records(descending=False):
+            writer.writerow(record.to_dict())
+        return out.getvalue()
+
@@ -100,3 +100,10 @@ def get_config(config_name, default=None):
                 pass
     
     return default
+
+def get_data_dir(name):
+    """Return a per-user data directory for the app, creating it if needed."""
+    base = get_config('data_dir') or (Path.home() / '.cline-web-ide')
+    path = Path(base) / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,240 @@
+import ast
+import os
+import re
+
+from ignore_rules import get_ignore_rules
+from project_structure import ProjectStructureCache
+
+# Dependency and build-output directories summarised in one line instead of listed
+COLLAPSE_DIRS = {
+    "node_modules", "bower_components", "build", "dist", "out", "target",
+    ".venv", "venv", "env", "site-packages", ".next", ".nuxt", "coverage",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".gradle",
+}
+
+# Declarations worth showing for non-Python sources
+_SIGNATURE_PATTERN = re.compile(
+    r"^(?:export\s+)?(?:default\s+)?(?:async\s+)?"
+    r"(?:(?:public|private|protected|static|abstract|pub)\s+)*"
+    r"(?:function\*?|class|interface|type|enum|def|func|fn|struct|impl|trait)\s+[\w$]"
+)
+
+
+def estimate_tokens(text):
+    """Roughly estimate the number of model tokens in text (about 4 characters each)."""
+    return (len(text) + 3) // 4
+
+
+def expr_name(node):
+    """Return a dotted name for a simple expression node."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return f"{expr_name(node.value)}.{node.attr}"
+    return "..."
+
+
+def format_def(node):
+    """Format a function definition node as a one-line signature."""
+    args = node.args
+    params = [arg.arg for arg in getattr(args, "posonlyargs", [])] + [arg.arg for arg in args.args]
+    if args.vararg:
+        params.append(f"*{args.vararg.arg}")
+    elif args.kwonlyargs:
+        params.append("*")
+    params.extend(arg.arg for arg in args.kwonlyargs)
+    if args.kwarg:
+        params.append(f"**{args.kwarg.arg}")
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{prefix} {node.name}({', '.join(params)})"
+
+
+def python_signatures(source):
+    """Return top-level class and function signatures from Python source."""
+    tree = ast.parse(source)
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.append(format_def(node))
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(expr_name(base) for base in node.bases)
+            lines.append(f"class {node.name}({bases})" if bases else f"class {node.name}")
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and \
+                        (not item.name.startswith("_") or item.name == "__init__"):
+                    lines.append("    " + format_def(item))
+    return lines
+
+
+def generic_signatures(source):
+    """Return declaration lines that look like top-level signatures in other languages."""
+    lines = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        # Only consider unindented or lightly indented (class member) declarations
+        if len(line) - len(line.lstrip()) > 4 or len(stripped) > 160:
+            continue
+        if _SIGNATURE_PATTERN.match(stripped):
+            lines.append(stripped.rstrip("{").rstrip())
+    return lines
+
+
+class ContextAssembler:
+    """Fill a token budget with project context, most useful sections first.
+
+    Sections, in priority order:
+      1. a compact map of the project directories and their files
+      2. one-line summaries of collapsed dependency, build and deep directories
+      3. top-level signatures from the most recently touched files
+    """
+
+    MAX_DEPTH = 6
+    COLLAPSED_COUNT_LIMIT = 10000
+    SIGNATURE_FILES = 8
+    MAX_SIGNATURES_PER_FILE = 30
+    MAX_SIGNATURE_FILE_BYTES = 512 * 1024
+
+    def __init__(self, structure_cache=None):
+        self.structure_cache = structure_cache or ProjectStructureCache()
+        # Absolute path -> ((mtime_ns, size), signature lines)
+        self._signature_cache = {}
+
+    def assemble(self, project_path, token_budget, recent_files=()):
+        """Build the context text for project_path within token_budget.
+
+        Returns (text, report) where report maps each section to the number
+        of tokens it used, plus the budget and total.
+        """
+        root = os.path.abspath(project_path)
+        remaining = token_budget
+        parts = []
+        report = {"budget": token_budget}
+
+        rules = get_ignore_rules(root)
+        structure, collapsed = self.structure_cache.render(root, prune=self._should_collapse, rules=rules)
+        text, used = self._fit(
+            "Project map (directory: files):\n", structure.splitlines(True), remaining
+        )
+        parts.append(text)
+        report["structure"] = used
+        remaining -= used
+
+        summary_lines = [self._collapsed_line(root, path, rules) for path in collapsed]
+        text, used = self._fit("Collapsed directories:\n", summary_lines, remaining)
+        parts.append(text)
+        report["collapsed"] = used
+        remaining -= used
+
+        signature_lines = []
+        for path in self._signature_candidates(root, recent_files, rules):
+            signatures = self._signatures(path)
+            if signatures:
+                rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+                signature_lines.append(f"{rel_path}:\n")
+                signature_lines.extend(f"  {line}\n" for line in signatures)
+        text, used = self._fit("Signatures from recently touched files:\n", signature_lines, remaining)
+        parts.append(text)
+        report["signatures"] = used
+
+        report["total"] = sum(report[name] for name in ("structure", "collapsed", "signatures"))
+        return "\n".join(part for part in parts if part), report
+
+    def project_files(self, project_path):
+        """Return the project-relative paths of the files in the project map.
+
+        The tree is walked exactly as assemble() walks it, so both share the
+        structure cache's snapshots.
+        """
+        root = os.path.abspath(project_path)
+        return [
+            os.path.relpath(os.path.join(path, name), root).replace(os.sep, "/")
+            for path, _, snapshot in self.structure_cache.walk(
+                root, prune=self._should_collapse, rules=get_ignore_rules(root)
+            )
+            if snapshot is not None
+            for name in snapshot.files
+        ]
+
+    def _should_collapse(self, path, level):
+        """Return True for directories that are summarised instead of listed."""
+        return os.path.basename(path) in COLLAPSE_DIRS or level > self.MAX_DEPTH
+
+    def _collapsed_line(self, root, path, rules=None):
+        """Summarise a collapsed directory as a single line with entry counts."""
+        rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+        files, dirs, complete = self.structure_cache.count(path, limit=self.COLLAPSED_COUNT_LIMIT, rules=rules)
+        more = "" if complete else "+"
+        return f"{rel_path}/ [collapsed: {files}{more} files, {dirs}{more} dirs]\n"
+
+    def _fit(self, header, lines, budget):
+        """Join header and as many lines as fit in budget; return (text, tokens)."""
+        if not lines:
+            return "", 0
+        used = estimate_tokens(header)
+        if used >= budget:
+            return "", 0
+        kept = [header]
+        for index, line in enumerate(lines):
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                note = f"... ({len(lines) - index} more lines omitted)\n"
+                if used + estimate_tokens(note) <= budget:
+                    kept.append(note)
+                    used += estimate_tokens(note)
+                break
+            kept.append(line)
+            used += cost
+        if len(kept) == 1:
+            return "", 0
+        return "".join(kept), used
+
+    def _signature_candidates(self, root, recent_files, rules=None):
+        """Return files to summarise: explicitly touched files first, then newest by mtime."""
+        candidates = []
+        seen = set()
+        prefix = root + os.sep
+        extra = self.structure_cache.recent_files(
+            root, self.SIGNATURE_FILES, prune=self._should_collapse, rules=rules
+        )
+        for path in list(recent_files) + extra:
+            path = os.path.abspath(path)
+            if path in seen or not path.startswith(prefix) or not os.path.isfile(path):
+                continue
+            if rules is not None and rules.is_ignored(path, False):
+                continue
+            seen.add(path)
+            candidates.append(path)
+            if len(candidates) >= self.SIGNATURE_FILES:
+                break
+        return candidates
+
+    def _signatures(self, path):
+        """Return the cached signature lines for path, re-extracting them if the file changed."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return []
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._signature_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        signatures = []
+        if stat.st_size <= self.MAX_SIGNATURE_FILE_BYTES:
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    source = f.read()
+                if "\0" not in source[:1024]:
+                    if path.endswith(".py"):
+                        try:
+                            signatures = python_signatures(source)
+                        except (SyntaxError, ValueError):
+                            signatures = generic_signatures(source)
+                    else:
+                        signatures = generic_signatures(source)
+            except OSError:
+                signatures = []
+
+        signatures = signatures[:self.MAX_SIGNATURES_PER_FILE]
+        self._signature_cache[path] = (key, signatures)
+        return signatures
@@ -0,0 +1,136 @@
+import hashlib
+
+
+def _size(message):
+    """Return the size in bytes a message adds to the model history."""
+    return len(message.get("content", "").encode("utf-8")) + len(message.get("name", ""))
+
+
+def history_bytes(history):
+    """Return the size in bytes of the text a Gemini chat holds in its history.
+
+    This is what the model is actually sent each turn: besides the chat
+    messages it includes the project context, retrieved code and tool
+    results wrapped around them. Accepts the SDK's Content objects or the
+    equivalent dicts.
+    """
+    total = 0
+    for content in history:
+        parts = content.get("parts", []) if isinstance(content, dict) else content.parts
+        for part in parts:
+            if isinstance(part, str):
+                text = part
+            elif isinstance(part, dict):
+                text = part.get("text", "")
+            else:
+                text = getattr(part, "text", "") or ""
+            total += len(text.encode("utf-8"))
+    return total
+
+
+class ConversationCompactor:
+    """Shrink chat history before it is replayed to the model.
+
+    The most recent keep_turns user turns are kept verbatim. Older turns are
+    replaced by short summaries, and tool results larger than
+    max_tool_result_bytes are cut down to their head and tail wherever they
+    appear. Summaries are derived from the message text, cached by content
+    hash and reused on every later compaction.
+    """
+
+    OLD_MESSAGE_CHARS = 300
+    HEAD_LINES = 20
+    TAIL_LINES = 10
+
+    def __init__(self, max_bytes=65536, keep_turns=4, max_tool_result_bytes=8192):
+        self.max_bytes = max_bytes
+        self.keep_turns = max(1, keep_turns)
+        self.max_tool_result_bytes = max_tool_result_bytes
+        # (kind, content hash) -> summary text
+        self._summaries = {}
+
+    def raw_bytes(self, messages):
+        """Return the size of messages replayed verbatim."""
+        return sum(_size(message) for message in messages)
+
+    def compact(self, messages):
+        """Return a compacted copy of messages that fits within max_bytes where possible."""
+        if self.raw_bytes(messages) <= self.max_bytes:
+            return list(messages)
+
+        keep_turns = self.keep_turns
+        while True:
+            compacted = self._compact(messages, keep_turns)
+            if self.raw_bytes(compacted) <= self.max_bytes or keep_turns <= 1:
+                return compacted
+            keep_turns -= 1
+
+    def _compact(self, messages, keep_turns):
+        """Summarise everything before the last keep_turns user turns."""
+        boundary = 0
+        seen = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index]["role"] == "user":
+                seen += 1
+                if seen == keep_turns:
+                    boundary = index
+                    break
+
+        compacted = []
+        for index, message in enumerate(messages):
+            content = message.get("content", "")
+            if index < boundary:
+                content = self._summarise_old(message)
+            elif message["role"] == "tool_result" and \
+                    len(content.encode("utf-8")) > self.max_tool_result_bytes:
+                content = self._summarise_tool_result(content)
+            if content is not message.get("content"):
+                message = dict(message, content=content, compacted=True)
+            compacted.append(message)
+        return compacted
+
+    def _cached(self, kind, content, build):
+        """Return the cached summary of content, building it on first use."""
+        key = (kind, hashlib.sha1(content.encode("utf-8")).hexdigest())
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = build(content)
+            self._summaries[key] = summary
+        return summary
+
+    def _summarise_old(self, message):
+        """Return the summary used for a message older than the verbatim window."""
+        content = message.get("content", "")
+        if message["role"] == "tool_result":
+            return self._cached("old_tool", content, self._tool_result_line)
+        if len(content) <= self.OLD_MESSAGE_CHARS:
+            return content
+        return self._cached("old_text", content, self._truncate_text)
+
+    def _summarise_tool_result(self, content):
+        """Return the head/tail summary used for an oversized tool result."""
+        return self._cached("tool", content, self._head_tail)
+
+    def _truncate_text(self, content):
+        omitted = len(content) - self.OLD_MESSAGE_CHARS
+        return f"{content[:self.OLD_MESSAGE_CHARS]} ... [{omitted} characters compacted]"
+
+    def _tool_result_line(self, content):
+        lines = content.splitlines()
+        first = lines[0][:200] if lines else ""
+        return f"{first} [earlier tool result compacted: {len(lines)} lines, " \
+               f"{len(content.encode('utf-8'))} bytes; repeat the call if it is needed again]"
+
+    def _head_tail(self, content):
+        lines = content.splitlines()
+        if len(lines) <= self.HEAD_LINES + self.TAIL_LINES:
+            # Few but very long lines; cut by bytes instead
+            half = self.max_tool_result_bytes // 2
+            omitted = len(content) - 2 * half
+            return f"{content[:half]}\n... [{omitted} characters compacted] ...\n{content[-half:]}"
+        omitted = len(lines) - self.HEAD_LINES - self.TAIL_LINES
+        return "\n".join(
+            lines[:self.HEAD_LINES]
+            + [f"... [{omitted} lines compacted; repeat the call for the full output] ..."]
+            + lines[-self.TAIL_LINES:]
+        )
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config_loader import get_config
+
+
+class DirEntryInfo:
+    """One entry of a cached directory listing, with the stat data taken at scan time."""
+
+    __slots__ = ("name", "path", "is_dir", "is_symlink", "size", "mtime_ns")
+
+    def __init__(self, name, path, is_dir, is_symlink, size, mtime_ns):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.is_symlink = is_symlink
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+
+class DirListing:
+    """The entries of one directory, sorted by name, and the fingerprint they were read at."""
+
+    __slots__ = ("path", "fingerprint", "racy", "entries")
+
+    def __init__(self, path, fingerprint, racy, entries):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.racy = racy
+        self.entries = entries
+
+    @property
+    def dirs(self):
+        return [entry for entry in self.entries if entry.is_dir]
+
+    @property
+    def files(self):
+        return [entry for entry in self.entries if not entry.is_dir]
+
+
+def _scan(path):
+    """Read a directory with os.scandir; returns DirEntryInfo objects sorted by name."""
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_symlink = entry.is_symlink()
+                is_dir = entry.is_dir()
+                info = entry.stat(follow_symlinks=False)
+                size, mtime_ns = info.st_size, info.st_mtime_ns
+            except OSError:
+                is_symlink, is_dir, size, mtime_ns = False, False, 0, 0
+            entries.append(DirEntryInfo(entry.name, entry.path, is_dir, is_symlink, size, mtime_ns))
+    entries.sort(key=lambda entry: entry.name)
+    return entries
+
+
+class DirectoryCache:
+    """Directory listings keyed by absolute path, shared by everything in the process.
+
+    A listing is reused while the directory's (mtime, inode, device) are
+    unchanged, so a hit costs one stat(). A directory modified within
+    RACY_WINDOW_NS of its scan may change again within the same mtime
+    tick, so it is read again on its next use. At most max_entries
+    listings are kept, least recently used dropped first, and our own file
+    operations drop the listings they change through invalidate().
+    """
+
+    RACY_WINDOW_NS = 2 * 10**9
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def listing(self, path):
+        """Return the current DirListing for a directory, or None if it cannot be read."""
+        path = os.path.abspath(path)
+        try:
+            info = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+        fingerprint = (info.st_mtime_ns, info.st_ino, info.st_dev)
+
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached is not None and cached.fingerprint == fingerprint and not cached.racy:
+                self._listings.move_to_end(path)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        try:
+            entries = _scan(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+        listing = DirListing(path, fingerprint, time.time_ns() - info.st_mtime_ns < self.RACY_WINDOW_NS, entries)
+
+        with self._lock:
+            self._listings[path] = listing
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_entries:
+                self._listings.popitem(last=False)
+        return listing
+
+    def entries(self, path):
+        """Return the entries of a directory sorted by name, or [] if it cannot be read."""
+        listing = self.listing(path)
+        return listing.entries if listing is not None else []
+
+    def invalidate(self, path, recursive=True):
+        """Drop the listing of a directory, and with recursive those of everything below it."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if not recursive:
+                self._listings.pop(path, None)
+                return
+            prefix = path.rstrip(os.sep) + os.sep
+            for cached in [p for p in self._listings if p == path or p.startswith(prefix)]:
+                del self._listings[cached]
+
+    def stats(self):
+        """Return cache hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "directories": len(self._listings),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_listeners = []
+# Bumped on every change noticed anywhere, for caches that depend on the whole tree
+_generation = 0
+
+
+def get_directory_cache():
+    """Return the process-wide DirectoryCache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DirectoryCache(int(get_config("dir_cache_entries", 4096)))
+        return _cache
+
+
+def invalidate_path(path):
+    """Note that a file or directory was created, written, deleted or moved by the app.
+
+    The listing of its parent directory is dropped, along with its own (and
+    its subtree's) if it is a directory, and change listeners are told.
+    """
+    cache = get_directory_cache()
+    path = os.path.abspath(path)
+    cache.invalidate(path)
+    cache.invalidate(os.path.dirname(path), recursive=False)
+    note_tree_changed()
+    for listener in list(_listeners):
+        listener(path)
+
+
+def note_tree_changed():
+    """Note a change that was not made through invalidate_path(), e.g. one a rescan found on disk."""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+
+
+def change_generation():
+    """Return a counter that increases whenever anything in any workspace is known to have changed."""
+    return _generation
+
+
+def add_change_listener(listener):
+    """Have listener(path) called with every path passed to invalidate_path()."""
+    _listeners.append(listener)
@@ -0,0 +1,222 @@
+import difflib
+import re
+
+SEARCH_MARKER = "<<<<<<< SEARCH"
+DIVIDER_MARKER = "======="
+REPLACE_MARKER = ">>>>>>> REPLACE"
+
+# "@@ -12,7 +12,8 @@"; the line numbers are optional since they only guide the search
+_HUNK_HEADER = re.compile(r"^@@(?:\s*-(\d+)[^@]*)?\s*@@", re.MULTILINE)
+
+# The old and new line counts of a full hunk header; a count left out is 1
+_HUNK_COUNTS = re.compile(r"^@@\s*-\d+(?:,(\d+))?\s+\+\d+(?:,(\d+))?\s*@@")
+
+
+class EditError(Exception):
+    """Raised when an edit specification cannot be parsed."""
+
+
+class Hunk:
+    """One change: replace old text with new text, optionally near a line number."""
+
+    def __init__(self, old, new, line_hint=None, exact=True):
+        self.old = old
+        self.new = new
+        self.line_hint = line_hint
+        # Search/replace blocks must match exactly once; diff hunks may use the hint
+        self.exact = exact
+
+
+def parse_search_replace(spec):
+    """Parse SEARCH/REPLACE blocks into Hunks."""
+    hunks = []
+    lines = spec.splitlines(keepends=True)
+    index = 0
+    while index < len(lines):
+        if lines[index].strip() != SEARCH_MARKER:
+            index += 1
+            continue
+        old, new = [], []
+        index += 1
+        while index < len(lines) and lines[index].strip() != DIVIDER_MARKER:
+            old.append(lines[index])
+            index += 1
+        index += 1
+        while index < len(lines) and lines[index].strip() != REPLACE_MARKER:
+            new.append(lines[index])
+            index += 1
+        if index >= len(lines):
+            raise EditError(f"Block {len(hunks) + 1} is missing its '{REPLACE_MARKER}' line.")
+        index += 1
+        hunks.append(Hunk("".join(old), "".join(new)))
+    return hunks
+
+
+def parse_unified_diff(spec):
+    """Parse the hunks of a single-file unified diff into Hunks.
+
+    "--- "/"+++ " lines are file headers only outside a hunk; inside one
+    they are removed or added lines such as "-- comment". A hunk ends when
+    the line counts of its header are used up, or, for a header without
+    counts, at a "--- " line directly followed by a "+++ " line.
+    """
+    hunks = []
+    old, new, line_hint = None, None, None
+    # Old and new lines still due in the current hunk, when its header gave counts
+    remaining = None
+
+    def close():
+        if old is not None and (old or new):
+            hunks.append(Hunk("".join(old), "".join(new), line_hint, exact=False))
+
+    lines = spec.splitlines(keepends=True)
+    for index, line in enumerate(lines):
+        header = _HUNK_HEADER.match(line)
+        in_body = remaining is not None and (remaining[0] > 0 or remaining[1] > 0)
+        if header and not in_body:
+            close()
+            old, new = [], []
+            line_hint = int(header.group(1)) if header.group(1) else None
+            counts = _HUNK_COUNTS.match(line)
+            remaining = None
+            if counts:
+                remaining = [int(counts.group(1) or 1), int(counts.group(2) or 1)]
+        elif not in_body and line.startswith("--- ") and index + 1 < len(lines) \
+                and lines[index + 1].startswith("+++ "):
+            # File headers of the next section
+            close()
+            old, new, remaining = None, None, None
+        elif old is None or line.startswith("\\"):
+            continue
+        elif line.startswith("-"):
+            old.append(line[1:])
+            if remaining is not None:
+                remaining[0] -= 1
+        elif line.startswith("+"):
+            new.append(line[1:])
+            if remaining is not None:
+                remaining[1] -= 1
+        else:
+            # Context; a blank line in a diff often loses its leading space
+            text = line[1:] if line.startswith(" ") else line
+            old.append(text)
+            new.append(text)
+            if remaining is not None:
+                remaining[0] -= 1
+                remaining[1] -= 1
+    close()
+    return hunks
+
+
+def parse_edits(spec):
+    """Parse an edit given as SEARCH/REPLACE blocks or as a unified diff."""
+    if SEARCH_MARKER in spec:
+        hunks = parse_search_replace(spec)
+    elif _HUNK_HEADER.search(spec):
+        hunks = parse_unified_diff(spec)
+    else:
+        raise EditError(
+            f"No edits found. Use '{SEARCH_MARKER}' / '{DIVIDER_MARKER}' / '{REPLACE_MARKER}' "
+            "blocks or a unified diff with '@@ -line,count +line,count @@' hunk headers."
+        )
+    if not hunks:
+        raise EditError("The edit contains no hunks.")
+    return hunks
+
+
+def _occurrences(text, old):
+    """Return the start offset of every occurrence of old in text."""
+    positions = []
+    position = text.find(old)
+    while position >= 0:
+        positions.append(position)
+        position = text.find(old, position + 1)
+    return positions
+
+
+def _closest_line(text, old):
+    """Describe the line of text most like the first line of old, for conflict reports."""
+    wanted = next((line.strip() for line in old.splitlines() if line.strip()), "")
+    lines = [line.strip() for line in text.splitlines()]
+    close = difflib.get_close_matches(wanted, lines, n=1, cutoff=0.6)
+    if not close:
+        return ""
+    return f"; the closest line is {lines.index(close[0]) + 1}: {close[0][:120]!r}"
+
+
+def apply_hunks(text, hunks):
+    """Apply hunks to text in one pass.
+
+    Every hunk is located in the original text first. A hunk whose old text
+    is missing, or (for SEARCH/REPLACE blocks) appears more than once, or
+    that overlaps an earlier hunk is a conflict. Returns (new_text, report)
+    where report has one line per hunk; new_text is None if any hunk
+    conflicted, and then nothing should be written.
+    """
+    crlf = "\r\n" in text
+    report = []
+    spans = []
+    conflict = False
+
+    for number, hunk in enumerate(hunks, 1):
+        old, new = hunk.old, hunk.new
+        if crlf:
+            old = old.replace("\r\n", "\n").replace("\n", "\r\n")
+            new = new.replace("\r\n", "\n").replace("\n", "\r\n")
+
+        if not old:
+            if text:
+                report.append(f"Hunk {number}: CONFLICT - empty search text only works on an empty or new file")
+                conflict = True
+            else:
+                spans.append((0, 0, new, number))
+                report.append(f"Hunk {number}: applied (new content)")
+            continue
+
+        positions = _occurrences(text, old)
+        if not positions and not text.endswith("\n") and old.endswith("\n"):
+            # The last line of the file has no newline
+            positions = [p for p in _occurrences(text + "\n", old) if p + len(old) == len(text) + 1]
+            if positions:
+                old = old[:-1]
+                if new.endswith("\n"):
+                    new = new[:-1]
+
+        if not positions:
+            report.append(f"Hunk {number}: CONFLICT - text to replace not found{_closest_line(text, old)}")
+            conflict = True
+            continue
+        if len(positions) > 1 and hunk.exact:
+            lines = ", ".join(str(text.count("\n", 0, p) + 1) for p in positions[:5])
+            report.append(
+                f"Hunk {number}: CONFLICT - text to replace appears {len(positions)} times "
+                f"(lines {lines}); include more surrounding lines"
+            )
+            conflict = True
+            continue
+
+        if len(positions) > 1:
+            hint = hunk.line_hint or 1
+            start = min(positions, key=lambda p: abs(text.count("\n", 0, p) + 1 - hint))
+        else:
+            start = positions[0]
+        spans.append((start, start + len(old), new, number))
+        line = text.count("\n", 0, start) + 1
+        report.append(f"Hunk {number}: applied at line {line}")
+
+    spans.sort()
+    for (_, previous_end, _, previous), (start, _, _, number) in zip(spans, spans[1:]):
+        if start < previous_end:
+            report[number - 1] = f"Hunk {number}: CONFLICT - overlaps hunk {previous}"
+            conflict = True
+    if conflict:
+        return None, report
+
+    parts = []
+    position = 0
+    for start, end, new, _ in spans:
+        parts.append(text[position:start])
+        parts.append(new)
+        position = end
+    parts.append(text[position:])
+    return "".join(parts), report
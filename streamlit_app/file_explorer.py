@@ -1,86 +1,103 @@
 import streamlit as st
 import os
+import re
+import time
 import tempfile
 from pathlib import Path
 import shutil
 from io import StringIO
 
+from dir_cache import get_directory_cache, invalidate_path
+from ignore_rules import get_ignore_rules
+from quick_open import get_path_index
+from search_index import get_search_index
+
+# Render the tree as a single client-side component when it is installed
+try:
+    from streamlit_tree_select import tree_select
+    TREE_SELECT_AVAILABLE = True
+except ImportError:
+    TREE_SELECT_AVAILABLE = False
+
+# Entries of a directory sent to the tree at a time; the rest load on "show more"
+TREE_PAGE_SIZE = 200
+
+# Prefixes of the values of the tree's placeholder nodes, which are not paths
+_MORE_NODE = "more::"
+_STUB_NODE = "stub::"
+
+def _tree_node(entry):
+    """Return the file-tree node for a cached directory entry."""
+    return {
+        "name": entry.name,
+        "type": "directory" if entry.is_dir else "file",
+        "path": entry.path,
+        "size": entry.size,
+        "mtime": entry.mtime_ns / 1e9,
+        "children": []
+    }
+
+def iter_file_tree(root_path, max_depth=None, rules=None):
+    """Yield (parent_path, node) for everything under root_path, one directory at a time.
+    
+    Each directory's listing comes from the shared directory cache (one
+    os.scandir when it is not cached or has changed), and its entries are
+    yielded together, directories first and each group sorted by name,
+    before any of its subdirectories are read, so callers can use nodes
+    while the walk goes on. max_depth limits how many levels are read (1
+    is root_path's own entries only). Entries matched by rules (an
+    IgnoreRules for the workspace) are left out and ignored directories
+    are never read. Symlinked directories are listed but not followed, and
+    unreadable directories are skipped.
+    """
+    cache = get_directory_cache()
+    stack = [(root_path, 1)]
+    while stack:
+        dir_path, depth = stack.pop()
+        listing = cache.listing(dir_path)
+        if listing is None:
+            continue
+        base = rules.relative(dir_path) if rules is not None else None
+        subdirs = []
+        for entry in listing.dirs + listing.files:
+            if rules is not None and rules.match(f"{base}/{entry.name}" if base else entry.name, entry.is_dir):
+                continue
+            yield dir_path, _tree_node(entry)
+            if entry.is_dir and not entry.is_symlink:
+                subdirs.append(entry.path)
+        if max_depth is None or depth < max_depth:
+            # Reversed so the stack reads subdirectories in name order
+            stack.extend((path, depth + 1) for path in reversed(subdirs))
+
+def build_file_tree(root_path, max_depth=None, rules=None):
+    """Return the nested node list for root_path in one pass over iter_file_tree.
+    
+    Directory nodes are found through a path -> node dictionary, so each
+    entry costs the same however deep or wide the tree is.
+    """
+    file_tree = []
+    children_of = {root_path: file_tree}
+    for parent_path, node in iter_file_tree(root_path, max_depth, rules):
+        children_of[parent_path].append(node)
+        if node["type"] == "directory":
+            children_of[node["path"]] = node["children"]
+    return file_tree
+
 class FileExplorer:
     def __init__(self, root_path):
         self.root_path = root_path
+        if 'file_tree_pages' not in st.session_state:
+            st.session_state.file_tree_pages = {}
+        if 'file_tree_checked' not in st.session_state:
+            st.session_state.file_tree_checked = []
         
-    def get_file_tree(self):
-        """Generate a tree structure of files and directories."""
-        file_tree = []
-        
-        for root, dirs, files in os.walk(self.root_path):
-            rel_path = os.path.relpath(root, self.root_path)
-            if rel_path == ".":
-                # Root directory
-                for dir_name in sorted(dirs):
-                    file_tree.append({
-                        "name": dir_name,
-                        "type": "directory",
-                        "path": os.path.join(self.root_path, dir_name),
-                        "children": []
-                    })
-                
-                for file_name in sorted(files):
-                    file_tree.append({
-                        "name": file_name,
-                        "type": "file",
-                        "path": os.path.join(self.root_path, file_name),
-                        "children": []
-                    })
-            else:
-                # Process subdirectories
-                parent_path = os.path.dirname(rel_path)
-                dir_name = os.path.basename(rel_path)
-                
-                # Find parent node
-                parent_node = self._find_node(file_tree, parent_path)
-                
-                if parent_node:
-                    # Add current directory
-                    dir_node = {
-                        "name": dir_name,
-                        "type": "directory",
-                        "path": os.path.join(self.root_path, rel_path),
-                        "children": []
-                    }
-                    parent_node["children"].append(dir_node)
-                    
-                    # Add files in this directory
-                    for file_name in sorted(files):
-                        dir_node["children"].append({
-                            "name": file_name,
-                            "type": "file",
-                            "path": os.path.join(self.root_path, rel_path, file_name),
-                            "children": []
-                        })
-        
-        return file_tree
+    def get_file_tree(self, max_depth=None):
+        """Generate a tree structure of the files and directories not ignored (see build_file_tree)."""
+        return build_file_tree(self.root_path, max_depth, get_ignore_rules(self.root_path))
     
-    def _find_node(self, tree, path):
-        """Find a node in the tree by path."""
-        if path == ".":
-            return {"children": tree}
-        
-        parts = path.split(os.path.sep)
-        current_tree = tree
-        
-        for part in parts:
-            found = False
-            for node in current_tree:
-                if node["type"] == "directory" and node["name"] == part:
-                    current_tree = node["children"]
-                    found = True
-                    break
-            
-            if not found:
-                return None
-        
-        return {"children": current_tree}
+    def iter_file_tree(self, max_depth=None):
+        """Yield (parent_path, node) pairs as the walk finds them (see iter_file_tree)."""
+        return iter_file_tree(self.root_path, max_depth, get_ignore_rules(self.root_path))
     
     def render(self):
         """Render the file explorer in Streamlit."""
@@ -116,6 +133,7 @@ class FileExplorer:
                     try:
                         with open(file_path, 'w') as f:
                             f.write(initial_content)
+                        invalidate_path(file_path)
                         st.success(f"Created file: {new_file_name}")
                         st.session_state.new_file_dialog = False
                         st.rerun()  # Changed from st.experimental_rerun()
@@ -139,6 +157,7 @@ class FileExplorer:
                     folder_path = os.path.join(self.root_path, new_folder_name)
                     try:
                         os.makedirs(folder_path, exist_ok=True)
+                        invalidate_path(folder_path)
                         st.success(f"Created folder: {new_folder_name}")
                         st.session_state.new_folder_dialog = False
                         st.rerun()  # Changed from st.experimental_rerun()
@@ -162,6 +181,7 @@ class FileExplorer:
                 try:
                     with open(file_path, "wb") as f:
                         f.write(uploaded_file.getbuffer())
+                    invalidate_path(file_path)
                     st.success(f"Uploaded file: {uploaded_file.name}")
                     st.session_state.upload_file_dialog = False
                     st.rerun()  # Changed from st.experimental_rerun()
@@ -173,13 +193,23 @@ class FileExplorer:
                 st.rerun()  # Changed from st.experimental_rerun()
         
         # Display file tree
+        if TREE_SELECT_AVAILABLE:
+            return self._render_tree()
+        return self._render_expanders()
+    
+    def _render_expanders(self):
+        """Render the tree as nested expanders (used when streamlit-tree-select is missing)."""
         try:
-            files = os.listdir(self.root_path)
+            listing = get_directory_cache().listing(self.root_path)
+            if listing is None:
+                raise OSError(f"cannot read {self.root_path}")
             selected_file = None
             
-            for file in sorted(files):
-                file_path = os.path.join(self.root_path, file)
-                is_dir = os.path.isdir(file_path)
+            rules = get_ignore_rules(self.root_path)
+            for entry in listing.entries:
+                file, file_path, is_dir = entry.name, entry.path, entry.is_dir
+                if rules.is_ignored(file_path, is_dir):
+                    continue
                 icon = "📁" if is_dir else "📄"
                 
                 if is_dir:
@@ -198,15 +228,146 @@ class FileExplorer:
             st.error(f"Error accessing files: {str(e)}")
             return None
     
+    def _list_children(self, dir_path):
+        """Return the file-tree nodes directly inside dir_path, directories first."""
+        rules = get_ignore_rules(self.root_path)
+        return [node for _, node in iter_file_tree(dir_path, max_depth=1, rules=rules)]
+    
+    def _tree_nodes(self, dir_path, expanded):
+        """Build tree-select nodes for dir_path, descending only into expanded directories."""
+        children = self._list_children(dir_path)
+        shown = st.session_state.file_tree_pages.get(dir_path, 1) * TREE_PAGE_SIZE
+        nodes = []
+        for child in children[:shown]:
+            if child["type"] == "directory":
+                if child["path"] in expanded:
+                    grandchildren = self._tree_nodes(child["path"], expanded) or [
+                        {"label": "(empty)", "value": _STUB_NODE + child["path"], "disabled": True}
+                    ]
+                else:
+                    # A placeholder gives the directory an expand arrow without listing it
+                    grandchildren = [{"label": "...", "value": _STUB_NODE + child["path"], "disabled": True}]
+                nodes.append({"label": f"📁 {child['name']}", "value": child["path"], "children": grandchildren})
+            else:
+                nodes.append({"label": f"📄 {child['name']}", "value": child["path"]})
+        remaining = len(children) - shown
+        if remaining > 0:
+            nodes.append({
+                "label": f"⋯ show {min(remaining, TREE_PAGE_SIZE)} more ({remaining} not shown)",
+                "value": _MORE_NODE + dir_path
+            })
+        return nodes
+    
+    def _render_tree(self):
+        """Render the tree as one streamlit-tree-select component; returns a newly checked file.
+        
+        Checking a file opens it and checking a "show more" node loads the
+        next page of that directory; "show more" and placeholder values are
+        never kept checked, so every click on "show more" is a new one.
+        Only directories the user has expanded are listed, so a rerun costs
+        a stat per expanded directory rather than a walk of the project.
+        """
+        state = st.session_state.get("file_tree") or {}
+        expanded = set(state.get("expanded", []))
+        nodes = self._tree_nodes(self.root_path, expanded)
+        if not nodes:
+            st.caption("(empty project)")
+            return None
+        
+        result = tree_select(
+            nodes,
+            checked=st.session_state.file_tree_checked,
+            expanded=sorted(expanded),
+            only_leaf_checkboxes=True,
+            no_cascade=True,
+            key="file_tree"
+        ) or {}
+        checked = [
+            value for value in result.get("checked", [])
+            if not value.startswith(_MORE_NODE) and not value.startswith(_STUB_NODE)
+        ]
+        more_clicked = [value for value in result.get("checked", []) if value.startswith(_MORE_NODE)]
+        newly_checked = [value for value in checked if value not in st.session_state.file_tree_checked]
+        
+        selected_file = None
+        for value in newly_checked:
+            if os.path.isfile(value):
+                selected_file = value
+        st.session_state.file_tree_checked = checked
+        if more_clicked:
+            pages = st.session_state.file_tree_pages
+            for value in more_clicked:
+                dir_path = value[len(_MORE_NODE):]
+                pages[dir_path] = pages.get(dir_path, 1) + 1
+            st.rerun()
+        return selected_file
+    
+    def render_search(self):
+        """Render a search box over file contents; returns the file whose result was clicked."""
+        query = st.text_input("🔍 Search in files", key="file_search_query")
+        col1, col2 = st.columns(2)
+        regex = col1.checkbox("Regex", key="file_search_regex")
+        case_sensitive = col2.checkbox("Match case", key="file_search_case")
+        include = st.text_input("Files to include", placeholder="e.g. *.py, src/*", key="file_search_include")
+        
+        if not query:
+            return None
+        
+        try:
+            index = get_search_index(self.root_path)
+            with st.spinner("Searching..."):
+                started = time.perf_counter()
+                matches, candidate_count = index.search(
+                    query, regex=regex, case_sensitive=case_sensitive, include=include,
+                    context_lines=0, max_results=100
+                )
+                elapsed = time.perf_counter() - started
+        except re.error as e:
+            st.error(f"Invalid regular expression: {str(e)}")
+            return None
+        
+        st.caption(f"{len(matches)} matches in {candidate_count} candidate files ({elapsed * 1000:.0f} ms)")
+        selected_file = None
+        for number, match in enumerate(matches):
+            label = f"{match.path}:{match.line_number}  {match.line.strip()[:60]}"
+            if st.button(label, key=f"search_result_{number}"):
+                selected_file = os.path.join(self.root_path, match.path)
+        return selected_file
+    
+    def render_quick_open(self):
+        """Render a fuzzy file-name finder; returns the file whose result was clicked."""
+        query = st.text_input("📂 Go to file", placeholder="e.g. srvcfg.py", key="quick_open_query")
+        
+        index = get_path_index(self.root_path)
+        started = time.perf_counter()
+        matches = index.search(query, recent=st.session_state.get("recent_files", []))
+        elapsed = time.perf_counter() - started
+        if not query and not matches:
+            return None
+        
+        if query:
+            st.caption(f"{len(matches)} of {len(index)} files ({elapsed * 1000:.0f} ms)")
+        else:
+            st.caption("Recently opened")
+        selected_file = None
+        for number, match in enumerate(matches):
+            if st.button(match.path, key=f"quick_open_result_{number}"):
+                selected_file = os.path.join(self.root_path, match.path)
+        return selected_file
+    
     def _render_subdirectory(self, dir_path, indent):
         """Recursively render subdirectories."""
         try:
-            files = os.listdir(dir_path)
+            listing = get_directory_cache().listing(dir_path)
+            if listing is None:
+                raise OSError(f"cannot read {dir_path}")
             selected_file = None
             
-            for file in sorted(files):
-                file_path = os.path.join(dir_path, file)
-                is_dir = os.path.isdir(file_path)
+            rules = get_ignore_rules(self.root_path)
+            for entry in listing.entries:
+                file, file_path, is_dir = entry.name, entry.path, entry.is_dir
+                if rules.is_ignored(file_path, is_dir):
+                    continue
                 icon = "📁" if is_dir else "📄"
                 
                 if is_dir:
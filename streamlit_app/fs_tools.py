@@ -0,0 +1,266 @@
+import fnmatch
+import mmap
+import os
+import shutil
+import tempfile
+
+from dir_cache import get_directory_cache
+
+# Default cap on the bytes a single read_file call returns
+DEFAULT_MAX_BYTES = 64 * 1024
+
+# Bytes inspected to decide whether a file is binary
+SNIFF_BYTES = 8192
+
+# Files at least this large are memory-mapped instead of read whole
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def is_binary(sample):
+    """Guess whether a leading chunk of file bytes is binary rather than text."""
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+        return False
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        if e.start >= len(sample) - 3:
+            return False
+    # Not UTF-8: call it binary when control characters are common
+    control = sum(1 for byte in sample if byte < 32 and byte not in (9, 10, 12, 13))
+    return control / len(sample) > 0.1
+
+
+class FileWindow:
+    """The part of a file returned by read_file_window."""
+
+    def __init__(self, size, binary=False, text="", offset=0, end_offset=0,
+                 start_line=None, end_line=None, truncated=False):
+        self.size = size
+        self.binary = binary
+        self.text = text
+        self.offset = offset
+        self.end_offset = end_offset
+        self.start_line = start_line
+        self.end_line = end_line
+        self.truncated = truncated
+
+
+def _line_offset(data, line, start=0, size=None):
+    """Return the byte offset where the given 1-based line begins, or size if past the end."""
+    size = len(data) if size is None else size
+    position = start
+    for _ in range(line - 1):
+        newline = data.find(b"\n", position)
+        if newline < 0:
+            return size
+        position = newline + 1
+    return position
+
+
+def read_file_window(path, start_line=None, end_line=None, offset=None, length=None,
+                     max_bytes=DEFAULT_MAX_BYTES):
+    """Read part of a file without loading the rest of it.
+
+    A line range (1-based, inclusive) takes precedence over a byte range.
+    At most max_bytes are returned; when more was asked for the window is
+    cut at the last complete line and marked truncated. Files of
+    MMAP_THRESHOLD bytes or more are memory-mapped so only the requested
+    window is paged in. Binary files are detected from their first bytes
+    and never decoded.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if is_binary(f.read(SNIFF_BYTES)):
+            return FileWindow(size, binary=True)
+        if size == 0:
+            return FileWindow(0)
+
+        if size >= MMAP_THRESHOLD:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            data = f.read()
+
+        try:
+            if start_line is not None or end_line is not None:
+                first_line = max(1, int(start_line or 1))
+                begin = _line_offset(data, first_line, size=size)
+                if end_line is not None:
+                    wanted_end = _line_offset(data, int(end_line) - first_line + 2, begin, size)
+                else:
+                    wanted_end = size
+            else:
+                begin = min(max(0, int(offset or 0)), size)
+                wanted_end = size if length is None else min(size, begin + max(0, int(length)))
+                first_line = None
+
+            end = min(wanted_end, begin + max_bytes)
+            truncated = end < wanted_end
+            if truncated:
+                # Cut at the last complete line when there is one
+                newline = data.rfind(b"\n", begin, end)
+                if newline >= 0:
+                    end = newline + 1
+
+            text = data[begin:end].decode("utf-8", errors="replace")
+            window = FileWindow(size, text=text, offset=begin, end_offset=end, truncated=truncated)
+            if first_line is not None:
+                window.start_line = first_line
+                window.end_line = first_line + text.count("\n") - (1 if text.endswith("\n") else 0)
+            return window
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def format_file_window(rel_path, window, max_bytes=DEFAULT_MAX_BYTES):
+    """Format a FileWindow as the read_file tool result."""
+    if window.binary:
+        return f"File '{rel_path}' is binary ({window.size} bytes); its content was not decoded."
+
+    if window.start_line is not None:
+        span = f"lines {window.start_line}-{window.end_line}"
+    elif window.offset or window.end_offset < window.size:
+        span = f"bytes {window.offset}-{window.end_offset}"
+    else:
+        span = None
+    header = f"Content of {rel_path}"
+    if span:
+        header += f" ({span}; file size {window.size} bytes)"
+    result = f"{header}:\n\n```\n{window.text}\n```"
+
+    if window.truncated:
+        result += (
+            f"\n\n[Output truncated at {max_bytes // 1024} KB, ending at byte {window.end_offset} "
+            f"of {window.size}. Request the rest with start_line/end_line or offset/length.]"
+        )
+    return result
+
+
+def atomic_write(path, text):
+    """Write text to path through a temporary file and a rename.
+
+    Readers see either the old or the new content, never a partial file.
+    Line endings are written exactly as given, and an existing file keeps
+    its permission bits.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Default and maximum number of entries in one list_directory page
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def glob_patterns(value):
+    """Accept a single glob or a list of globs."""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return tuple(part.strip() for part in value.split(",") if part.strip())
+    return tuple(value)
+
+
+def matches_globs(rel_path, name, patterns):
+    """Return True if a path or its file name matches any of the glob patterns."""
+    return any(fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def iter_directory(root, depth=1, include=(), exclude=(), after=None, rules=None):
+    """Yield (rel_path, is_dir, size) under root in sorted depth-first order.
+
+    Listings come from the shared directory cache, so a directory that has
+    not changed since it was last listed costs a single stat call. Entries
+    matching an exclude glob or ignored by rules (the IgnoreRules of the
+    workspace that root lies in) are skipped, and such directories are not
+    descended into. With include globs only
+    matching files are yielded; directories are still walked. after is a
+    cursor: entries up to and including that relative path are skipped
+    without listing the subtrees that lie wholly before it.
+    """
+    include = glob_patterns(include)
+    exclude = glob_patterns(exclude)
+    after_parts = tuple(after.split("/")) if after else None
+    base = rules.relative(root) if rules is not None else None
+
+    cache = get_directory_cache()
+    stack = [("", iter(cache.entries(root)), 1)]
+    while stack:
+        prefix, entries, level = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        rel_path = prefix + entry.name
+        if matches_globs(rel_path, entry.name, exclude):
+            continue
+        is_dir = entry.is_dir and not entry.is_symlink
+        if rules is not None and rules.match(f"{base}/{rel_path}" if base else rel_path, entry.is_dir):
+            continue
+
+        parts = tuple(rel_path.split("/"))
+        skip = False
+        if after_parts is not None and parts <= after_parts:
+            # Already returned; only descend if the cursor lies inside this directory
+            if not (is_dir and after_parts[:len(parts)] == parts):
+                continue
+            skip = True
+
+        if not skip:
+            if is_dir:
+                if not include:
+                    yield rel_path, True, None
+            elif not include or matches_globs(rel_path, entry.name, include):
+                yield rel_path, False, entry.size
+
+        if is_dir and level < depth:
+            stack.append((rel_path + "/", iter(cache.entries(entry.path)), level + 1))
+
+
+def list_directory_page(root, depth=1, include=(), exclude=(), cursor=None, limit=DEFAULT_PAGE_SIZE,
+                        rules=None):
+    """Return (rows, next_cursor) for one page of iter_directory; next_cursor is None on the last page."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    rows = []
+    for row in iter_directory(root, depth, include, exclude, after=cursor, rules=rules):
+        if len(rows) == limit:
+            return rows, rows[-1][0]
+        rows.append(row)
+    return rows, None
+
+
+def format_directory_listing(rel_root, rows, next_cursor):
+    """Encode a listing page as compact tab-separated rows for the model."""
+    lines = [f"# {rel_root}: type<TAB>size<TAB>path (d=directory, f=file, size in bytes)"]
+    for rel_path, is_dir, size in rows:
+        if is_dir:
+            lines.append(f"d\t-\t{rel_path}/")
+        else:
+            lines.append(f"f\t{'-' if size is None else size}\t{rel_path}")
+    if next_cursor:
+        lines.append(f'# more entries follow; call again with cursor="{next_cursor}"')
+    else:
+        lines.append(f"# {len(rows)} entries")
+    return "\n".join(lines)
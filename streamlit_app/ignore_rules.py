@@ -0,0 +1,206 @@
+import os
+import re
+import threading
+
+# Files in the workspace root whose patterns are honoured, later ones taking precedence
+IGNORE_FILES = (".gitignore", ".clineignore")
+
+# Always ignored unless an ignore file negates them (e.g. "!node_modules/")
+DEFAULT_PATTERNS = (".git/", "__pycache__/", "node_modules/", ".venv/", "venv/")
+
+
+def _glob_to_regex(glob):
+    """Translate the glob part of a gitignore pattern into a regex matching a /-separated path."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if c == "*":
+            if glob.startswith("**", i) and (i == 0 or glob[i - 1] == "/"):
+                if i + 2 == n:
+                    # "dir/**" is everything inside dir, not dir itself
+                    out.append(".+")
+                    i += 2
+                    continue
+                if glob[i + 2] == "/":
+                    # "**/" is zero or more whole directories
+                    out.append("(?:[^/]*/)*")
+                    i += 3
+                    continue
+            while i + 1 < n and glob[i + 1] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and glob[j] in "!^":
+                j += 1
+            if j < n and glob[j] == "]":
+                j += 1
+            while j < n and glob[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:j].replace("\\", "\\\\")
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_pattern(line):
+    """Return (regex, negated) for one gitignore line, or None for blanks and comments.
+
+    The regex matches a path relative to the workspace root, with a
+    trailing "/" when the path is a directory.
+    """
+    line = line.rstrip("\n")
+    if not line.endswith("\\ "):
+        line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated or line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    # A slash anywhere but the end anchors the pattern to the root; otherwise it matches at any depth
+    anchored = "/" in line
+    body = _glob_to_regex(line.lstrip("/"))
+    prefix = "" if anchored else "(?:.*/)?"
+    suffix = "/" if dir_only else "/?"
+    return prefix + body + suffix + r"\Z", negated
+
+
+class IgnoreRules:
+    """Gitignore-style rules for one workspace, compiled into a single regex.
+
+    Every rule becomes one named alternative of the regex, last rule
+    first, so the first alternative that matches is the rule gitignore
+    would apply (the last matching one) and a single match decides a path.
+    Walkers call match() for each entry and skip ignored directories
+    without listing them, which also gives gitignore's rule that nothing
+    inside an ignored directory can be re-included. Only the ignore files
+    in the workspace root are read, and a pattern that does not compile is
+    left out rather than disabling the rest.
+    """
+
+    def __init__(self, root, patterns=(), fingerprint=None):
+        self.root = os.path.abspath(root)
+        self.fingerprint = fingerprint
+        self.patterns = list(patterns)
+        alternatives = []
+        for index, pattern in enumerate(self.patterns):
+            parsed = parse_pattern(pattern)
+            if parsed is None:
+                continue
+            regex, negated = parsed
+            try:
+                re.compile(regex)
+            except re.error:
+                # e.g. a reversed range like [z-a]; git never matches such a pattern either
+                continue
+            alternatives.append(f"(?P<{'keep' if negated else 'skip'}{index}>{regex})")
+        alternatives.reverse()
+        self._regex = re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def load(cls, root, fingerprint=None):
+        """Build the rules for root from DEFAULT_PATTERNS and its ignore files."""
+        patterns = list(DEFAULT_PATTERNS)
+        for name in IGNORE_FILES:
+            try:
+                with open(os.path.join(root, name), "r", encoding="utf-8", errors="replace") as f:
+                    patterns.extend(f.read().splitlines())
+            except OSError:
+                continue
+        return cls(root, patterns, fingerprint)
+
+    def match(self, rel_path, is_dir=False):
+        """Return True if rules ignore this entry; rel_path is /-separated and relative to root.
+
+        Only the entry itself is checked, as a walker that prunes ignored
+        directories needs; use is_ignored for an arbitrary path.
+        """
+        if self._regex is None:
+            return False
+        match = self._regex.match(rel_path + "/" if is_dir else rel_path)
+        return match is not None and match.lastgroup.startswith("skip")
+
+    def is_ignored(self, path, is_dir=None):
+        """Return True if a path (absolute, or relative to root) or any directory above it is ignored."""
+        rel_path = self.relative(path)
+        if rel_path is None:
+            return False
+        if is_dir is None:
+            is_dir = os.path.isdir(os.path.join(self.root, rel_path))
+        parts = rel_path.split("/")
+        for depth in range(1, len(parts)):
+            if self.match("/".join(parts[:depth]), True):
+                return True
+        return self.match(rel_path, is_dir)
+
+    def relative(self, path):
+        """Return path relative to root with / separators, or None if it is outside root (or is root)."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        path = path.replace(os.sep, "/")
+        if path == "." or path == ".." or path.startswith("../"):
+            return None
+        return path
+
+
+def walk_files(directory, rules, hidden=True):
+    """Yield the absolute paths of files under directory that rules do not ignore.
+
+    Ignored directories are removed from os.walk's list as it goes, so
+    they are never read. With hidden off, names starting with "." are
+    skipped the same way.
+    """
+    for root, dirs, files in os.walk(os.path.abspath(directory)):
+        base = rules.relative(root)
+        prefix = base + "/" if base else ""
+        dirs[:] = sorted(
+            name for name in dirs
+            if (hidden or not name.startswith(".")) and not rules.match(prefix + name, True)
+        )
+        for name in sorted(files):
+            if (hidden or not name.startswith(".")) and not rules.match(prefix + name):
+                yield os.path.join(root, name)
+
+
+_rules = {}
+_rules_lock = threading.Lock()
+
+
+def _fingerprint(root):
+    fingerprint = []
+    for name in IGNORE_FILES:
+        try:
+            info = os.stat(os.path.join(root, name))
+            fingerprint.append((info.st_mtime_ns, info.st_size))
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+
+def get_ignore_rules(root):
+    """Return the IgnoreRules for a workspace, reloading them when an ignore file changes."""
+    root = os.path.abspath(root)
+    fingerprint = _fingerprint(root)
+    with _rules_lock:
+        rules = _rules.get(root)
+        if rules is None or rules.fingerprint != fingerprint:
+            rules = _rules[root] = IgnoreRules.load(root, fingerprint)
+        return rules
@@ -0,0 +1,171 @@
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+
+from command_runner import IS_WINDOWS, kill_process_group, popen_group_kwargs
+
+
+class Job:
+    """A command running detached from the Streamlit script, with its output in a log file."""
+
+    def __init__(self, job_id, command, cwd, log_path, process):
+        self.id = job_id
+        self.command = command
+        self.cwd = cwd
+        self.log_path = log_path
+        self.process = process
+        self.started = time.time()
+        self.ended = None
+
+    @property
+    def returncode(self):
+        return self.process.poll()
+
+    @property
+    def running(self):
+        return self.returncode is None
+
+    @property
+    def status(self):
+        code = self.returncode
+        if code is None:
+            return "running"
+        if code < 0:
+            return f"killed by signal {-code}"
+        return f"exited with code {code}"
+
+    @property
+    def runtime(self):
+        return (self.ended or time.time()) - self.started
+
+
+def _stop_all(jobs, log_dir):
+    """Kill every job and delete the logs; runs when the manager is collected or at exit."""
+    for job in list(jobs.values()):
+        kill_process_group(job.process, grace=1.0)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+class JobManager:
+    """Start, watch and stop long-running commands for one session.
+
+    Each job runs in its own process group with stdout and stderr going
+    straight to a log file, so it needs no reader thread and keeps running
+    across Streamlit reruns. Jobs are killed and their logs removed when
+    the manager is garbage-collected with the session, or when the app
+    exits.
+    """
+
+    def __init__(self, log_dir=None):
+        self.log_dir = log_dir or tempfile.mkdtemp(prefix="cline-jobs-")
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _stop_all, self._jobs, self.log_dir)
+
+    def start(self, command, cwd):
+        """Start a command in the background and return its Job."""
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+            log_path = os.path.join(self.log_dir, f"job-{job_id}.log")
+            with open(log_path, "wb") as log:
+                process = subprocess.Popen(
+                    command,
+                    shell=True,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    cwd=cwd,
+                    **popen_group_kwargs()
+                )
+            job = Job(job_id, command, cwd, log_path, process)
+            self._jobs[job_id] = job
+            return job
+
+    def get(self, job_id):
+        """Return the job with the given id (int or numeric string), or None."""
+        try:
+            return self._jobs.get(int(job_id))
+        except (TypeError, ValueError):
+            return None
+
+    def jobs(self):
+        """Return every job, oldest first, after noting which have finished."""
+        self.reap()
+        return [self._jobs[job_id] for job_id in sorted(self._jobs)]
+
+    def reap(self):
+        """Collect the exit status of finished jobs."""
+        for job in list(self._jobs.values()):
+            if job.ended is None and job.returncode is not None:
+                job.ended = time.time()
+
+    def tail(self, job_id, max_bytes=8192):
+        """Return the last max_bytes of a job's log, starting at a line boundary."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        try:
+            with open(job.log_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - max_bytes))
+                data = f.read()
+        except OSError:
+            return ""
+        if size > max_bytes:
+            newline = data.find(b"\n")
+            if 0 <= newline < len(data) - 1:
+                data = data[newline + 1:]
+        return data.decode("utf-8", errors="replace")
+
+    def signal(self, job_id, sig):
+        """Send a signal to a job's whole process group; returns False if it is not running."""
+        job = self.get(job_id)
+        if job is None or not job.running:
+            return False
+        if IS_WINDOWS:
+            if sig == signal.SIGINT:
+                job.process.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                kill_process_group(job.process)
+        else:
+            os.killpg(job.process.pid, sig)
+        return True
+
+    def stop(self, job_id, force=False):
+        """Stop a job: SIGTERM then SIGKILL, or SIGKILL at once with force. Returns False if not running."""
+        job = self.get(job_id)
+        if job is None or not job.running:
+            return False
+        kill_process_group(job.process, grace=0 if force else 5.0)
+        self.reap()
+        return True
+
+    def remove(self, job_id):
+        """Forget a finished job and delete its log; returns False if it is still running."""
+        job = self.get(job_id)
+        if job is None or job.running:
+            return False
+        del self._jobs[job.id]
+        try:
+            os.remove(job.log_path)
+        except OSError:
+            pass
+        return True
+
+    def shutdown(self):
+        """Kill all jobs and delete the logs now."""
+        self._finalizer()
+
+
+def format_job(job):
+    """Describe a job in one line."""
+    return f"[{job.id}] {job.status} after {job.runtime:.0f}s (pid {job.process.pid}): {job.command}"
@@ -0,0 +1,212 @@
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+STREAMS = ("stdout", "stderr")
+
+# Bytes of the start and end of a stream kept in previews, and bytes per page
+HEAD_BYTES = 4096
+TAIL_BYTES = 16384
+PAGE_BYTES = 64 * 1024
+
+
+def _decode(data):
+    return data.decode("utf-8", errors="replace")
+
+
+class SpooledOutput:
+    """The stdout and stderr of one command, written to disk as they arrive.
+
+    Only a short tail is held in memory (for live display); everything else
+    is read back from the files on demand. Pages and searches go through
+    mmap so a 200 MB log costs no more memory than the page being shown.
+    """
+
+    LIVE_CHARS = 20000
+
+    def __init__(self, output_id, command, directory):
+        self.id = output_id
+        self.command = command
+        self.started = time.time()
+        self.finished = None
+        self.paths = {stream: os.path.join(directory, f"{output_id}.{stream}") for stream in STREAMS}
+        self._files = {
+            stream: open(path, "w", encoding="utf-8", errors="replace", newline="")
+            for stream, path in self.paths.items()
+        }
+        self.live_tail = ""
+
+    def write(self, stream, text):
+        """Append output to a stream's file and to the live tail."""
+        self._files[stream].write(text)
+        self.live_tail = (self.live_tail + text)[-self.LIVE_CHARS:]
+
+    def finish(self):
+        """Close the files once the command has exited."""
+        for f in self._files.values():
+            f.close()
+        self.finished = time.time()
+
+    def size(self, stream):
+        """Return the size in bytes of a stream so far."""
+        try:
+            if stream in self._files and not self._files[stream].closed:
+                self._files[stream].flush()
+            return os.path.getsize(self.paths[stream])
+        except OSError:
+            return 0
+
+    def preview(self, stream):
+        """Return (text, truncated) for a stream.
+
+        A small stream is returned whole; a larger one as its head and tail
+        around an omission note, with truncated set.
+        """
+        size = self.size(stream)
+        try:
+            with open(self.paths[stream], "rb") as f:
+                if size <= HEAD_BYTES + TAIL_BYTES:
+                    return _decode(f.read()), False
+                head = f.read(HEAD_BYTES)
+                f.seek(size - TAIL_BYTES)
+                tail = f.read()
+        except OSError:
+            return "", False
+        # Cut at line boundaries where possible
+        if b"\n" in head:
+            head = head[:head.rindex(b"\n") + 1]
+        if b"\n" in tail[:-1]:
+            tail = tail[tail.index(b"\n") + 1:]
+        omitted = size - len(head) - len(tail)
+        return f"{_decode(head)}[... {omitted} bytes omitted; {size} bytes in total ...]\n{_decode(tail)}", True
+
+    def page_count(self, stream, page_bytes=PAGE_BYTES):
+        return max(1, -(-self.size(stream) // page_bytes))
+
+    def page(self, stream, number, page_bytes=PAGE_BYTES):
+        """Return page number (0-based) of a stream, aligned to whole lines."""
+        with self._map(stream) as data:
+            if data is None:
+                return ""
+            start = self._page_start(data, number, page_bytes)
+            end = self._page_start(data, number + 1, page_bytes)
+            return _decode(data[start:end])
+
+    def search(self, stream, query, max_hits=50, page_bytes=PAGE_BYTES):
+        """Return [(page, line_text)] for occurrences of query (case-sensitive) in a stream."""
+        needle = query.encode("utf-8")
+        hits = []
+        with self._map(stream) as data:
+            if data is None or not needle:
+                return hits
+            position = data.find(needle)
+            while position >= 0 and len(hits) < max_hits:
+                line_start = data.rfind(b"\n", 0, position) + 1
+                line_end = data.find(b"\n", position)
+                if line_end < 0:
+                    line_end = len(data)
+                page = position // page_bytes
+                if page and position < self._page_start(data, page, page_bytes):
+                    page -= 1
+                hits.append((page, _decode(data[line_start:min(line_end, line_start + 500)])))
+                position = data.find(needle, line_end)
+        return hits
+
+    @staticmethod
+    def _page_start(data, number, page_bytes):
+        """Return the offset of the first full line at or after number * page_bytes."""
+        offset = number * page_bytes
+        if offset <= 0:
+            return 0
+        if offset >= len(data):
+            return len(data)
+        newline = data.find(b"\n", offset - 1)
+        return len(data) if newline < 0 else newline + 1
+
+    def _map(self, stream):
+        return _Mapping(self.paths[stream])
+
+
+class _Mapping:
+    """Context manager yielding a read-only mmap of a file, or None if it is empty or missing."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        try:
+            self._file = open(self.path, "rb")
+            if os.fstat(self._file.fileno()).st_size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            pass
+        return self._map
+
+    def __exit__(self, *exc_info):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class OutputSpool:
+    """Per-session store of spooled command outputs, trimmed oldest-first.
+
+    At most max_outputs outputs and max_bytes on disk are kept. The spool
+    directory is deleted when the spool is garbage-collected with its
+    session, or when the app exits.
+    """
+
+    def __init__(self, directory=None, max_outputs=100, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory or tempfile.mkdtemp(prefix="cline-output-")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_outputs = max_outputs
+        self.max_bytes = max_bytes
+        self._outputs = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+    def new(self, command):
+        """Create the spool for a command that is about to run."""
+        with self._lock:
+            output = SpooledOutput(self._next_id, command, self.directory)
+            self._outputs[output.id] = output
+            self._next_id += 1
+            self._trim()
+            return output
+
+    def get(self, output_id):
+        """Return the spooled output with the given id (int or numeric string), or None."""
+        try:
+            return self._outputs.get(int(output_id))
+        except (TypeError, ValueError):
+            return None
+
+    def recent(self):
+        """Return the spooled outputs, newest first."""
+        return list(reversed(self._outputs.values()))
+
+    def _trim(self):
+        """Delete the oldest finished outputs beyond the count and size limits."""
+        total = sum(output.size(stream) for output in self._outputs.values() for stream in STREAMS)
+        for output_id in list(self._outputs):
+            if len(self._outputs) <= self.max_outputs and total <= self.max_bytes:
+                break
+            output = self._outputs[output_id]
+            if output.finished is None:
+                continue
+            for stream in STREAMS:
+                total -= output.size(stream)
+                try:
+                    os.remove(output.paths[stream])
+                except OSError:
+                    pass
+            del self._outputs[output_id]
@@ -0,0 +1,176 @@
+import os
+
+from dir_cache import get_directory_cache
+
+
+class _DirSnapshot:
+    """Listing of one directory and the shared DirListing and IgnoreRules it was built from."""
+
+    __slots__ = ("listing", "rules", "dirs", "files", "file_mtimes", "block", "block_key")
+
+    def __init__(self, listing, rules, dirs, files, file_mtimes):
+        self.listing = listing
+        self.rules = rules
+        self.dirs = dirs
+        self.files = files
+        self.file_mtimes = file_mtimes
+        # Rendered text for this directory's own line, built lazily
+        self.block = None
+        self.block_key = None
+
+
+class ProjectStructureCache:
+    """Walk and render the project tree, re-listing only changed directories.
+
+    Directory listings come from the shared directory cache, which
+    validates them by mtime and inode. On each walk an unchanged directory
+    costs a single stat() and its snapshot and rendered line are reused;
+    only directories whose listing changed are rebuilt.
+    """
+
+    SKIP_DIRS = {"__pycache__", ".git"}
+
+    # Directories with more files than this list the first few and a count
+    MAX_FILES_PER_DIR = 40
+
+    def __init__(self):
+        self._snapshots = {}
+        self.hits = 0
+        self.misses = 0
+
+    def walk(self, root, prune=None, rules=None):
+        """Yield (path, level, snapshot) for root and its subdirectories, depth first.
+
+        prune(path, level) is called for every subdirectory; pruned
+        directories are yielded with a snapshot of None and never listed.
+        Entries ignored by rules (the workspace's IgnoreRules) are left out
+        of the snapshots, so ignored directories are not visited at all.
+        """
+        root = os.path.abspath(root)
+        stack = [(root, 0)]
+        while stack:
+            path, level = stack.pop()
+            if level and prune is not None and prune(path, level):
+                yield path, level, None
+                continue
+            snapshot = self._snapshot(path, rules)
+            if snapshot is None:
+                continue
+            yield path, level, snapshot
+
+            # Push in reverse so subdirectories come out in sorted order
+            for name in reversed(snapshot.dirs):
+                stack.append((os.path.join(path, name), level + 1))
+
+    def render(self, root, prune=None, rules=None):
+        """Return a compact one-line-per-directory map of the tree under root.
+
+        Pruned directories are left out of the map and returned separately
+        as a list of absolute paths so the caller can summarise them.
+        """
+        root = os.path.abspath(root)
+        key = (root, self.MAX_FILES_PER_DIR)
+        lines = []
+        pruned = []
+        for path, _, snapshot in self.walk(root, prune, rules):
+            if snapshot is None:
+                pruned.append(path)
+                continue
+            if snapshot.block_key != key:
+                snapshot.block = self._render_block(path, root, snapshot)
+                snapshot.block_key = key
+            lines.append(snapshot.block)
+        return "".join(lines), pruned
+
+    def count(self, path, limit=None, rules=None):
+        """Return (files, dirs, complete) for the subtree at path, stopping after limit entries."""
+        files = dirs = 0
+        for _, _, snapshot in self.walk(path, rules=rules):
+            files += len(snapshot.files)
+            dirs += len(snapshot.dirs)
+            if limit is not None and files + dirs >= limit:
+                return files, dirs, False
+        return files, dirs, True
+
+    def recent_files(self, root, limit=10, prune=None, rules=None):
+        """Return up to limit absolute file paths under root, newest mtime first."""
+        candidates = []
+        for path, _, snapshot in self.walk(root, prune, rules):
+            if snapshot is None:
+                continue
+            for name, mtime_ns in zip(snapshot.files, snapshot.file_mtimes):
+                candidates.append((mtime_ns, os.path.join(path, name)))
+        candidates.sort(reverse=True)
+        return [path for _, path in candidates[:limit]]
+
+    def stats(self):
+        """Return cache hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "directories": len(self._snapshots),
+        }
+
+    def clear(self):
+        """Drop every cached snapshot."""
+        self._snapshots.clear()
+
+    def _snapshot(self, path, rules=None):
+        """Return a current snapshot for path, rebuilding it only if its listing or the rules changed."""
+        listing = get_directory_cache().listing(path)
+        if listing is None:
+            self._forget(path)
+            return None
+
+        snapshot = self._snapshots.get(path)
+        if snapshot is not None and snapshot.listing is listing and snapshot.rules is rules:
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        base = rules.relative(path) if rules is not None else None
+        dirs, files = [], []
+        for entry in listing.entries:
+            if rules is not None and rules.match(f"{base}/{entry.name}" if base else entry.name, entry.is_dir):
+                continue
+            if entry.is_dir and not entry.is_symlink:
+                if entry.name not in self.SKIP_DIRS:
+                    dirs.append(entry.name)
+            elif not entry.name.startswith(".") and not entry.name.endswith(".pyc"):
+                files.append((entry.name, entry.mtime_ns))
+
+        names = [name for name, _ in files]
+        if snapshot is not None:
+            # Subdirectories that vanished take their cached subtrees with them
+            for name in set(snapshot.dirs) - set(dirs):
+                self._forget(os.path.join(path, name))
+            if snapshot.dirs == dirs and snapshot.files == names:
+                # Same contents, only the timestamp moved; keep the rendered block
+                snapshot.listing = listing
+                snapshot.rules = rules
+                snapshot.file_mtimes = [mtime for _, mtime in files]
+                return snapshot
+
+        snapshot = _DirSnapshot(listing, rules, dirs, names, [mtime for _, mtime in files])
+        self._snapshots[path] = snapshot
+        return snapshot
+
+    def _forget(self, path):
+        """Drop the snapshots of path and everything below it."""
+        prefix = path + os.sep
+        for cached in [p for p in self._snapshots if p == path or p.startswith(prefix)]:
+            del self._snapshots[cached]
+
+    def _render_block(self, path, root, snapshot):
+        """Render the single map line of one directory."""
+        rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+        label = "./" if rel_path == "." else rel_path + "/"
+        files = snapshot.files
+        if len(files) > self.MAX_FILES_PER_DIR:
+            shown = ", ".join(files[:self.MAX_FILES_PER_DIR])
+            return f"{label} {shown}, ... (+{len(files) - self.MAX_FILES_PER_DIR} more)\n"
+        if not files:
+            return f"{label}\n"
+        return f"{label} {', '.join(files)}\n"
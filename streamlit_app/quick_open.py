@@ -0,0 +1,357 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from dir_cache import add_change_listener
+from ignore_rules import get_ignore_rules, walk_files
+
+
+class QuickOpenMatch:
+    """One quick-open result: a workspace-relative path, its score and the matched positions."""
+
+    __slots__ = ("path", "score", "positions")
+
+    def __init__(self, path, score, positions):
+        self.path = path
+        self.score = score
+        self.positions = positions
+
+
+def _subsequence_pattern(query):
+    """Return a regex matching the rest of a line that holds query's characters in order.
+
+    Each gap is a negated class of the next character, so the match is the
+    leftmost-first alignment and never backtracks. Every character is a
+    group, so the match records where each one landed.
+    """
+    parts = []
+    for index, char in enumerate(query):
+        if index:
+            parts.append(f"[^{re.escape(char)}\\n]*")
+        parts.append(f"({re.escape(char)})")
+    return re.compile("".join(parts) + "[^\\n]*")
+
+
+def _runs(positions):
+    """Return how many contiguous runs a list of matched positions forms."""
+    return 1 + sum(1 for a, b in zip(positions, positions[1:]) if b != a + 1)
+
+
+def char_mask(text):
+    """Return a bitmask of the (lower-cased) characters in text, for cheap containment tests."""
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) % 63)
+    return mask
+
+
+def _group_by_mask(masks):
+    """Return {mask: [ids]} for a list of masks indexed by id."""
+    groups = {}
+    for path_id, mask in enumerate(masks):
+        groups.setdefault(mask, []).append(path_id)
+    return groups
+
+
+class _Blob:
+    """Lines joined by newlines, so one regex scan covers them all, with each line's offset."""
+
+    __slots__ = ("text", "starts")
+
+    def __init__(self, lines):
+        self.text = "\n".join(lines)
+        self.starts = [0]
+        self.starts.extend(accumulate(len(line) + 1 for line in lines))
+        self.starts.pop()
+
+    def matches(self, pattern, ids):
+        """Yield (id, line_offset, match) for each line matching pattern; ids[i] is line i's id."""
+        starts = self.starts
+        for match in pattern.finditer(self.text):
+            index = bisect_right(starts, match.start()) - 1
+            yield ids[index], starts[index], match
+
+
+class PathIndex:
+    """Every file path of one workspace, kept in memory for fuzzy quick-open.
+
+    Each path not ignored by the workspace's IgnoreRules gets an integer
+    id, its lower-cased form and a bitmask of the characters it contains.
+    A query first keeps the ids whose mask holds all of its characters,
+    then runs one subsequence regex over the joined base names and then
+    the joined paths of those candidates only, so the regex never sees
+    most of the workspace. A query that extends the previous one searches
+    only what the previous one left: its matches, and when it stopped at
+    MAX_SCORED the candidates it had not reached yet. Only the matches
+    found are scored.
+
+    Paths created, written, moved or deleted by the IDE arrive through
+    note_path(); a removed path's id is marked dead and the lists are
+    compacted once dead ids outnumber live ones. Anything else is picked
+    up by a rescan that runs in the background at most every
+    REFRESH_INTERVAL seconds.
+    """
+
+    REFRESH_INTERVAL = 30.0
+
+    # Matches scored per query; base-name matches are taken first
+    MAX_SCORED = 1000
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        # id -> rel_path (None once dead), lower-cased path and character mask
+        self._paths = []
+        self._lowered = []
+        self._masks = []
+        self._ids = {}
+        # mask -> ids with that mask; far fewer distinct masks than paths
+        self._by_mask = {}
+        self._dead = 0
+        # Bumped on every change, so cached query results can be trusted
+        self._generation = 0
+        self._last = None
+        self._blobs = None
+        self._scanned_at = None
+        self._rescanning = False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def refresh(self, wait=False):
+        """Bring the path set up to date with the disk.
+
+        The first call (or wait=True) scans synchronously; later calls start
+        a background rescan once REFRESH_INTERVAL has passed since the last.
+        """
+        if self._scanned_at is None or wait:
+            self._rescan()
+            return
+        with self._lock:
+            due = time.monotonic() - self._scanned_at >= self.REFRESH_INTERVAL
+            if not due or self._rescanning:
+                return
+            self._rescanning = True
+        threading.Thread(target=self._rescan, daemon=True).start()
+
+    def _rescan(self):
+        try:
+            rules = get_ignore_rules(self.root)
+            start = len(self.root) + 1
+            paths = sorted(path[start:].replace(os.sep, "/") for path in walk_files(self.root, rules))
+            lowered = [path.lower() for path in paths]
+            masks = [char_mask(path) for path in lowered]
+            with self._lock:
+                self._paths, self._lowered, self._masks = paths, lowered, masks
+                self._ids = {path: path_id for path_id, path in enumerate(paths)}
+                self._by_mask = _group_by_mask(masks)
+                self._dead = 0
+                self._generation += 1
+        finally:
+            with self._lock:
+                self._scanned_at = time.monotonic()
+                self._rescanning = False
+
+    def note_path(self, path):
+        """Update the index for one path (absolute or relative) that was created, changed or removed.
+
+        A directory brings in or drops everything below it.
+        """
+        rules = get_ignore_rules(self.root)
+        rel_path = rules.relative(os.path.join(self.root, path))
+        if rel_path is None:
+            return
+        full_path = os.path.join(self.root, rel_path)
+        added = []
+        if os.path.isfile(full_path):
+            if not rules.is_ignored(rel_path, False):
+                added.append(rel_path)
+        elif os.path.isdir(full_path) and not rules.is_ignored(rel_path, True):
+            start = len(self.root) + 1
+            added = [p[start:].replace(os.sep, "/") for p in walk_files(full_path, rules)]
+        prefix = rel_path + "/"
+        with self._lock:
+            for old in [p for p in self._ids if p == rel_path or p.startswith(prefix)]:
+                if old not in added:
+                    self._drop(old)
+            for new in added:
+                if new not in self._ids:
+                    path_id = self._ids[new] = len(self._paths)
+                    mask = char_mask(new.lower())
+                    self._paths.append(new)
+                    self._lowered.append(new.lower())
+                    self._masks.append(mask)
+                    self._by_mask.setdefault(mask, []).append(path_id)
+            self._generation += 1
+            if self._dead > len(self._ids):
+                self._compact()
+
+    def _drop(self, rel_path):
+        """Mark a path's id dead (lock held)."""
+        path_id = self._ids.pop(rel_path)
+        same_mask = self._by_mask[self._masks[path_id]]
+        same_mask.remove(path_id)
+        if not same_mask:
+            del self._by_mask[self._masks[path_id]]
+        self._paths[path_id] = None
+        self._lowered[path_id] = ""
+        self._masks[path_id] = 0
+        self._dead += 1
+
+    def _compact(self):
+        """Renumber the live paths, dropping dead ids (lock held)."""
+        live = [path_id for path_id, path in enumerate(self._paths) if path is not None]
+        self._paths = [self._paths[i] for i in live]
+        self._lowered = [self._lowered[i] for i in live]
+        self._masks = [self._masks[i] for i in live]
+        self._ids = {path: path_id for path_id, path in enumerate(self._paths)}
+        self._by_mask = _group_by_mask(self._masks)
+        self._dead = 0
+
+    def search(self, query, limit=20, recent=()):
+        """Return up to limit QuickOpenMatch objects for a fuzzy query, best first.
+
+        Every character of the query must appear in the path in order.
+        Matches within the base name score above matches spread over the
+        directories, fewer and longer contiguous runs score higher, and
+        paths in recent (absolute or relative, most recent first) get a
+        bonus that fades with their position. An empty query returns the
+        recent files that are still in the index.
+        """
+        self.refresh()
+        recent_rank = {}
+        for rank, path in enumerate(recent):
+            rel_path = os.path.relpath(path, self.root).replace(os.sep, "/") if os.path.isabs(path) else path
+            recent_rank.setdefault(rel_path, rank)
+
+        query = "".join(query.lower().replace("\\", "/").split())
+        with self._lock:
+            paths, lowered, masks, by_mask = self._paths, self._lowered, self._masks, self._by_mask
+            generation = self._generation
+            if not query:
+                ordered = sorted((rank, path) for path, rank in recent_rank.items() if path in self._ids)
+                return [QuickOpenMatch(path, 0.0, []) for _, path in ordered[:limit]]
+
+        needed = char_mask(query)
+        last = self._last
+        if last is not None and last[1] == generation and query.startswith(last[0]):
+            # Every match of this query is in the last one's narrowed set
+            candidates = [path_id for path_id in last[2] if masks[path_id] & needed == needed]
+        else:
+            candidates = []
+            for mask, ids in list(by_mask.items()):
+                if mask & needed == needed:
+                    candidates.extend(ids)
+            candidates.sort()
+
+        if len(candidates) * 4 > len(paths):
+            # Too little filtered out to be worth joining a smaller text
+            ids, names, full = self._full_blobs(generation, lowered)
+        else:
+            ids = candidates
+            names = _Blob([lowered[path_id][lowered[path_id].rfind("/") + 1:] for path_id in candidates])
+            full = _Blob([lowered[path_id] for path_id in candidates])
+
+        pattern = _subsequence_pattern(query)
+        groups = range(1, len(query) + 1)
+        scored = {}
+        # Base-name matches first: they are the likeliest targets
+        for path_id, offset, match in names.matches(pattern, ids):
+            if len(scored) >= self.MAX_SCORED:
+                break
+            path = paths[path_id]
+            if path is None:
+                # Removed by note_path() during this search
+                continue
+            name_start = path.rfind("/") + 1
+            positions = [name_start + match.start(group) - offset for group in groups]
+            scored[path_id] = self._score(path, lowered[path_id], positions, True, query, recent_rank)
+        # What the next keystroke has to search: every path match, plus the candidates past
+        # the point where scoring stopped (all of them if it stopped among the base names)
+        narrowed = candidates
+        if len(scored) < self.MAX_SCORED:
+            matched = []
+            for path_id, offset, match in full.matches(pattern, ids):
+                if path_id not in scored and paths[path_id] is not None:
+                    if len(scored) >= self.MAX_SCORED:
+                        matched.extend(candidates[bisect_left(candidates, path_id):])
+                        break
+                    positions = [match.start(group) - offset for group in groups]
+                    scored[path_id] = self._score(
+                        paths[path_id], lowered[path_id], positions, False, query, recent_rank
+                    )
+                matched.append(path_id)
+            narrowed = matched
+        self._last = (query, generation, narrowed)
+
+        best = sorted(scored.items(), key=lambda item: (-item[1][0], paths[item[0]]))[:limit]
+        return [QuickOpenMatch(paths[path_id], score, positions) for path_id, (score, positions) in best]
+
+    def _full_blobs(self, generation, lowered):
+        """Return (ids, name blob, path blob) over every path, rebuilt once per generation."""
+        blobs = self._blobs
+        if blobs is None or blobs[0] != generation:
+            names = _Blob([path[path.rfind("/") + 1:] for path in lowered])
+            blobs = self._blobs = (generation, range(len(lowered)), names, _Blob(lowered))
+        return blobs[1:]
+
+    @staticmethod
+    def _score(path, lowered, positions, in_name, query, recent_rank):
+        """Return (score, positions) for one matched path."""
+        score = 0.0
+        if in_name:
+            score += 50
+            name_start = path.rfind("/") + 1
+            if lowered.startswith(query, name_start):
+                score += 40
+            elif lowered.find(query, name_start) >= 0:
+                score += 25
+        elif query in lowered:
+            score += 20
+        # Fewer, longer runs of consecutive characters read as a deliberate match
+        score += 30.0 * (len(query) - _runs(positions)) / len(query)
+        # Characters landing at the start of a word (after / _ - . or a case change)
+        for position in positions:
+            if position == 0 or path[position - 1] in "/_-. " or \
+                    (path[position].isupper() and path[position - 1].islower()):
+                score += 3
+        rank = recent_rank.get(path)
+        if rank is not None:
+            score += max(5, 40 - 2 * rank)
+        # Shorter paths win ties
+        score -= len(path) / 50.0
+        return round(score, 3), positions
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_path_index(root):
+    """Return the shared PathIndex for a workspace, creating it on first use."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = PathIndex(root)
+        return index
+
+
+def note_path_changed(path):
+    """Pass a created, changed, moved or deleted path to the index of every workspace it lies in.
+
+    Registered with dir_cache, so every file operation that calls
+    invalidate_path() keeps the indexes current.
+    """
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        indexes = [index for root, index in _indexes.items() if path == root or path.startswith(root + os.sep)]
+    for index in indexes:
+        if index._scanned_at is not None:
+            index.note_path(path)
+
+
+add_change_listener(note_path_changed)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from dir_cache import change_generation
+
+# Words in a prompt that look like file paths or file names
+_PATH_TOKEN = re.compile(r"[\w\-./\\]*[\w\-]\.[A-Za-z0-9]+|[\w\-.]+/[\w\-./]*")
+
+# Dependency standing for the whole project tree, for tools whose answer can change with any file
+TREE_DEPENDENCY = "*"
+
+# Distinguishes this process's change generations from those stored by earlier runs
+_PROCESS_TOKEN = f"{os.getpid()}-{time.time_ns()}"
+
+
+def normalize_prompt(prompt):
+    """Normalise a prompt so trivially different spellings share a cache entry."""
+    return " ".join(prompt.lower().split())
+
+
+def fingerprint_paths(project_path, rel_paths):
+    """Return {rel_path: [size, mtime_ns]} for paths in the project (None if missing).
+
+    TREE_DEPENDENCY maps to the current dir_cache change generation instead.
+    """
+    fingerprints = {}
+    for rel_path in sorted(set(rel_paths)):
+        if rel_path == TREE_DEPENDENCY:
+            fingerprints[rel_path] = f"{_PROCESS_TOKEN}:{change_generation()}"
+            continue
+        try:
+            stat = os.stat(os.path.join(project_path, rel_path))
+            fingerprints[rel_path] = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            fingerprints[rel_path] = None
+    return fingerprints
+
+
+class ResponseCache:
+    """Content-addressed cache of complete assistant turns.
+
+    Entries are keyed on the model name, the project path, the normalised
+    prompt and a fingerprint of the project files the prompt mentions. Each
+    entry also records the files its tool calls read and is only served
+    while those are unchanged; a turn whose tools looked at the whole tree
+    (searches, listings) depends on TREE_DEPENDENCY and is only served until
+    the next change the app or an index rescan notices, and never after a
+    restart. Entries live in an in-memory LRU backed by one JSON file per
+    entry on disk; the disk store is trimmed oldest-first to max_disk_bytes.
+    """
+
+    def __init__(self, directory, max_memory_entries=128, max_disk_bytes=50 * 1024 * 1024):
+        self.directory = str(directory)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def referenced_files(self, prompt, project_path, known_files=()):
+        """Return project-relative paths of files mentioned in prompt.
+
+        Tokens are matched as paths relative to the project, then by file
+        name against known_files (project-relative paths).
+        """
+        by_name = {}
+        for rel_path in known_files:
+            by_name.setdefault(os.path.basename(rel_path), []).append(rel_path)
+
+        referenced = set()
+        for token in _PATH_TOKEN.findall(prompt):
+            token = token.strip("./\\").replace("\\", "/")
+            if not token:
+                continue
+            if os.path.isfile(os.path.join(project_path, token)):
+                referenced.add(token)
+            else:
+                referenced.update(by_name.get(os.path.basename(token), ()))
+        return sorted(referenced)
+
+    def make_key(self, model_name, prompt, project_path, known_files=()):
+        """Return the cache key for a prompt against the current project state."""
+        project_path = os.path.abspath(project_path)
+        referenced = self.referenced_files(prompt, project_path, known_files)
+        payload = json.dumps(
+            [model_name, project_path, normalize_prompt(prompt), fingerprint_paths(project_path, referenced)],
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, project_path):
+        """Return the cached messages for key, or None if absent or stale."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                entry = self._load(key)
+
+            if entry is None or entry["dependencies"] != fingerprint_paths(
+                    project_path, entry["dependencies"].keys()):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._remember(key, entry)
+            try:
+                # Mark the entry as recently used for disk eviction
+                os.utime(self._entry_path(key))
+            except OSError:
+                pass
+            return entry["messages"]
+
+    def put(self, key, messages, project_path, dependencies=()):
+        """Store the messages of a turn; dependencies are project paths its tools read."""
+        entry = {
+            "created": time.time(),
+            "messages": messages,
+            "dependencies": fingerprint_paths(project_path, dependencies),
+        }
+        with self._lock:
+            self._remember(key, entry)
+            try:
+                tmp_path = self._entry_path(key) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._entry_path(key))
+            except (OSError, TypeError, ValueError):
+                return
+            self._evict_disk()
+
+    def stats(self):
+        """Return hit/miss counters and the hit rate."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._memory),
+        }
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _remember(self, key, entry):
+        """Insert an entry into the in-memory LRU, evicting the oldest if full."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key):
+        """Read an entry from disk, or None if it does not exist or is unreadable."""
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _evict_disk(self):
+        """Delete the least recently used entry files until the store fits max_disk_bytes."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        except OSError:
+            return
+        if total <= self.max_disk_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
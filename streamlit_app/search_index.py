@@ -0,0 +1,391 @@
+import os
+import re
+import threading
+import time
+from array import array
+from stat import S_ISREG
+
+from fs_tools import SNIFF_BYTES, glob_patterns, is_binary, matches_globs
+from dir_cache import note_tree_changed
+from ignore_rules import get_ignore_rules, walk_files
+
+# Regex characters that end a literal run, and those that make the previous character optional
+_REGEX_BREAK = set(".^$+")
+_REGEX_OPTIONAL = set("?*{")
+
+
+def _trigrams(text):
+    """Return the distinct lower-cased trigrams of text."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def required_literals(pattern):
+    """Return literal strings that every match of a regex must contain.
+
+    Only top-level literal runs are used, so the result may be empty but is
+    never wrong: any pattern with an alternation yields nothing, and text
+    inside groups, character classes or before an optional quantifier is
+    ignored.
+    """
+    literals = []
+    current = []
+    depth = 0
+    index = 0
+
+    def flush():
+        if current:
+            literals.append("".join(current))
+            del current[:]
+
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            escaped = pattern[index + 1:index + 2]
+            index += 2
+            if escaped and not escaped.isalnum() and depth == 0:
+                current.append(escaped)
+            else:
+                # \w, \d, \b, backreferences and the like
+                flush()
+            continue
+        if char == "|":
+            return []
+        if char == "[":
+            flush()
+            # Skip the class; a leading ] (or ^]) is part of it
+            index += 1
+            if pattern[index:index + 1] == "^":
+                index += 1
+            if pattern[index:index + 1] == "]":
+                index += 1
+            while index < len(pattern) and pattern[index] != "]":
+                index += 2 if pattern[index] == "\\" else 1
+            index += 1
+            continue
+        if char == "(":
+            flush()
+            depth += 1
+        elif char == ")":
+            flush()
+            depth = max(0, depth - 1)
+        elif char in _REGEX_OPTIONAL:
+            if current:
+                current.pop()
+            flush()
+            if char == "{":
+                closing = pattern.find("}", index)
+                index = len(pattern) if closing < 0 else closing
+        elif char in _REGEX_BREAK:
+            flush()
+        elif depth == 0:
+            current.append(char)
+        index += 1
+    flush()
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class SearchMatch:
+    """One matching line and the lines around it."""
+
+    def __init__(self, path, line_number, line, before, after):
+        self.path = path
+        self.line_number = line_number
+        self.line = line
+        self.before = before
+        self.after = after
+
+
+class TrigramIndex:
+    """Trigram index over the text files of one workspace.
+
+    Every indexed file gets an integer id, and each lower-cased trigram maps
+    to an append-only array of the ids of files containing it. A query is
+    narrowed to the files holding all of its trigrams before any file is
+    read, and only those candidates are searched line by line.
+
+    A changed file is given a new id and its old id is marked dead rather
+    than removed from every posting array; the arrays are compacted once dead
+    ids outnumber live ones. Files saved through the IDE are reindexed by
+    update_file(). Other changes are picked up by a stat-only rescan that runs
+    in the background at most every RESCAN_INTERVAL seconds, and a candidate
+    whose size or mtime no longer matches the index is reindexed before it
+    is searched.
+    """
+
+    MAX_FILE_BYTES = 1024 * 1024
+    RESCAN_INTERVAL = 30.0
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        # Held for the whole of a scan so a background and a synchronous one never overlap
+        self._scan_lock = threading.Lock()
+        # rel_path -> (file id or None if not indexed, size, mtime_ns)
+        self._files = {}
+        # file id -> rel_path, or None once the id is dead
+        self._paths = []
+        self._dead = 0
+        self._postings = {}
+        self._scanned_at = None
+        self._rescanning = False
+
+    def stats(self):
+        """Return the number of indexed files and distinct trigrams."""
+        with self._lock:
+            return {
+                "files": len(self._paths) - self._dead,
+                "trigrams": len(self._postings),
+            }
+
+    def refresh(self, wait=False, background=False):
+        """Bring the index up to date with the files on disk.
+
+        The first call (or wait=True) scans synchronously, unless background
+        is set; later calls start a background rescan once RESCAN_INTERVAL
+        has passed since the last.
+        """
+        if wait or (self._scanned_at is None and not background):
+            self._rescan(initial=not wait)
+            return
+        with self._lock:
+            due = self._scanned_at is None or \
+                time.monotonic() - self._scanned_at >= self.RESCAN_INTERVAL
+            if not due or self._rescanning:
+                return
+            self._rescanning = True
+        threading.Thread(target=self._rescan, daemon=True).start()
+
+    def update_file(self, path):
+        """Reindex a single file, given as an absolute or workspace-relative path."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        rel_path = path.replace(os.sep, "/")
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            with self._lock:
+                self._drop(rel_path)
+            return
+        self._index_file(rel_path, stat.st_size, stat.st_mtime_ns)
+
+    def search(self, query, regex=False, case_sensitive=False, include=(), exclude=(),
+               context_lines=2, max_results=50):
+        """Return (matches, candidate_count) for a literal or regex query.
+
+        include/exclude are glob patterns matched against workspace-relative
+        paths. At most max_results matching lines are returned.
+        """
+        self.refresh()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if regex:
+            compiled = re.compile(query, flags)
+            literals = required_literals(query)
+        else:
+            compiled = re.compile(re.escape(query), flags)
+            literals = [query]
+
+        needed = set()
+        for literal in literals:
+            needed |= _trigrams(literal)
+        include = glob_patterns(include)
+        exclude = glob_patterns(exclude)
+        candidates = [
+            rel_path for rel_path in self._candidates(needed)
+            if (not include or matches_globs(rel_path, os.path.basename(rel_path), include))
+            and not matches_globs(rel_path, os.path.basename(rel_path), exclude)
+        ]
+
+        matches = []
+        for rel_path in sorted(candidates):
+            lines = self._read_current(rel_path)
+            if lines is None:
+                continue
+            for index, line in enumerate(lines):
+                if compiled.search(line):
+                    matches.append(SearchMatch(
+                        rel_path, index + 1, line,
+                        lines[max(0, index - context_lines):index],
+                        lines[index + 1:index + 1 + context_lines]
+                    ))
+                    if len(matches) >= max_results:
+                        return matches, len(candidates)
+        return matches, len(candidates)
+
+    def _candidates(self, needed):
+        """Return the paths of live files containing every trigram in needed."""
+        with self._lock:
+            if not needed:
+                return [path for path in self._paths if path is not None]
+            postings = []
+            for trigram in needed:
+                ids = self._postings.get(trigram)
+                if ids is None:
+                    return []
+                postings.append(ids)
+            postings.sort(key=len)
+            ids = set(postings[0])
+            for other in postings[1:]:
+                ids.intersection_update(other)
+                if not ids:
+                    return []
+            return [self._paths[i] for i in ids if self._paths[i] is not None]
+
+    def _read_current(self, rel_path):
+        """Return the lines of a candidate file, reindexing it first if it changed."""
+        full_path = os.path.join(self.root, rel_path)
+        try:
+            stat = os.stat(full_path)
+            with open(full_path, "rb") as f:
+                data = f.read(self.MAX_FILE_BYTES + 1)
+        except OSError:
+            with self._lock:
+                self._drop(rel_path)
+            return None
+        known = self._files.get(rel_path)
+        if known is None or known[1:] != (stat.st_size, stat.st_mtime_ns):
+            self._index_file(rel_path, stat.st_size, stat.st_mtime_ns, data)
+            note_tree_changed()
+        if len(data) > self.MAX_FILE_BYTES or is_binary(data[:SNIFF_BYTES]):
+            return None
+        return data.decode("utf-8", errors="replace").splitlines()
+
+    def _rescan(self, initial=False):
+        """Stat every file in the workspace and reindex those that changed.
+
+        Scans never overlap; with initial=True nothing is done if another
+        scan finished while this one waited.
+        """
+        with self._scan_lock:
+            if initial and self._scanned_at is not None:
+                return
+            first_scan = self._scanned_at is None
+            changed = False
+            try:
+                seen = set()
+                start = len(os.path.abspath(self.root)) + 1
+                for path in walk_files(self.root, get_ignore_rules(self.root), hidden=False):
+                    try:
+                        stat = os.stat(path, follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not S_ISREG(stat.st_mode):
+                        continue
+                    rel_path = path[start:].replace(os.sep, "/")
+                    seen.add(rel_path)
+                    known = self._files.get(rel_path)
+                    if known is None or known[1:] != (stat.st_size, stat.st_mtime_ns):
+                        self._index_file(rel_path, stat.st_size, stat.st_mtime_ns)
+                        changed = True
+
+                with self._lock:
+                    for rel_path in [path for path in self._files if path not in seen]:
+                        self._drop(rel_path)
+                        changed = True
+                if changed and not first_scan:
+                    # Edits made outside the app; cached answers about the tree are stale
+                    note_tree_changed()
+            finally:
+                with self._lock:
+                    self._scanned_at = time.monotonic()
+                    self._rescanning = False
+
+    def _index_file(self, rel_path, size, mtime_ns, data=None):
+        """(Re)index one file; data may be passed in when it was already read."""
+        trigrams = None
+        if size <= self.MAX_FILE_BYTES:
+            if data is None:
+                try:
+                    with open(os.path.join(self.root, rel_path), "rb") as f:
+                        data = f.read(self.MAX_FILE_BYTES + 1)
+                except OSError:
+                    data = None
+            if data is not None and len(data) <= self.MAX_FILE_BYTES \
+                    and not is_binary(data[:SNIFF_BYTES]):
+                trigrams = _trigrams(data.decode("utf-8", errors="replace"))
+
+        with self._lock:
+            self._drop(rel_path)
+            file_id = None
+            if trigrams is not None:
+                file_id = len(self._paths)
+                self._paths.append(rel_path)
+                for trigram in trigrams:
+                    ids = self._postings.get(trigram)
+                    if ids is None:
+                        ids = self._postings[trigram] = array("I")
+                    ids.append(file_id)
+            self._files[rel_path] = (file_id, size, mtime_ns)
+            if self._dead > 1000 and self._dead > len(self._paths) - self._dead:
+                self._compact()
+
+    def _drop(self, rel_path):
+        """Forget a file; its id stays in the posting arrays until the next compaction."""
+        known = self._files.pop(rel_path, None)
+        if known is not None and known[0] is not None:
+            self._paths[known[0]] = None
+            self._dead += 1
+
+    def _compact(self):
+        """Renumber live files and rebuild the posting arrays without dead ids."""
+        new_ids = {}
+        paths = []
+        for old_id, rel_path in enumerate(self._paths):
+            if rel_path is not None:
+                new_ids[old_id] = len(paths)
+                paths.append(rel_path)
+        postings = {}
+        for trigram, ids in self._postings.items():
+            live = array("I", (new_ids[i] for i in ids if i in new_ids))
+            if live:
+                postings[trigram] = live
+        self._files = {
+            rel_path: (None if file_id is None else new_ids[file_id], size, mtime_ns)
+            for rel_path, (file_id, size, mtime_ns) in self._files.items()
+        }
+        self._paths = paths
+        self._postings = postings
+        self._dead = 0
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(root):
+    """Return the shared TrigramIndex for a workspace, creating it on first use."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = TrigramIndex(root)
+        return index
+
+
+def format_search_results(query, matches, candidate_count, max_results=50):
+    """Format search matches grep-style: path:line:text, with path-line-text for context."""
+    if not matches:
+        return f"No matches for '{query}' ({candidate_count} candidate files searched)."
+    lines = [f"{len(matches)} matches for '{query}':"]
+    path = None
+    printed = 0
+    for match in matches:
+        start = match.line_number - len(match.before)
+        if match.path != path or start > printed + 1:
+            if path is not None:
+                lines.append("--")
+            path = match.path
+            printed = 0
+        for number, text in enumerate(match.before, start):
+            if number > printed:
+                lines.append(f"{match.path}-{number}-{text}")
+        if match.line_number > printed:
+            lines.append(f"{match.path}:{match.line_number}:{match.line}")
+        printed = max(printed, match.line_number)
+        for number, text in enumerate(match.after, match.line_number + 1):
+            if number > printed:
+                lines.append(f"{match.path}-{number}-{text}")
+                printed = number
+    if len(matches) >= max_results:
+        lines.append(f"[Stopped after {max_results} matches; narrow the query or use include/exclude.]")
+    return "\n".join(lines)
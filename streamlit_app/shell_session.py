@@ -0,0 +1,234 @@
+import os
+import re
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from command_stats import parse_times
+
+# pexpect needs a POSIX pty; elsewhere commands run one process at a time
+try:
+    import pexpect
+    PEXPECT_AVAILABLE = os.name == "posix"
+except ImportError:
+    PEXPECT_AVAILABLE = False
+
+# Seconds an interrupted command gets to return to the prompt before the shell is killed
+INTERRUPT_GRACE = 2.0
+
+
+class ShellDied(Exception):
+    """Raised when the shell exits in the middle of a command."""
+
+
+class ShellSession:
+    """A long-lived bash (or sh) on a pty, shared by every command in a workspace.
+
+    Commands run in the same shell process, so cd, exported variables,
+    activated virtualenvs and functions carry over from one to the next.
+    The command text reaches the shell inside a quoted here-document and is
+    run with eval, so unbalanced quotes or an unterminated here-document
+    are a syntax error (exit code 2) rather than something that swallows
+    the rest of the script. Each command is followed by a printf of a random sentinel carrying its
+    exit code and the shell's directory, which marks where its output ends.
+    stderr is redirected to a file per command so it can be returned
+    separately. The shell's times builtin runs around each command, so
+    last_cpu_times holds the (user, system) CPU seconds it used. After
+    every command the exported environment is saved, so a shell that dies
+    is respawned in the same directory with the same variables.
+    """
+
+    def __init__(self, cwd):
+        self.cwd = cwd
+        self.child = None
+        self.last_exit_code = None
+        self.last_cpu_times = None
+        self._lock = threading.Lock()
+        self._state_dir = tempfile.mkdtemp(prefix="cline-shell-")
+        self._stderr_path = os.path.join(self._state_dir, "stderr")
+        self._env_path = os.path.join(self._state_dir, "env")
+        self._times_path = os.path.join(self._state_dir, "times")
+
+    @property
+    def alive(self):
+        return self.child is not None and self.child.isalive()
+
+    def run(self, command, timeout=None, on_output=None, stderr_path=None, keep_output=True):
+        """Run a command and return (stdout, stderr, returncode, timed_out).
+
+        on_output is called with each piece of stdout as it arrives. After
+        timeout seconds the command is interrupted like Ctrl-C and the shell
+        is then killed, so the next command gets a fresh one (same directory
+        and exported variables) rather than one left in an unknown state. With
+        stderr_path, stderr is written to that file instead of returned, and
+        with keep_output off stdout is only passed to on_output.
+        """
+        with self._lock:
+            if not self.alive:
+                self._spawn()
+            token = uuid.uuid4().hex
+            marker = f"__CLINE_DONE_{token}__"
+            delimiter = f"__CLINE_COMMAND_{token}__"
+            times_path = shlex.quote(self._times_path)
+            script = (
+                f"times >{times_path}\n"
+                f"{{ eval \"$(cat <<'{delimiter}'\n{command}\n{delimiter}\n)\"\n"
+                f"}} </dev/null 2>{shlex.quote(stderr_path or self._stderr_path)}\n"
+                f"__cline_rc=$?; times >>{times_path}; export -p >{shlex.quote(self._env_path)}; "
+                f"printf '\\n{marker} %d %s\\n' \"$__cline_rc\" \"$PWD\"\n"
+            )
+            try:
+                output, returncode, timed_out = self._exchange(
+                    script, marker, timeout, on_output, keep_output
+                )
+            except ShellDied:
+                output, returncode, timed_out = self._partial, self._exit_status(), False
+                self.child = None
+            except BaseException:
+                # Interrupted mid-command (e.g. a Streamlit rerun); a shell that may
+                # still be busy cannot frame the next command, so start over
+                self._kill()
+                raise
+            stderr = "" if stderr_path else self._take_stderr()
+            self.last_exit_code = returncode
+            self.last_cpu_times = self._cpu_times()
+            if timed_out:
+                self._kill()
+            return output, stderr, returncode, timed_out
+
+    def restart(self):
+        """Kill the shell; the next command starts a fresh one in the current directory."""
+        with self._lock:
+            self._kill()
+            try:
+                os.remove(self._env_path)
+            except OSError:
+                pass
+
+    def close(self):
+        """Kill the shell and remove its state files."""
+        with self._lock:
+            self._kill()
+            shutil.rmtree(self._state_dir, ignore_errors=True)
+
+    def _spawn(self):
+        """Start the shell, restoring the directory and exported variables of the last one."""
+        shell = shutil.which("bash")
+        args = ["--norc", "--noprofile", "--noediting"] if shell else []
+        shell = shell or "/bin/sh"
+        cwd = self.cwd if os.path.isdir(self.cwd) else os.path.expanduser("~")
+        self.child = pexpect.spawn(
+            shell, args, cwd=cwd, encoding="utf-8", codec_errors="replace",
+            echo=False, dimensions=(50, 200)
+        )
+        setup = "stty -echo noflsh 2>/dev/null; export PS1= PS2= PROMPT_COMMAND=; unset HISTFILE\n"
+        if os.path.exists(self._env_path):
+            setup += f". {shlex.quote(self._env_path)} 2>/dev/null\n"
+        setup += f"cd {shlex.quote(cwd)} 2>/dev/null\n"
+        marker = f"__CLINE_READY_{uuid.uuid4().hex}__"
+        self._exchange(setup + f"printf '\\n{marker} %d %s\\n' 0 \"$PWD\"\n", marker, 10, None)
+
+    def _exchange(self, script, marker, timeout, on_output, keep_output=True):
+        """Send a script and collect output up to its sentinel; returns (output, code, timed_out)."""
+        pattern = re.compile(r"\n?" + re.escape(marker) + r" (\d+) ([^\n]*)\n")
+        self.child.send(script)
+        started = time.monotonic()
+        interrupted_at = None
+        parts = []
+        pending = ""
+        carry = ""
+
+        def emit(text):
+            if keep_output:
+                parts.append(text)
+            if on_output is not None and text:
+                on_output(text)
+
+        while True:
+            try:
+                data = carry + self.child.read_nonblocking(65536, timeout=0.1)
+            except pexpect.TIMEOUT:
+                data = carry
+            except pexpect.EOF:
+                self._partial = "".join(parts) + pending + carry
+                raise ShellDied()
+            # Hold back a trailing \r in case its \n is still to come
+            carry = "\r" if data.endswith("\r") else ""
+            pending += (data[:-1] if carry else data).replace("\r\n", "\n")
+
+            match = pattern.search(pending)
+            if match:
+                self.cwd = match.group(2)
+                emit(pending[:match.start()])
+                return "".join(parts), int(match.group(1)), interrupted_at is not None
+
+            # Pass on everything except a last line that may be the start of the sentinel
+            newline = pending.rfind("\n")
+            safe = newline if marker.startswith(pending[newline + 1:]) else len(pending)
+            if safe > 0:
+                emit(pending[:safe])
+                pending = pending[safe:]
+
+            now = time.monotonic()
+            if timeout is not None and interrupted_at is None and now - started > timeout:
+                self.child.sendintr()
+                interrupted_at = now
+            elif interrupted_at is not None and now - interrupted_at > INTERRUPT_GRACE:
+                self._kill()
+                return "".join(parts) + pending, 124, True
+
+    def _take_stderr(self):
+        """Return and clear the stderr captured for the last command."""
+        try:
+            with open(self._stderr_path, "r", encoding="utf-8", errors="replace") as f:
+                stderr = f.read()
+            os.remove(self._stderr_path)
+        except OSError:
+            stderr = ""
+        return stderr
+
+    def _cpu_times(self):
+        """Return the (user, system) CPU seconds between the two times reports of the last command."""
+        try:
+            with open(self._times_path, "r") as f:
+                lines = f.read().split("\n")
+            os.remove(self._times_path)
+        except OSError:
+            return None
+        before = parse_times("\n".join(lines[:2]))
+        after = parse_times("\n".join(lines[2:4]))
+        if before is None or after is None:
+            return None
+        # times reports milliseconds; rounding drops float noise from the subtraction
+        return round(after[0] - before[0], 3), round(after[1] - before[1], 3)
+
+    def _exit_status(self):
+        self.child.close()
+        if self.child.exitstatus is not None:
+            return self.child.exitstatus
+        return 128 + (self.child.signalstatus or 0)
+
+    def _kill(self):
+        if self.child is not None:
+            try:
+                self.child.close(force=True)
+            except Exception:
+                pass
+        self.child = None
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_shell_session(cwd):
+    """Return the shared ShellSession for a workspace, creating it on first use."""
+    cwd = os.path.abspath(cwd)
+    with _sessions_lock:
+        session = _sessions.get(cwd)
+        if session is None:
+            session = _sessions[cwd] = ShellSession(cwd)
+        return session
@@ -0,0 +1,78 @@
+import time
+
+from context_assembler import estimate_tokens
+
+
+class StreamingReply:
+    """Accumulate a model reply as it streams in and time it.
+
+    Records time to first token and generation speed so every assistant
+    message can report them, including replies stopped part-way through.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.stopped = False
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def add(self, text):
+        """Append a chunk of reply text."""
+        if not text:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.parts.append(text)
+
+    def finish(self, stopped=False):
+        """Mark the reply as complete, or as stopped before the model finished."""
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+            self.stopped = stopped
+
+    def metrics(self):
+        """Return time-to-first-token and tokens-per-second figures for the reply."""
+        finished_at = self.finished_at or time.perf_counter()
+        tokens = estimate_tokens(self.text)
+        metrics = {
+            "tokens": tokens,
+            "total_time": finished_at - self.started_at,
+            "time_to_first_token": None,
+            "tokens_per_second": None,
+        }
+        if self.first_token_at is not None:
+            metrics["time_to_first_token"] = self.first_token_at - self.started_at
+            generation_time = finished_at - self.first_token_at
+            if generation_time > 0:
+                metrics["tokens_per_second"] = tokens / generation_time
+        return metrics
+
+
+def iter_chunk_text(response):
+    """Yield the text of each chunk of a streamed Gemini response."""
+    for chunk in response:
+        try:
+            text = chunk.text
+        except (ValueError, IndexError):
+            # Chunks without text parts (e.g. safety-only chunks) carry nothing to show
+            continue
+        if text:
+            yield text
+
+
+def cancel_stream(response):
+    """Best-effort abort of an in-flight streamed response."""
+    iterator = getattr(response, "_iterator", None)
+    for target in (iterator, response):
+        cancel = getattr(target, "cancel", None)
+        if callable(cancel):
+            try:
+                cancel()
+            except Exception:
+                pass
+            return
@@ -0,0 +1,320 @@
+import ast
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config_loader import get_data_dir
+from context_assembler import expr_name, format_def
+from ignore_rules import get_ignore_rules, walk_files
+
+# Bumped whenever the stored per-file record changes shape
+INDEX_VERSION = 1
+
+
+class _SymbolVisitor(ast.NodeVisitor):
+    """Collect definitions, imports and call sites from one module."""
+
+    def __init__(self):
+        self.defs = []
+        self.imports = []
+        self.calls = []
+        self._scope = []
+        self._class_scope = []
+
+    def _define(self, node, kind, signature):
+        qualname = ".".join(self._scope + [node.name])
+        self.defs.append([qualname, kind, node.lineno, signature])
+
+    def _enter(self, node, is_class):
+        """Visit the body of a definition with it pushed onto the scope."""
+        self._scope.append(node.name)
+        self._class_scope.append(is_class)
+        self.generic_visit(node)
+        self._scope.pop()
+        self._class_scope.pop()
+
+    def visit_FunctionDef(self, node):
+        kind = "method" if self._class_scope and self._class_scope[-1] else "function"
+        self._define(node, kind, format_def(node))
+        self._enter(node, False)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        bases = ", ".join(expr_name(base) for base in node.bases)
+        self._define(node, "class", f"class {node.name}({bases})" if bases else f"class {node.name}")
+        self._enter(node, True)
+
+    def visit_Assign(self, node):
+        # Module constants and class attributes; locals are not worth indexing
+        if not self._scope or self._class_scope == [True]:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    qualname = ".".join(self._scope + [target.id])
+                    self.defs.append([qualname, "variable", node.lineno, f"{target.id} = ..."])
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            bound = alias.asname or alias.name.split(".")[0]
+            self.imports.append([bound, alias.name, node.lineno])
+
+    def visit_ImportFrom(self, node):
+        module = "." * node.level + (node.module or "")
+        for alias in node.names:
+            self.imports.append([alias.asname or alias.name, f"{module}.{alias.name}", node.lineno])
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.calls.append([func.id, node.lineno, func.id])
+        elif isinstance(func, ast.Attribute):
+            self.calls.append([func.attr, node.lineno, expr_name(func)])
+        self.generic_visit(node)
+
+
+def parse_symbols(source):
+    """Return (defs, imports, calls) for Python source.
+
+    defs are [qualname, kind, line, signature], imports are
+    [bound_name, target, line] and calls are [called_name, line, expression].
+    """
+    visitor = _SymbolVisitor()
+    visitor.visit(ast.parse(source))
+    return visitor.defs, visitor.imports, visitor.calls
+
+
+class SymbolIndex:
+    """Definitions, imports and call sites of every Python file in a workspace.
+
+    Each file's record keeps its size, mtime and content hash. refresh()
+    stats every file, hashes only those whose size or mtime moved, and parses
+    only those whose hash changed. The records are saved as JSON under the
+    app data directory so a restart starts from the previous index.
+    """
+
+    REFRESH_INTERVAL = 5.0
+    MAX_FILE_BYTES = 2 * 1024 * 1024
+
+    def __init__(self, root, store_path):
+        self.root = root
+        self.store_path = str(store_path)
+        self._lock = threading.Lock()
+        self._files = {}
+        self._by_name = None
+        self._refreshed_at = None
+        self._load()
+
+    def refresh(self, force=False):
+        """Reparse changed Python files; skipped if the last refresh was very recent."""
+        with self._lock:
+            if not force and self._refreshed_at is not None and \
+                    time.monotonic() - self._refreshed_at < self.REFRESH_INTERVAL:
+                return
+            changed = False
+            seen = set()
+            for rel_path, stat in self._python_files():
+                seen.add(rel_path)
+                changed |= self._update(rel_path, stat)
+            for rel_path in [path for path in self._files if path not in seen]:
+                del self._files[rel_path]
+                changed = True
+            self._refreshed_at = time.monotonic()
+            if changed:
+                self._by_name = None
+                self._save()
+
+    def update_file(self, path):
+        """Reindex one file after it was saved, given as an absolute or relative path."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        rel_path = path.replace(os.sep, "/")
+        if not rel_path.endswith(".py"):
+            return
+        with self._lock:
+            try:
+                stat = os.stat(os.path.join(self.root, rel_path))
+            except OSError:
+                changed = self._files.pop(rel_path, None) is not None
+            else:
+                changed = self._update(rel_path, stat)
+            if changed:
+                self._by_name = None
+                self._save()
+
+    def find_symbol(self, name, limit=50):
+        """Return [(path, line, kind, qualname, signature)] for definitions of name.
+
+        name may be a bare name or a dotted qualified name such as
+        "Class.method". When nothing matches exactly, definitions containing
+        name (case-insensitively) are returned instead.
+        """
+        self.refresh()
+        with self._lock:
+            defs_by_name = self._names()[0]
+            last = name.split(".")[-1]
+            found = [
+                entry for entry in defs_by_name.get(last, ())
+                if "." not in name or entry[3] == name or entry[3].endswith("." + name)
+            ]
+            if not found:
+                needle = name.lower()
+                found = [
+                    entry for entries in defs_by_name.values() for entry in entries
+                    if needle in entry[3].lower()
+                ]
+            return sorted(found)[:limit]
+
+    def find_references(self, name, limit=100):
+        """Return [(path, line, kind, detail)] for call sites and imports of name."""
+        self.refresh()
+        with self._lock:
+            refs_by_name = self._names()[1]
+            return sorted(refs_by_name.get(name.split(".")[-1], ()))[:limit]
+
+    def stats(self):
+        """Return the number of indexed files and definitions."""
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "definitions": sum(len(record["defs"]) for record in self._files.values()),
+            }
+
+    def _python_files(self):
+        """Yield (rel_path, stat) for Python files under the workspace that are not ignored."""
+        start = len(os.path.abspath(self.root)) + 1
+        for path in walk_files(self.root, get_ignore_rules(self.root), hidden=False):
+            if not path.endswith(".py"):
+                continue
+            try:
+                stat = os.stat(path, follow_symlinks=False)
+            except OSError:
+                continue
+            yield path[start:].replace(os.sep, "/"), stat
+
+    def _update(self, rel_path, stat):
+        """Bring one file's record up to date; return True if it changed."""
+        record = self._files.get(rel_path)
+        if record is not None and record["size"] == stat.st_size and \
+                record["mtime_ns"] == stat.st_mtime_ns:
+            return False
+        if stat.st_size > self.MAX_FILE_BYTES:
+            return self._files.pop(rel_path, None) is not None
+        try:
+            with open(os.path.join(self.root, rel_path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return self._files.pop(rel_path, None) is not None
+
+        digest = hashlib.sha1(data).hexdigest()
+        if record is not None and record["hash"] == digest:
+            # Touched but not changed; keep the parsed symbols
+            record["size"] = stat.st_size
+            record["mtime_ns"] = stat.st_mtime_ns
+            return True
+        try:
+            defs, imports, calls = parse_symbols(data.decode("utf-8", errors="replace"))
+        except (SyntaxError, ValueError):
+            # Keep the last good symbols of a file that is mid-edit
+            defs, imports, calls = (record["defs"], record["imports"], record["calls"]) \
+                if record is not None else ([], [], [])
+        self._files[rel_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": digest,
+            "defs": defs,
+            "imports": imports,
+            "calls": calls,
+        }
+        return True
+
+    def _names(self):
+        """Return (definitions by name, references by name), rebuilt after changes."""
+        if self._by_name is None:
+            defs_by_name = {}
+            refs_by_name = {}
+            for rel_path, record in self._files.items():
+                for qualname, kind, line, signature in record["defs"]:
+                    defs_by_name.setdefault(qualname.split(".")[-1], []).append(
+                        (rel_path, line, kind, qualname, signature)
+                    )
+                for bound, target, line in record["imports"]:
+                    entry = (rel_path, line, "import", target)
+                    refs_by_name.setdefault(bound, []).append(entry)
+                    imported = target.split(".")[-1]
+                    if imported != bound:
+                        refs_by_name.setdefault(imported, []).append(entry)
+                for called, line, expression in record["calls"]:
+                    refs_by_name.setdefault(called, []).append((rel_path, line, "call", expression))
+            self._by_name = (defs_by_name, refs_by_name)
+        return self._by_name
+
+    def _load(self):
+        """Read the stored index, ignoring it if missing, unreadable or from another version."""
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if stored.get("version") == INDEX_VERSION and stored.get("root") == self.root:
+            self._files = stored.get("files", {})
+
+    def _save(self):
+        """Write the index atomically so a crash never leaves a half-written file."""
+        try:
+            tmp_path = self.store_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "root": self.root, "files": self._files}, f)
+            os.replace(tmp_path, self.store_path)
+        except OSError:
+            pass
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(root):
+    """Return the shared SymbolIndex for a workspace, loading it from disk on first use."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            name = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+            index = _indexes[root] = SymbolIndex(root, get_data_dir("symbols") / f"{name}.json")
+        return index
+
+
+def _source_line(root, rel_path, line, cache):
+    """Return one stripped source line, reading each file at most once."""
+    if rel_path not in cache:
+        try:
+            with open(os.path.join(root, rel_path), "r", encoding="utf-8", errors="replace") as f:
+                cache[rel_path] = f.read().splitlines()
+        except OSError:
+            cache[rel_path] = []
+    lines = cache[rel_path]
+    return lines[line - 1].strip() if 0 < line <= len(lines) else ""
+
+
+def format_symbols(name, definitions):
+    """Format find_symbol results, one definition per line."""
+    if not definitions:
+        return f"No definition of '{name}' found in the project's Python files."
+    lines = [f"Definitions of '{name}':"]
+    for rel_path, line, kind, qualname, signature in definitions:
+        lines.append(f"{rel_path}:{line}: {kind} {qualname}: {signature}")
+    return "\n".join(lines)
+
+
+def format_references(root, name, references):
+    """Format find_references results with the source line of each reference."""
+    if not references:
+        return f"No references to '{name}' found in the project's Python files."
+    cache = {}
+    lines = [f"{len(references)} references to '{name}':"]
+    for rel_path, line, kind, detail in references:
+        lines.append(f"{rel_path}:{line}: [{kind}] {_source_line(root, rel_path, line, cache)}")
+    return "\n".join(lines)
@@ -1,61 +1,136 @@
 import streamlit as st
-import subprocess
 import os
-import platform
+import signal
 import time
 
+from command_runner import CommandRun
+from command_stats import SORT_KEYS, CommandHistory, CommandRecord, format_bytes, format_record, rusage_fields
+from config_loader import get_config
+from job_manager import JobManager, format_job
+from output_spool import STREAMS, OutputSpool
+from shell_session import PEXPECT_AVAILABLE, get_shell_session
+from terminal_buffer import TerminalBuffer
+
 class Terminal:
     def __init__(self, cwd):
         self.cwd = cwd
+        self.shell = None
+        if PEXPECT_AVAILABLE and str(get_config("persistent_shell", "true")).lower() in ("1", "true", "yes", "on"):
+            self.shell = get_shell_session(cwd)
         if 'terminal_output' not in st.session_state:
-            st.session_state.terminal_output = ["Welcome to Cline Terminal. Type commands below."]
+            st.session_state.terminal_output = TerminalBuffer(
+                max_bytes=int(get_config("terminal_buffer_bytes", 1024 * 1024)),
+                max_lines=int(get_config("terminal_buffer_lines", 5000))
+            )
+            st.session_state.terminal_output.append("Welcome to Cline Terminal. Type commands below.")
         if 'command_history' not in st.session_state:
             st.session_state.command_history = []
+        if 'job_manager' not in st.session_state:
+            st.session_state.job_manager = JobManager()
+        if 'output_spool' not in st.session_state:
+            st.session_state.output_spool = OutputSpool(
+                max_bytes=int(get_config("output_spool_bytes", 1024 * 1024 * 1024))
+            )
+        if 'command_stats' not in st.session_state:
+            st.session_state.command_stats = CommandHistory()
+        self.jobs = st.session_state.job_manager
+        self.spool = st.session_state.output_spool
+        self.stats = st.session_state.command_stats
+        self.last_output = None
+        self.last_record = None
+        # Whether the previews returned for the last command left part of its output out
+        self.last_truncated = False
     
-    def execute_command(self, command):
-        """Execute a command in the terminal and return output."""
+    def execute_command(self, command, timeout=None, live=True):
+        """Execute a command and return (stdout, stderr, returncode).
+        
+        Commands run in the workspace's persistent shell when pexpect is
+        available (and persistent_shell is not turned off), so cd and
+        exported variables carry over; otherwise each runs in a fresh
+        process. Output is spooled to disk as it arrives and, when live is
+        set, its tail is shown on screen. The returned stdout and stderr are
+        head/tail previews; the full output stays in self.last_output and
+        self.last_truncated tells whether either preview is shortened. The
+        command is stopped after timeout seconds (the command_timeout
+        setting by default). Its resource use is added to self.stats and
+        kept in self.last_record.
+        """
+        if timeout is None:
+            timeout = float(get_config("command_timeout", 300))
         try:
             # Add command to output
-            st.session_state.terminal_output.append(f"$ {command}")
+            st.session_state.terminal_output.append(f"$ {command}", "prompt")
             st.session_state.command_history.append(command)
             
-            # Execute command
-            if platform.system() == "Windows":
-                process = subprocess.Popen(
-                    command,
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    cwd=self.cwd
-                )
-            else:
-                process = subprocess.Popen(
-                    command,
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    cwd=self.cwd
-                )
+            spooled = self.spool.new(command)
+            self.last_output = spooled
+            self.last_truncated = False
+            placeholder = st.empty() if live else None
+            last_update = [0.0]
+            
+            def show(stream, text):
+                spooled.write(stream, text)
+                # Redraw at most a few times a second
+                if live and time.monotonic() - last_update[0] >= 0.25:
+                    last_update[0] = time.monotonic()
+                    placeholder.code(spooled.live_tail, language="plaintext")
             
-            stdout, stderr = process.communicate()
+            started = time.time()
+            usage = (None, None, None)
+            try:
+                if self.shell is not None:
+                    cwd = self.shell.cwd
+                    _, _, returncode, timed_out = self.shell.run(
+                        command, timeout,
+                        on_output=lambda text: show("stdout", text),
+                        stderr_path=spooled.paths["stderr"],
+                        keep_output=False
+                    )
+                    wall_time = time.time() - started
+                    if self.shell.last_cpu_times is not None:
+                        usage = self.shell.last_cpu_times + (None,)
+                else:
+                    cwd = self.cwd
+                    run = CommandRun(command, self.cwd, keep_output=False)
+                    _, _, returncode = run.wait(
+                        timeout,
+                        on_output=lambda chunks: [show(stream, text) for stream, text in chunks]
+                    )
+                    timed_out = run.timed_out
+                    wall_time = run.wall_time
+                    if run.rusage is not None:
+                        usage = rusage_fields(run.rusage)
+            finally:
+                spooled.finish()
+            
+            record = CommandRecord(
+                command, cwd, "shell" if self.shell is not None else "process", started, wall_time,
+                returncode, timed_out, usage[0], usage[1], usage[2],
+                spooled.size("stdout"), spooled.size("stderr")
+            )
+            self.stats.add(record)
+            self.last_record = record
+            
+            stdout, stdout_truncated = spooled.preview("stdout")
+            stderr, stderr_truncated = spooled.preview("stderr")
+            self.last_truncated = stdout_truncated or stderr_truncated
+            if timed_out:
+                stderr += f"\n[Command timed out after {timeout:g} seconds and was interrupted]"
+            if placeholder is not None:
+                placeholder.code(spooled.live_tail or "(no output)", language="plaintext")
             
             # Add output to terminal
             if stdout:
                 st.session_state.terminal_output.append(stdout)
             if stderr:
-                st.session_state.terminal_output.append(stderr)
+                st.session_state.terminal_output.append(stderr, "error")
+            st.session_state.terminal_output.append(f"[exit {returncode}; {format_record(record)}]", "note")
             
-            # Keep only the last 100 lines
-            if len(st.session_state.terminal_output) > 100:
-                st.session_state.terminal_output = st.session_state.terminal_output[-100:]
-            
-            return stdout, stderr, process.returncode
+            return stdout, stderr, returncode
             
         except Exception as e:
             error_msg = f"Error executing command: {str(e)}"
-            st.session_state.terminal_output.append(error_msg)
+            st.session_state.terminal_output.append(error_msg, "error")
             return "", error_msg, 1
     
     def render(self):
@@ -82,18 +157,29 @@ class Terminal:
         .terminal-prompt {
             color: #4ec9b0;
         }
+        .terminal-error {
+            color: #f48771;
+        }
+        .terminal-note {
+            color: #808080;
+            font-style: italic;
+        }
         </style>
         """, unsafe_allow_html=True)
         
-        # Display terminal output using custom HTML
-        terminal_text = ""
-        for line in st.session_state.terminal_output:
-            if line.startswith("$ "):
-                terminal_text += f'<div class="terminal-line"><span class="terminal-prompt">{line}</span></div>'
-            else:
-                terminal_text += f'<div class="terminal-line">{line}</div>'
-                
-        st.markdown(f'<div class="terminal-container">{terminal_text}</div>', unsafe_allow_html=True)
+        # Display terminal output; each chunk was escaped and converted to HTML when it arrived
+        st.markdown(
+            f'<div class="terminal-container">{st.session_state.terminal_output.html()}</div>',
+            unsafe_allow_html=True
+        )
+        
+        # The persistent shell keeps its own working directory
+        if self.shell is not None:
+            col1, col2 = st.columns([5, 1])
+            col1.caption(f"Shell directory: {self.shell.cwd}")
+            if col2.button("Restart Shell"):
+                self.shell.restart()
+                st.session_state.terminal_output.append("[Shell restarted]")
         
         # Command input
         command = st.text_input("Enter command", key="terminal_command")
@@ -153,3 +239,89 @@ class Terminal:
                 st.rerun()  # Changed from st.experimental_rerun()
         
         return None
+    
+    def render_jobs(self):
+        """Render the background jobs panel: start, list, tail, signal and remove jobs."""
+        st.subheader("Background Jobs")
+        job_command = st.text_input("Start a long-running command (e.g. a dev server)", key="job_command")
+        if st.button("Start Job") and job_command:
+            job = self.jobs.start(job_command, self.shell.cwd if self.shell is not None else self.cwd)
+            st.success(f"Started job {job.id}")
+        
+        jobs = self.jobs.jobs()
+        if not jobs:
+            st.caption("No background jobs.")
+            return
+        
+        for job in reversed(jobs):
+            with st.expander(format_job(job), expanded=job.running):
+                st.code(self.jobs.tail(job.id, 8192) or "(no output yet)", language="plaintext")
+                col1, col2, col3, col4 = st.columns(4)
+                if col1.button("Refresh", key=f"job_refresh_{job.id}"):
+                    st.rerun()
+                if job.running:
+                    if col2.button("Interrupt", key=f"job_interrupt_{job.id}"):
+                        self.jobs.signal(job.id, signal.SIGINT)
+                        st.rerun()
+                    if col3.button("Stop", key=f"job_stop_{job.id}"):
+                        self.jobs.stop(job.id)
+                        st.rerun()
+                    if col4.button("Kill", key=f"job_kill_{job.id}"):
+                        self.jobs.stop(job.id, force=True)
+                        st.rerun()
+                elif col2.button("Remove", key=f"job_remove_{job.id}"):
+                    self.jobs.remove(job.id)
+                    st.rerun()
+    
+    def render_output_viewer(self):
+        """Page through and search the full spooled output of recent commands."""
+        outputs = self.spool.recent()
+        if not outputs:
+            return
+        with st.expander("Full command output"):
+            output = st.selectbox(
+                "Command",
+                outputs,
+                format_func=lambda o: f"#{o.id} {o.command[:60]} ({o.size('stdout') + o.size('stderr')} bytes)",
+                key="output_viewer_command"
+            )
+            stream = st.radio("Stream", STREAMS, horizontal=True, key="output_viewer_stream")
+            query = st.text_input("Find in output", key="output_viewer_query")
+            if query:
+                hits = output.search(stream, query)
+                st.caption(f"{len(hits)} matching lines" + (" (first 50 shown)" if len(hits) >= 50 else ""))
+                for page, line in hits:
+                    st.text(f"page {page + 1}: {line}")
+            pages = output.page_count(stream)
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                                   key="output_viewer_page")
+            st.code(output.page(stream, page - 1) or "(empty)", language="plaintext")
+    
+    def render_stats(self):
+        """Show the resources used by this session's commands, sortable and exportable."""
+        if not len(self.stats):
+            return
+        with st.expander("Command resource usage"):
+            count, wall, cpu, output = self.stats.totals()
+            st.caption(f"{count} commands: {wall:.1f}s wall, {cpu:.1f}s CPU, {format_bytes(output)} output")
+            col1, col2 = st.columns([3, 1])
+            sort_by = col1.selectbox("Sort by", list(SORT_KEYS), key="command_stats_sort")
+            descending = col2.checkbox("Highest first", value=True, key="command_stats_descending")
+            rows = []
+            for record in self.stats.records(sort_by, descending):
+                rows.append({
+                    "Command": record.command,
+                    "Exit": record.returncode,
+                    "Wall (s)": round(record.wall_time, 2),
+                    "User CPU (s)": None if record.user_cpu is None else round(record.user_cpu, 2),
+                    "System CPU (s)": None if record.system_cpu is None else round(record.system_cpu, 2),
+                    "Peak RSS": None if record.peak_rss is None else format_bytes(record.peak_rss),
+                    "Output": format_bytes(record.output_bytes),
+                    "Started": time.strftime("%H:%M:%S", time.localtime(record.started)),
+                })
+            st.dataframe(rows, use_container_width=True)
+            col1, col2 = st.columns(2)
+            col1.download_button("Export JSON lines", self.stats.export_json(),
+                                 file_name="command_usage.jsonl", mime="application/json")
+            col2.download_button("Export CSV", self.stats.export_csv(),
+                                 file_name="command_usage.csv", mime="text/csv")
@@ -0,0 +1,167 @@
+import html
+import re
+from collections import deque
+
+# Any escape sequence: CSI (ESC [ ... final byte), OSC (ESC ] ... BEL or ST) or a two-byte escape
+_ESCAPE = re.compile(r"\x1b(?:\[([0-9;?]*)([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+
+_COLORS = ["#000000", "#cd3131", "#0dbc79", "#e5e510", "#2472c8", "#bc3fbc", "#11a8cd", "#e5e5e5"]
+_BRIGHT_COLORS = ["#666666", "#f14c4c", "#23d18b", "#f5f543", "#3b8eea", "#d670d6", "#29b8db", "#ffffff"]
+
+
+def collapse_carriage_returns(text):
+    """Keep only what is left visible on each line after \\r rewrites, as a terminal would."""
+    if "\r" not in text:
+        return text
+    lines = text.replace("\r\n", "\n").split("\n")
+    for index, line in enumerate(lines):
+        if "\r" in line:
+            visible = ""
+            for segment in line.split("\r"):
+                # Later writes overwrite the start of the line, earlier text shows past their end
+                visible = segment + visible[len(segment):]
+            lines[index] = visible
+    return "\n".join(lines)
+
+
+def _sgr_style(params, style):
+    """Apply SGR parameters to a (color, background, bold) style tuple."""
+    color, background, bold = style
+    codes = [int(code) if code.isdigit() else 0 for code in params.split(";")] if params else [0]
+    index = 0
+    while index < len(codes):
+        code = codes[index]
+        if code == 0:
+            color, background, bold = None, None, False
+        elif code == 1:
+            bold = True
+        elif code == 22:
+            bold = False
+        elif 30 <= code <= 37:
+            color = _COLORS[code - 30]
+        elif 90 <= code <= 97:
+            color = _BRIGHT_COLORS[code - 90]
+        elif code == 39:
+            color = None
+        elif 40 <= code <= 47:
+            background = _COLORS[code - 40]
+        elif 100 <= code <= 107:
+            background = _BRIGHT_COLORS[code - 100]
+        elif code == 49:
+            background = None
+        elif code in (38, 48) and index + 1 < len(codes):
+            # 256-colour and truecolour forms; only the basic palette is rendered
+            index += 2 if codes[index + 1] == 5 else 4
+        index += 1
+    return color, background, bold
+
+
+def ansi_to_html(text):
+    """Convert text with ANSI colour codes into escaped HTML with styled spans.
+
+    SGR colour and bold codes become spans; every other escape sequence is
+    dropped, and all text is HTML-escaped.
+    """
+    parts = []
+    style = (None, None, False)
+    position = 0
+
+    def add(segment):
+        if not segment:
+            return
+        segment = html.escape(segment)
+        color, background, bold = style
+        css = []
+        if color:
+            css.append(f"color:{color}")
+        if background:
+            css.append(f"background-color:{background}")
+        if bold:
+            css.append("font-weight:bold")
+        parts.append(f'<span style="{";".join(css)}">{segment}</span>' if css else segment)
+
+    for match in _ESCAPE.finditer(text):
+        add(text[position:match.start()])
+        if match.group(2) == "m":
+            style = _sgr_style(match.group(1), style)
+        position = match.end()
+    add(text[position:])
+    return "".join(parts)
+
+
+class _Entry:
+    """One chunk of terminal output and its rendered HTML."""
+
+    __slots__ = ("size", "lines", "html")
+
+    def __init__(self, size, lines, html_text):
+        self.size = size
+        self.lines = lines
+        self.html = html_text
+
+
+class TerminalBuffer:
+    """Terminal scrollback bounded by both bytes and lines.
+
+    Each appended chunk is collapsed (carriage returns), escaped and
+    converted from ANSI to HTML once, when it is added; html() only joins
+    the cached fragments, and reuses the joined result until the buffer
+    changes. The oldest chunks are dropped once either bound is exceeded,
+    and a single chunk larger than the byte bound keeps only its tail.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024, max_lines=5000):
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self._entries = deque()
+        self._bytes = 0
+        self._lines = 0
+        self._html = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, text, kind="output"):
+        """Add a chunk; kind is "prompt" for a command line, "error" for stderr, "note" for
+        messages from the terminal itself, else "output"."""
+        text = collapse_carriage_returns(text)
+        size = len(text.encode("utf-8"))
+        note = ""
+        if size > self.max_bytes:
+            text = text[-self.max_bytes:]
+            note = f'<div class="terminal-note">[{size - len(text.encode("utf-8"))} earlier bytes not shown]</div>'
+            size = len(text.encode("utf-8"))
+        lines = text.count("\n") + 1
+        if lines > self.max_lines:
+            text = "\n".join(text.split("\n")[-self.max_lines:])
+            lines = self.max_lines
+            size = len(text.encode("utf-8"))
+
+        body = ansi_to_html(text)
+        if kind == "prompt":
+            body = f'<span class="terminal-prompt">{body}</span>'
+        elif kind == "error":
+            body = f'<span class="terminal-error">{body}</span>'
+        elif kind == "note":
+            body = f'<span class="terminal-note">{body}</span>'
+        self._entries.append(_Entry(size, lines, f'{note}<div class="terminal-line">{body}</div>'))
+        self._bytes += size
+        self._lines += lines
+
+        while len(self._entries) > 1 and (self._bytes > self.max_bytes or self._lines > self.max_lines):
+            dropped = self._entries.popleft()
+            self._bytes -= dropped.size
+            self._lines -= dropped.lines
+        self._html = None
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._lines = 0
+        self._html = None
+
+    def html(self):
+        """Return the HTML of every chunk in the buffer, oldest first."""
+        if self._html is None:
+            self._html = "".join(entry.html for entry in self._entries)
+        return self._html
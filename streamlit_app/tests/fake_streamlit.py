@@ -0,0 +1,97 @@
+"""A minimal stand-in for the parts of the Streamlit API the app's components call.
+
+Widgets return the values queued in `values` (keyed by label), else their
+default; everything written to the page is recorded in `calls`.
+"""
+
+
+class Rerun(Exception):
+    """Raised by st.rerun(), as Streamlit interrupts the script run."""
+
+
+class SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class _Block:
+    def __init__(self, st):
+        self._st = st
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._st, name)
+
+
+class FakeStreamlit:
+    def __init__(self, values=None):
+        self.session_state = SessionState()
+        self.values = dict(values or {})
+        self.calls = []
+
+    def _record(self, kind, *args):
+        self.calls.append((kind,) + args)
+
+    def written(self, kind):
+        return [args[0] if len(args) == 1 else args for (k, *args) in self.calls if k == kind]
+
+    def markdown(self, text, **kwargs):
+        self._record("markdown", text)
+
+    def caption(self, text, **kwargs):
+        self._record("caption", text)
+
+    def code(self, text, **kwargs):
+        self._record("code", text)
+
+    def error(self, text, **kwargs):
+        self._record("error", text)
+
+    def warning(self, text, **kwargs):
+        self._record("warning", text)
+
+    def info(self, text, **kwargs):
+        self._record("info", text)
+
+    def text_area(self, label, value="", **kwargs):
+        return self.values.get(label, value)
+
+    def text_input(self, label, value="", **kwargs):
+        return self.values.get(label, value)
+
+    def checkbox(self, label, value=False, **kwargs):
+        return self.values.get(label, value)
+
+    def button(self, label, **kwargs):
+        return self.values.get(label, False)
+
+    def columns(self, spec, **kwargs):
+        count = spec if isinstance(spec, int) else len(spec)
+        return [_Block(self) for _ in range(count)]
+
+    def container(self, **kwargs):
+        return _Block(self)
+
+    def expander(self, label, **kwargs):
+        self._record("expander", label)
+        return _Block(self)
+
+    def spinner(self, text=""):
+        return _Block(self)
+
+    def empty(self):
+        return _Block(self)
+
+    def rerun(self):
+        raise Rerun()
@@ -0,0 +1,29 @@
+import io
+import os
+import zipfile
+
+import dir_cache
+from advanced_file_ops import AdvancedFileOperations
+
+
+class Upload(io.BytesIO):
+    name = "archive.zip"
+
+
+def test_import_from_zip_notifies_the_caches(tmp_path):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as archive:
+        archive.writestr("pkg/module.py", "x = 1\n")
+    ops = AdvancedFileOperations(str(tmp_path))
+    seen = []
+    dir_cache.add_change_listener(seen.append)
+    try:
+        generation = dir_cache.change_generation()
+        ok, message = ops.import_from_zip(Upload(data.getvalue()))
+    finally:
+        dir_cache._listeners.remove(seen.append)
+    assert ok, message
+    assert (tmp_path / "pkg" / "module.py").read_text() == "x = 1\n"
+    assert seen == [os.path.abspath(str(tmp_path))]
+    assert dir_cache.change_generation() > generation
+    assert "pkg" in [entry.name for entry in dir_cache.get_directory_cache().entries(str(tmp_path))]
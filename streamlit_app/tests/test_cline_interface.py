@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+import cline_interface
+from fake_streamlit import FakeStreamlit, Rerun
+
+
+class Part:
+    def __init__(self, text):
+        self.text = text
+
+
+class Content:
+    def __init__(self, role, text):
+        self.role = role
+        self.parts = [Part(text)]
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeChat:
+    """Records what it is sent and answers with queued replies, like a ChatSession."""
+
+    def __init__(self, history, replies, sent):
+        self.history = [Content(turn["role"], turn["parts"][0]) for turn in history]
+        self._replies = replies
+        self._sent = sent
+
+    def send_message(self, content, stream=False):
+        reply = self._replies.pop(0)
+        self._sent.append(content)
+        self.history += [Content("user", content), Content("model", reply)]
+        if stream:
+            return [Chunk(reply[:5]), Chunk(reply[5:])]
+        return Chunk(reply)
+
+
+class FakeClient:
+    def __init__(self, replies):
+        self.replies = replies
+        self.sent = []
+        self.chats = 0
+
+    def GenerativeModel(self, name, system_instruction=None):
+        client = self
+
+        class Model:
+            def start_chat(self, history):
+                client.chats += 1
+                return FakeChat(history, client.replies, client.sent)
+
+        return Model()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLINE_WEB_IDE_DATA_DIR", str(tmp_path / "data"))
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "main.py").write_text("def greet(name):\n    return f'hello {name}'\n")
+    st = FakeStreamlit()
+    monkeypatch.setattr(cline_interface, "st", st)
+    interface = cline_interface.ClineInterface()
+    return st, interface, str(project)
+
+
+def send(st, interface, project, message):
+    st.values = {"Message Cline": message, "Send": True}
+    with pytest.raises(Rerun):
+        interface.render(None, None, {}, project)
+
+
+def test_send_runs_tool_calls_and_records_the_turn(app):
+    st, interface, project = app
+    call = {"name": "read_file", "args": {"path": "main.py"}}
+    client = FakeClient([f"Reading it.\n```function_call\n{json.dumps(call)}\n```", "It greets."])
+    st.session_state.client = client
+
+    send(st, interface, project, "What does main.py do?")
+
+    assert st.written("error") == []
+    roles = [message["role"] for message in st.session_state.chat_history]
+    assert roles == ["user", "assistant", "tool_result", "assistant"]
+    assert "hello {name}" in st.session_state.chat_history[2]["content"]
+    assert st.session_state.chat_history[-1]["content"] == "It greets."
+    assert st.session_state.chat_history[0]["history_bytes"]["held"] >= 0
+    assert "Current Project Context" in client.sent[0]
+    assert client.sent[1].startswith("Here are the results of the function calls")
+
+
+def test_history_over_the_ceiling_reseeds_the_chat(app):
+    st, interface, project = app
+    client = FakeClient(["First answer.", "Second answer."])
+    st.session_state.client = client
+    send(st, interface, project, "First question")
+    assert client.chats == 1
+
+    st.session_state.conversation_compactor.max_bytes = 10
+    send(st, interface, project, "Second question")
+
+    assert st.written("error") == []
+    assert client.chats == 2
+    assert st.session_state.chat_history[-1]["content"] == "Second answer."
+    assert st.session_state.chat_history[2]["history_bytes"]["saved"] > 0
+    # The previous turns are shown with their figures on the next render
+    st.values = {}
+    interface.render(None, None, {}, project)
+    assert any(text.startswith("History replayed") for text in st.written("caption"))
@@ -0,0 +1,73 @@
+import os
+
+import code_retrieval
+import dir_cache
+from code_retrieval import ChunkIndex, format_chunks, get_chunk_index, tokenize
+
+
+def make_project(tmp_path):
+    (tmp_path / "auth.py").write_text(
+        "def check_password(user, password):\n    return hash_password(password) == user.password_hash\n"
+    )
+    (tmp_path / "render.py").write_text("def renderPage(template):\n    return template.format()\n")
+    (tmp_path / ".secret").write_text("password password password\n")
+    return str(tmp_path)
+
+
+def test_tokenize_splits_identifiers_and_drops_stop_words():
+    assert tokenize("How does check_password work?") == ["check_password", "check", "password", "work"]
+    assert tokenize("renderHTMLPage x") == ["renderhtmlpage", "render", "html", "page"]
+
+
+def test_search_ranks_the_matching_chunk_first(tmp_path):
+    index = ChunkIndex(make_project(tmp_path))
+    index.refresh(wait=True)
+    chunks = index.search("where is the password checked?")
+    assert [chunk.path for chunk in chunks] == ["auth.py"]
+    assert (chunks[0].start_line, chunks[0].end_line) == (1, 2)
+    assert chunks[0].text.startswith("def check_password")
+    assert index.stats()["files"] == 2
+    assert index.search("the") == []
+
+
+def test_long_files_are_split_into_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(ChunkIndex, "CHUNK_LINES", 2)
+    (tmp_path / "long.py").write_text("alpha = 1\nbeta = 2\ngamma = 3\ndelta = 4\nepsilon = 5\n")
+    index = ChunkIndex(str(tmp_path))
+    index.refresh(wait=True)
+    assert [(c.start_line, c.end_line) for c in index.search("delta")] == [(3, 4)]
+    assert index.stats()["chunks"] == 3
+
+
+def test_python_scoring_matches_numpy(tmp_path, monkeypatch):
+    index = ChunkIndex(make_project(tmp_path))
+    index.refresh(wait=True)
+    with_numpy = [(c.path, round(c.score, 6)) for c in index.search("render template password")]
+    monkeypatch.setattr(code_retrieval, "NUMPY_AVAILABLE", False)
+    assert [(c.path, round(c.score, 6)) for c in index.search("render template password")] == with_numpy
+
+
+def test_files_written_by_the_app_are_rechunked(tmp_path):
+    index = get_chunk_index(make_project(tmp_path))
+    index.refresh(wait=True)
+    path = os.path.join(str(tmp_path), "render.py")
+    with open(path, "w") as f:
+        f.write("def draw_widget():\n    pass\n")
+    dir_cache.invalidate_path(path)
+    assert [c.path for c in index.search("widget")] == ["render.py"]
+    assert index.search("template") == []
+
+    os.remove(path)
+    dir_cache.invalidate_path(path)
+    assert index.search("widget") == []
+    assert index.stats()["files"] == 1
+
+
+def test_format_chunks_respects_the_byte_budget():
+    chunks = [
+        code_retrieval.CodeChunk("a.py", 1, 2, "x" * 100, 2.0),
+        code_retrieval.CodeChunk("b.py", 5, 6, "y", 1.0),
+    ]
+    text, included = format_chunks(chunks, 60)
+    assert included == [chunks[1]]
+    assert text == "b.py (lines 5-6):\n```\ny\n```"
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+import pytest
+
+from command_runner import CommandRun
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses POSIX shell commands")
+
+
+def test_output_arrives_while_the_command_runs(tmp_path):
+    run = CommandRun("echo first; sleep 0.5; echo second >&2", str(tmp_path))
+    batches = []
+    stdout, stderr, returncode = run.wait(timeout=10, on_output=lambda chunks: batches.append((time.monotonic(), chunks)))
+    assert (stdout, stderr, returncode) == ("first\n", "second\n", 0)
+    assert batches[0][1] == [("stdout", "first\n")]
+    # The first line was handed over before the command finished
+    assert batches[-1][0] - batches[0][0] >= 0.3
+
+
+def test_exit_code_and_cwd(tmp_path):
+    stdout, _, returncode = CommandRun("pwd; exit 3", str(tmp_path)).wait(timeout=10)
+    assert os.path.samefile(stdout.strip(), tmp_path)
+    assert returncode == 3
+
+
+def test_timeout_kills_the_whole_process_group(tmp_path):
+    marker = tmp_path / "survived"
+    run = CommandRun(f"(sleep 2; touch {marker}) & sleep 30", str(tmp_path))
+    started = time.monotonic()
+    _, _, returncode = run.wait(timeout=0.5)
+    assert run.timed_out
+    assert returncode < 0
+    assert time.monotonic() - started < 5
+    time.sleep(2.5)
+    assert not marker.exists()
+
+
+def test_output_is_not_kept_when_streamed_elsewhere(tmp_path):
+    run = CommandRun("seq 1 20000", str(tmp_path), keep_output=False)
+    received = []
+    stdout, stderr, returncode = run.wait(timeout=10, on_output=received.extend)
+    assert (stdout, stderr, returncode) == ("", "", 0)
+    assert "".join(text for _, text in received).split() == [str(n) for n in range(1, 20001)]
+
+
+def test_multibyte_characters_split_across_reads(tmp_path):
+    stdout, _, _ = CommandRun("printf '\\303'; sleep 0.2; printf '\\251\\n'", str(tmp_path)).wait(timeout=10)
+    assert stdout == "é\n"
+
+
+def test_background_child_holding_the_pipes_does_not_hang_the_run(tmp_path):
+    started = time.monotonic()
+    stdout, _, returncode = CommandRun("echo done; sleep 3 &", str(tmp_path)).wait(timeout=10)
+    assert (stdout, returncode) == ("done\n", 0)
+    assert time.monotonic() - started < 2
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from command_runner import HAS_WAIT4, CommandRun
+from command_stats import (
+    CommandHistory, CommandRecord, format_bytes, format_record, parse_times, rusage_fields
+)
+from shell_session import PEXPECT_AVAILABLE, ShellSession
+
+
+def record(command, started, wall_time, user_cpu=None, system_cpu=None, peak_rss=None, stdout_bytes=0):
+    return CommandRecord(command, "/tmp", "process", started, wall_time, 0, False,
+                         user_cpu, system_cpu, peak_rss, stdout_bytes, 0)
+
+
+def test_parse_times():
+    assert parse_times("0m0.010s 0m0.020s\n1m2.500s 0m0.250s\n") == (62.51, 0.27)
+    assert parse_times("times: not available") is None
+
+
+def test_rusage_fields_converts_peak_memory_to_bytes():
+    usage = SimpleNamespace(ru_utime=1.5, ru_stime=0.25, ru_maxrss=2048)
+    peak = 2048 if sys.platform == "darwin" else 2048 * 1024
+    assert rusage_fields(usage) == (1.5, 0.25, peak)
+
+
+@pytest.mark.skipif(not HAS_WAIT4, reason="needs os.wait4")
+def test_runs_report_cpu_time_and_peak_memory_of_their_children(tmp_path):
+    command = f"{sys.executable} -c \"x = bytearray(50 * 1024 * 1024); sum(range(3 * 10**6))\""
+    run = CommandRun(command, str(tmp_path))
+    run.wait(timeout=30)
+    user_cpu, system_cpu, peak_rss = rusage_fields(run.rusage)
+    assert user_cpu > 0.01
+    assert peak_rss >= 50 * 1024 * 1024
+    assert run.wall_time >= user_cpu * 0.5
+
+
+def test_format():
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KB"
+    assert format_bytes(3 * 1024 ** 4) == "3072.0 GB"
+    assert format_record(record("ls", 0, 1.234, 0.5, 0.25, 2 * 1024 * 1024, 100)) == \
+        "wall 1.23s, user 0.50s, sys 0.25s, peak RSS 2.0 MB, output 100 B"
+    assert format_record(record("ls", 0, 2)) == "wall 2.00s, output 0 B"
+
+
+def test_history_sorts_totals_and_exports():
+    history = CommandHistory(max_records=2)
+    history.add(record("dropped", 0, 9))
+    history.add(record("fast", 1, 0.5, 0.1, 0.1, stdout_bytes=10))
+    history.add(record("slow", 2, 3.0, stdout_bytes=5))
+    assert len(history) == 2
+    assert [r.command for r in history.records()] == ["slow", "fast"]
+    assert [r.command for r in history.records("CPU time")] == ["fast", "slow"]
+    assert history.totals() == (2, 3.5, pytest.approx(0.2), 15)
+
+    rows = [json.loads(line) for line in history.export_json().splitlines()]
+    assert [row["command"] for row in rows] == ["fast", "slow"]
+    assert rows[1]["user_cpu"] is None
+    rows = list(csv.DictReader(io.StringIO(history.export_csv())))
+    assert [row["command"] for row in rows] == ["fast", "slow"]
+
+
+@pytest.mark.skipif(not PEXPECT_AVAILABLE, reason="needs pexpect")
+def test_shell_sessions_report_the_cpu_time_of_each_command(tmp_path):
+    session = ShellSession(str(tmp_path))
+    try:
+        session.run("true", timeout=10)
+        idle = session.last_cpu_times
+        session.run(f"{sys.executable} -c \"sum(range(10**7))\"", timeout=30)
+        user_cpu, system_cpu = session.last_cpu_times
+    finally:
+        session.close()
+    assert sum(idle) < 0.1
+    assert user_cpu > 0.05
@@ -0,0 +1,69 @@
+from conversation_compactor import ConversationCompactor, history_bytes
+
+
+def turn(number, tool_output="ok"):
+    return [
+        {"role": "user", "content": f"question {number} " + "q" * 400},
+        {"role": "assistant", "content": f"answer {number} " + "a" * 400},
+        {"role": "tool_result", "name": "read_file", "content": tool_output},
+    ]
+
+
+def test_history_under_the_ceiling_is_replayed_verbatim():
+    messages = turn(1) + turn(2)
+    compactor = ConversationCompactor(max_bytes=10**6)
+    assert compactor.compact(messages) == messages
+
+
+def test_old_turns_are_summarised_and_recent_ones_kept():
+    messages = turn(1, "line\n" * 100) + turn(2) + turn(3)
+    compactor = ConversationCompactor(max_bytes=2500, keep_turns=2)
+    compacted = compactor.compact(messages)
+
+    assert compactor.raw_bytes(compacted) < compactor.raw_bytes(messages)
+    assert compacted[0]["compacted"]
+    assert compacted[0]["content"].endswith("characters compacted]")
+    assert "earlier tool result compacted: 100 lines" in compacted[2]["content"]
+    assert compacted[3:] == messages[3:]
+    # The original messages are left untouched
+    assert "compacted" not in messages[0]
+
+
+def test_keep_turns_shrinks_until_the_history_fits():
+    messages = turn(1) + turn(2) + turn(3)
+    compactor = ConversationCompactor(max_bytes=1000, keep_turns=3)
+    compacted = compactor.compact(messages)
+    assert compacted[-3:] == messages[-3:]
+    assert all(message.get("compacted") for message in compacted[:2])
+
+
+def test_oversized_recent_tool_result_keeps_head_and_tail():
+    output = "\n".join(f"row {i}" for i in range(200))
+    messages = [{"role": "user", "content": "go"}, {"role": "tool_result", "content": output}]
+    compactor = ConversationCompactor(max_bytes=100, max_tool_result_bytes=50)
+    summary = compactor.compact(messages)[1]["content"]
+    assert summary.startswith("row 0\n")
+    assert summary.endswith("row 199")
+    assert "170 lines compacted" in summary
+
+
+def test_summaries_are_reused():
+    messages = turn(1) + turn(2)
+    compactor = ConversationCompactor(max_bytes=100, keep_turns=1)
+    first = compactor.compact(messages)
+    cached = len(compactor._summaries)
+    second = compactor.compact(messages)
+    assert second == first
+    assert len(compactor._summaries) == cached
+    assert second[0]["content"] is first[0]["content"]
+
+
+def test_history_bytes_counts_dicts_and_objects():
+    class Part:
+        text = "héllo"
+
+    class Content:
+        parts = [Part()]
+
+    history = [{"role": "user", "parts": ["abc", {"text": "de"}]}, Content()]
+    assert history_bytes(history) == 3 + 2 + len("héllo".encode("utf-8"))
@@ -0,0 +1,85 @@
+import os
+
+import dir_cache
+from dir_cache import DirectoryCache
+
+
+def names(listing):
+    return [entry.name for entry in listing.entries]
+
+
+def test_listing_is_sorted_and_split(tmp_path):
+    (tmp_path / "b.txt").write_text("b")
+    (tmp_path / "a").mkdir()
+    listing = DirectoryCache().listing(str(tmp_path))
+    assert names(listing) == ["a", "b.txt"]
+    assert [entry.name for entry in listing.dirs] == ["a"]
+    assert [entry.name for entry in listing.files] == ["b.txt"]
+
+
+def test_unchanged_directory_is_a_hit(tmp_path):
+    cache = DirectoryCache()
+    cache.RACY_WINDOW_NS = 0
+    first = cache.listing(str(tmp_path))
+    assert cache.listing(str(tmp_path)) is first
+    assert cache.stats()["hits"] == 1
+
+
+def test_racy_listing_is_read_again(tmp_path):
+    cache = DirectoryCache()
+    cache.RACY_WINDOW_NS = 10**18
+    first = cache.listing(str(tmp_path))
+    assert cache.listing(str(tmp_path)) is not first
+
+
+def test_invalidate_drops_the_subtree(tmp_path):
+    (tmp_path / "sub").mkdir()
+    cache = DirectoryCache()
+    cache.RACY_WINDOW_NS = 0
+    root = cache.listing(str(tmp_path))
+    sub = cache.listing(str(tmp_path / "sub"))
+    cache.invalidate(str(tmp_path))
+    assert cache.listing(str(tmp_path)) is not root
+    assert cache.listing(str(tmp_path / "sub")) is not sub
+
+
+def test_invalidate_non_recursive_keeps_children(tmp_path):
+    (tmp_path / "sub").mkdir()
+    cache = DirectoryCache()
+    cache.RACY_WINDOW_NS = 0
+    cache.listing(str(tmp_path))
+    sub = cache.listing(str(tmp_path / "sub"))
+    cache.invalidate(str(tmp_path), recursive=False)
+    assert cache.listing(str(tmp_path / "sub")) is sub
+
+
+def test_least_recently_used_listing_is_evicted(tmp_path):
+    for name in "abc":
+        (tmp_path / name).mkdir()
+    cache = DirectoryCache(max_entries=2)
+    for name in "abc":
+        cache.listing(str(tmp_path / name))
+    assert cache.stats()["directories"] == 2
+
+
+def test_missing_directory(tmp_path):
+    assert DirectoryCache().listing(str(tmp_path / "missing")) is None
+    assert DirectoryCache().entries(str(tmp_path / "missing")) == []
+
+
+def test_invalidate_path_refreshes_the_parent_and_notifies(tmp_path):
+    cache = dir_cache.get_directory_cache()
+    before = cache.listing(str(tmp_path))
+    seen = []
+    dir_cache.add_change_listener(seen.append)
+    try:
+        generation = dir_cache.change_generation()
+        (tmp_path / "new.txt").write_text("x")
+        dir_cache.invalidate_path(str(tmp_path / "new.txt"))
+        after = cache.listing(str(tmp_path))
+        assert after is not before
+        assert "new.txt" in names(after)
+        assert seen == [os.path.abspath(str(tmp_path / "new.txt"))]
+        assert dir_cache.change_generation() > generation
+    finally:
+        dir_cache._listeners.remove(seen.append)
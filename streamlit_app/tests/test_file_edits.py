@@ -0,0 +1,105 @@
+import os
+import stat
+
+import pytest
+
+from file_edits import EditError, apply_hunks, parse_edits
+from fs_tools import atomic_write
+
+SQL = "SELECT 1;\n-- old comment\nSELECT 2;\n"
+
+
+def apply(text, spec):
+    return apply_hunks(text, parse_edits(spec))
+
+
+def test_search_replace_block():
+    spec = "<<<<<<< SEARCH\nSELECT 2;\n=======\nSELECT 3;\n>>>>>>> REPLACE\n"
+    new_text, report = apply(SQL, spec)
+    assert new_text == "SELECT 1;\n-- old comment\nSELECT 3;\n"
+    assert report == ["Hunk 1: applied at line 3"]
+
+
+def test_search_text_must_be_unique():
+    spec = "<<<<<<< SEARCH\nSELECT\n=======\nUPDATE\n>>>>>>> REPLACE\n"
+    new_text, report = apply(SQL, spec)
+    assert new_text is None
+    assert "CONFLICT" in report[0]
+
+
+def test_missing_replace_marker():
+    with pytest.raises(EditError):
+        parse_edits("<<<<<<< SEARCH\na\n=======\nb\n")
+
+
+def test_no_edits():
+    with pytest.raises(EditError):
+        parse_edits("just some text")
+
+
+def test_unified_diff():
+    spec = "--- a/q.sql\n+++ b/q.sql\n@@ -2,2 +2,2 @@\n -- old comment\n-SELECT 2;\n+SELECT 3;\n"
+    new_text, _ = apply(SQL, spec)
+    assert new_text == "SELECT 1;\n-- old comment\nSELECT 3;\n"
+
+
+def test_removed_line_starting_with_dashes():
+    spec = "--- a/q.sql\n+++ b/q.sql\n@@ -1,3 +1,2 @@\n SELECT 1;\n--- old comment\n SELECT 2;\n"
+    new_text, report = apply(SQL, spec)
+    assert new_text == "SELECT 1;\nSELECT 2;\n", report
+
+
+def test_removed_and_added_lines_that_look_like_file_headers():
+    spec = "--- a/q.sql\n+++ b/q.sql\n@@ -1,3 +1,3 @@\n SELECT 1;\n--- old comment\n+++ new\n SELECT 2;\n"
+    new_text, _ = apply(SQL, spec)
+    assert new_text == "SELECT 1;\n++ new\nSELECT 2;\n"
+
+
+def test_header_without_counts():
+    new_text, _ = apply(SQL, "@@ @@\n SELECT 1;\n--- old comment\n SELECT 2;\n")
+    assert new_text == "SELECT 1;\nSELECT 2;\n"
+
+
+def test_several_hunks_and_no_newline_marker():
+    spec = (
+        "@@ -1,2 +1,2 @@\n SELECT 1;\n--- old comment\n+-- new\n"
+        "@@ -3 +3 @@\n-SELECT 2;\n+SELECT 3;\n\\ No newline at end of file\n"
+    )
+    new_text, report = apply(SQL, spec)
+    assert new_text == "SELECT 1;\n-- new\nSELECT 3;\n"
+    assert len(report) == 2
+
+
+def test_crlf_file_keeps_its_line_endings():
+    text = SQL.replace("\n", "\r\n")
+    new_text, _ = apply(text, "<<<<<<< SEARCH\nSELECT 2;\n=======\nSELECT 3;\n>>>>>>> REPLACE\n")
+    assert new_text == "SELECT 1;\r\n-- old comment\r\nSELECT 3;\r\n"
+
+
+def test_overlapping_hunks_conflict():
+    spec = (
+        "<<<<<<< SEARCH\nSELECT 1;\n-- old comment\n=======\nA\n>>>>>>> REPLACE\n"
+        "<<<<<<< SEARCH\n-- old comment\nSELECT 2;\n=======\nB\n>>>>>>> REPLACE\n"
+    )
+    new_text, report = apply(SQL, spec)
+    assert new_text is None
+    assert "CONFLICT" in report[1]
+
+
+def test_atomic_write_keeps_mode_and_line_endings(tmp_path):
+    path = tmp_path / "run.sh"
+    path.write_text("old\n")
+    os.chmod(path, 0o755)
+    atomic_write(str(path), "echo hi\r\n")
+    assert path.read_bytes() == b"echo hi\r\n"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o755
+    assert os.listdir(tmp_path) == ["run.sh"]
+
+
+def test_failed_atomic_write_leaves_the_old_file(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_text("old\n")
+    with pytest.raises(TypeError):
+        atomic_write(str(path), b"not text")
+    assert path.read_text() == "old\n"
+    assert os.listdir(tmp_path) == ["data.txt"]
@@ -0,0 +1,131 @@
+import fs_tools
+from fs_tools import (
+    format_directory_listing, format_file_window, is_binary, iter_directory, list_directory_page,
+    read_file_window
+)
+from ignore_rules import IgnoreRules
+
+
+def write_lines(tmp_path, count, name="lines.txt"):
+    path = tmp_path / name
+    path.write_text("".join(f"line {number}\n" for number in range(1, count + 1)))
+    return str(path)
+
+
+def test_is_binary():
+    assert not is_binary(b"")
+    assert not is_binary("plain text, ünïcode\n".encode("utf-8"))
+    assert is_binary(b"abc\0def")
+    # A multi-byte character cut off by the sample boundary
+    assert not is_binary("abcé".encode("utf-8")[:-1])
+    assert is_binary(b"\xff\x01\x02\x03" * 20)
+    assert not is_binary("caf\xe9 cr\xe8me\n".encode("latin-1") * 20)
+
+
+def test_line_range(tmp_path):
+    window = read_file_window(write_lines(tmp_path, 10), start_line=3, end_line=5)
+    assert window.text == "line 3\nline 4\nline 5\n"
+    assert (window.start_line, window.end_line) == (3, 5)
+    assert not window.truncated
+
+
+def test_line_range_past_the_end(tmp_path):
+    window = read_file_window(write_lines(tmp_path, 3), start_line=2, end_line=50)
+    assert window.text == "line 2\nline 3\n"
+    assert window.end_line == 3
+    assert read_file_window(write_lines(tmp_path, 3), start_line=9).text == ""
+
+
+def test_byte_range(tmp_path):
+    path = write_lines(tmp_path, 3)
+    window = read_file_window(path, offset=7, length=6)
+    assert window.text == "line 2"
+    assert (window.offset, window.end_offset) == (7, 13)
+    assert window.start_line is None
+
+
+def test_cap_cuts_at_the_last_complete_line(tmp_path):
+    window = read_file_window(write_lines(tmp_path, 100), max_bytes=20)
+    assert window.text == "line 1\nline 2\n"
+    assert window.truncated
+    assert window.end_offset == 14
+    result = format_file_window("lines.txt", window, max_bytes=20)
+    assert "ending at byte 14 of" in result
+    assert "start_line/end_line or offset/length" in result
+
+
+def test_large_files_are_memory_mapped(tmp_path, monkeypatch):
+    path = write_lines(tmp_path, 5000)
+    monkeypatch.setattr(fs_tools, "MMAP_THRESHOLD", 1024)
+    window = read_file_window(path, start_line=4000, end_line=4001)
+    assert window.text == "line 4000\nline 4001\n"
+
+
+def test_binary_files_are_not_decoded(tmp_path):
+    path = tmp_path / "image.bin"
+    path.write_bytes(b"\x89PNG\0\0\0" * 10)
+    window = read_file_window(str(path))
+    assert window.binary
+    assert window.text == ""
+    assert format_file_window("image.bin", window) == \
+        "File 'image.bin' is binary (70 bytes); its content was not decoded."
+
+
+def test_whole_small_file_has_no_span(tmp_path):
+    window = read_file_window(write_lines(tmp_path, 2))
+    assert format_file_window("lines.txt", window) == "Content of lines.txt:\n\n```\nline 1\nline 2\n\n```"
+    assert read_file_window(str(tmp_path / "lines.txt"), start_line=1).start_line == 1
+
+
+def make_tree(tmp_path):
+    for rel_path in ["a.py", "b.txt", "src/main.py", "src/util/helpers.py", "src/util/data.json", "zeta/z.py"]:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel_path)
+    return str(tmp_path)
+
+
+def test_iter_directory_depth_and_order(tmp_path):
+    root = make_tree(tmp_path)
+    assert [row[0] for row in iter_directory(root)] == ["a.py", "b.txt", "src", "zeta"]
+    rows = list(iter_directory(root, depth=3))
+    assert [row[0] for row in rows] == [
+        "a.py", "b.txt", "src", "src/main.py", "src/util", "src/util/data.json",
+        "src/util/helpers.py", "zeta", "zeta/z.py",
+    ]
+    assert rows[0] == ("a.py", False, 4)
+    assert rows[2] == ("src", True, None)
+
+
+def test_iter_directory_filters(tmp_path):
+    root = make_tree(tmp_path)
+    assert [row[0] for row in iter_directory(root, depth=3, include="*.py", exclude=["util"])] == \
+        ["a.py", "src/main.py", "zeta/z.py"]
+    rules = IgnoreRules(root, ["zeta/", "*.json"])
+    assert [row[0] for row in iter_directory(root, depth=3, include="*.py, *.json", rules=rules)] == \
+        ["a.py", "src/main.py", "src/util/helpers.py"]
+
+
+def test_pages_resume_from_the_cursor(tmp_path):
+    root = make_tree(tmp_path)
+    everything = [row[0] for row in iter_directory(root, depth=3)]
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = list_directory_page(root, depth=3, cursor=cursor, limit=2)
+        seen.extend(row[0] for row in rows)
+        if cursor is None:
+            break
+        assert len(rows) == 2
+    assert seen == everything
+
+
+def test_format_directory_listing():
+    rows = [("src", True, None), ("src/main.py", False, 12)]
+    assert format_directory_listing(".", rows, "src/main.py").splitlines() == [
+        "# .: type<TAB>size<TAB>path (d=directory, f=file, size in bytes)",
+        "d\t-\tsrc/",
+        "f\t12\tsrc/main.py",
+        '# more entries follow; call again with cursor="src/main.py"',
+    ]
+    assert format_directory_listing(".", rows, None).endswith("# 2 entries")
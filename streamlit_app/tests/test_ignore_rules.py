@@ -0,0 +1,101 @@
+import os
+
+from ignore_rules import IgnoreRules, get_ignore_rules, walk_files
+
+
+def rules(*patterns):
+    return IgnoreRules("/project", patterns)
+
+
+def test_unanchored_pattern_matches_at_any_depth():
+    r = rules("*.log")
+    assert r.match("debug.log")
+    assert r.match("a/b/debug.log")
+    assert not r.match("debug.txt")
+
+
+def test_anchored_pattern():
+    r = rules("/build", "docs/*.md")
+    assert r.match("build", True)
+    assert not r.match("src/build", True)
+    assert r.match("docs/a.md")
+    assert not r.match("docs/sub/a.md")
+
+
+def test_directory_only_pattern():
+    r = rules("out/")
+    assert r.match("out", True)
+    assert not r.match("out", False)
+
+
+def test_double_star():
+    r = rules("**/gen/*.py", "logs/**")
+    assert r.match("gen/a.py")
+    assert r.match("x/y/gen/a.py")
+    assert r.match("logs/a/b.txt")
+    assert not r.match("logs", True)
+
+
+def test_last_matching_rule_wins():
+    r = rules("*.py", "!keep.py")
+    assert r.match("a.py")
+    assert not r.match("keep.py")
+    assert rules("!keep.py", "*.py").match("keep.py")
+
+
+def test_character_class_and_escapes():
+    r = rules("file[0-9].txt", "\\#notes", "\\!bang")
+    assert r.match("file3.txt")
+    assert not r.match("filex.txt")
+    assert r.match("#notes")
+    assert r.match("!bang")
+
+
+def test_comments_and_blank_lines():
+    r = rules("# comment", "", "   ")
+    assert not r.match("# comment")
+
+
+def test_malformed_pattern_is_skipped(tmp_path):
+    r = rules("*.log", "[z-a]", "!keep.log", "[")
+    assert r.match("debug.log")
+    assert not r.match("keep.log")
+    assert not r.match("z")
+    # "[" without a closing bracket is a literal
+    assert r.match("[")
+
+    (tmp_path / ".gitignore").write_text("[z-a]\n*.tmp\n")
+    assert get_ignore_rules(str(tmp_path)).match("a.tmp")
+
+
+def test_is_ignored_checks_parent_directories():
+    r = rules("vendor/")
+    assert r.is_ignored("vendor/lib/a.py", False)
+    assert not r.is_ignored("src/a.py", False)
+    assert not r.is_ignored("/elsewhere/a.py", False)
+
+
+def test_defaults_can_be_negated(tmp_path):
+    (tmp_path / ".gitignore").write_text("!node_modules/\nbuild/\n")
+    loaded = get_ignore_rules(str(tmp_path))
+    assert not loaded.match("node_modules", True)
+    assert loaded.match(".git", True)
+    assert loaded.match("build", True)
+
+
+def test_walk_files_prunes_ignored_and_hidden(tmp_path):
+    for rel_path in ("src/a.py", "build/b.py", ".hidden/c.py", ".env", "node_modules/m.js"):
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    (tmp_path / ".gitignore").write_text("build/\n")
+    loaded = get_ignore_rules(str(tmp_path))
+
+    def walked(**kwargs):
+        return sorted(
+            os.path.relpath(path, tmp_path).replace(os.sep, "/")
+            for path in walk_files(str(tmp_path), loaded, **kwargs)
+        )
+
+    assert walked() == [".env", ".gitignore", ".hidden/c.py", "src/a.py"]
+    assert walked(hidden=False) == ["src/a.py"]
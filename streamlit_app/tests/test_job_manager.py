@@ -0,0 +1,79 @@
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+from job_manager import JobManager, format_job
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses POSIX shell commands")
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(str(tmp_path / "logs"))
+    yield manager
+    manager.shutdown()
+
+
+def test_job_runs_detached_and_logs_its_output(manager, tmp_path):
+    job = manager.start("echo out; echo err >&2; exit 4", str(tmp_path))
+    assert manager.get(str(job.id)) is job
+    assert manager.get("nope") is None
+    wait_until(lambda: not job.running)
+    assert [j.status for j in manager.jobs()] == ["exited with code 4"]
+    assert job.ended is not None
+    assert sorted(manager.tail(job.id).splitlines()) == ["err", "out"]
+    assert format_job(job).startswith(f"[{job.id}] exited with code 4 after 0s (pid ")
+
+
+def test_tail_starts_at_a_line_boundary(manager, tmp_path):
+    job = manager.start("seq 1 1000", str(tmp_path))
+    wait_until(lambda: not job.running)
+    tail = manager.tail(job.id, max_bytes=20)
+    assert tail.splitlines() == [str(n) for n in range(997, 1001)]
+    assert manager.tail(99) is None
+
+
+def test_stop_kills_the_process_group(manager, tmp_path):
+    marker = tmp_path / "survived"
+    job = manager.start(f"(sleep 1; touch {marker}) & sleep 30", str(tmp_path))
+    assert manager.stop(job.id, force=True)
+    assert job.status.startswith("killed by signal")
+    assert not manager.stop(job.id)
+    time.sleep(1.5)
+    assert not marker.exists()
+
+
+def test_signal_reaches_the_job(manager, tmp_path):
+    job = manager.start("trap 'echo got int; exit 0' INT; sleep 30 & wait", str(tmp_path))
+    time.sleep(0.3)
+    assert manager.signal(job.id, signal.SIGINT)
+    wait_until(lambda: not job.running)
+    assert "got int" in manager.tail(job.id)
+
+
+def test_remove_only_finished_jobs(manager, tmp_path):
+    job = manager.start("sleep 30", str(tmp_path))
+    assert not manager.remove(job.id)
+    manager.stop(job.id, force=True)
+    assert manager.remove(job.id)
+    assert not os.path.exists(job.log_path)
+    assert manager.jobs() == []
+
+
+def test_shutdown_kills_jobs_and_deletes_the_logs(tmp_path):
+    manager = JobManager(str(tmp_path / "logs"))
+    job = manager.start("sleep 30", str(tmp_path))
+    manager.shutdown()
+    assert not job.running
+    assert not os.path.exists(manager.log_dir)
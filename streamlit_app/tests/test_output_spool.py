@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import output_spool
+from output_spool import OutputSpool
+
+
+@pytest.fixture
+def spool(tmp_path):
+    # The spool deletes its directory once collected, so tests hold on to it
+    return OutputSpool(str(tmp_path / "spool"))
+
+
+def spool_lines(spool, count, stream="stdout"):
+    output = spool.new(f"seq 1 {count}")
+    for number in range(1, count + 1):
+        output.write(stream, f"line {number}\n")
+    output.finish()
+    return output
+
+
+def test_small_output_is_previewed_whole(spool):
+    output = spool_lines(spool, 3)
+    assert output.preview("stdout") == ("line 1\nline 2\nline 3\n", False)
+    assert output.preview("stderr") == ("", False)
+
+
+def test_large_output_preview_keeps_whole_lines_and_says_so(spool, monkeypatch):
+    monkeypatch.setattr(output_spool, "HEAD_BYTES", 20)
+    monkeypatch.setattr(output_spool, "TAIL_BYTES", 30)
+    output = spool_lines(spool, 100)
+    text, truncated = output.preview("stdout")
+    assert truncated
+    lines = text.splitlines()
+    assert lines[:2] == ["line 1", "line 2"]
+    assert lines[-3:] == ["line 98", "line 99", "line 100"]
+    assert f"{output.size('stdout')} bytes in total" in lines[2]
+
+
+def test_output_mentioning_omitted_bytes_is_not_taken_for_a_preview(spool):
+    output = spool.new("cat log")
+    output.write("stdout", "[... 10 bytes omitted; 20 bytes in total ...]\n")
+    output.finish()
+    assert not output.preview("stdout")[1]
+
+
+def test_pages_are_line_aligned_and_cover_everything(spool):
+    output = spool_lines(spool, 1000)
+    pages = [output.page("stdout", number, page_bytes=100) for number in range(output.page_count("stdout", 100))]
+    assert "".join(pages) == "".join(f"line {number}\n" for number in range(1, 1001))
+    assert all(page.endswith("\n") for page in pages)
+    assert output.page("stderr", 0) == ""
+
+
+def test_search_reports_the_page_of_each_hit(spool):
+    output = spool_lines(spool, 1000)
+    hits = output.search("stdout", "line 99", page_bytes=100)
+    assert [text for _, text in hits][:2] == ["line 99", "line 990"]
+    for page, text in hits:
+        assert text + "\n" in output.page("stdout", page, page_bytes=100)
+    assert len(output.search("stdout", "line", max_hits=5)) == 5
+
+
+def test_live_tail_is_bounded(spool, monkeypatch):
+    monkeypatch.setattr(output_spool.SpooledOutput, "LIVE_CHARS", 10)
+    output = spool.new("x")
+    output.write("stdout", "abcdefghij")
+    output.write("stderr", "KLM")
+    assert output.live_tail == "defghijKLM"
+    output.finish()
+
+
+def test_oldest_finished_outputs_are_trimmed(tmp_path):
+    spool = OutputSpool(str(tmp_path), max_outputs=2)
+    first = spool_lines(spool, 1)
+    running = spool.new("still running")
+    spool_lines(spool, 1)
+    spool_lines(spool, 1)
+    assert spool.get(first.id) is None
+    assert not os.path.exists(first.paths["stdout"])
+    assert spool.get(str(running.id)) is running
+    assert [output.id for output in spool.recent()][-1] == running.id
+    running.finish()
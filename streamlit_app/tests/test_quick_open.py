@@ -0,0 +1,86 @@
+import os
+import random
+
+import dir_cache
+from quick_open import PathIndex, get_path_index
+
+
+def make_tree(root, paths):
+    for rel_path in paths:
+        path = os.path.join(str(root), rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+    return str(root)
+
+
+def found(index, query, **kwargs):
+    return [match.path for match in index.search(query, **kwargs)]
+
+
+def test_base_name_and_prefix_matches_rank_first(tmp_path):
+    index = PathIndex(make_tree(tmp_path, [
+        "src/user/config.py", "src/usercfg.py", "docs/users.md", "lib/u/s/e/r.py",
+    ]))
+    assert found(index, "usercfg") == ["src/usercfg.py", "src/user/config.py"]
+    assert found(index, "user")[:2] == ["docs/users.md", "src/usercfg.py"]
+    assert found(index, "zzz") == []
+    match = index.search("ucfg")[0]
+    assert match.path == "src/usercfg.py"
+    assert [match.path[i] for i in match.positions] == list("ucfg")
+
+
+def test_recent_files_get_a_bonus_and_fill_an_empty_query(tmp_path):
+    root = make_tree(tmp_path, ["a/main.py", "b/main.py"])
+    index = PathIndex(root)
+    assert found(index, "main") == ["a/main.py", "b/main.py"]
+    recent = [os.path.join(root, "b", "main.py"), "gone.py", "a/main.py"]
+    assert found(index, "main", recent=recent) == ["b/main.py", "a/main.py"]
+    assert found(index, "", recent=recent) == ["b/main.py", "a/main.py"]
+
+
+def test_ignored_files_are_left_out(tmp_path):
+    root = make_tree(tmp_path, ["app.py", "build/app.py", "node_modules/x/app.py"])
+    (tmp_path / ".gitignore").write_text("build/\n")
+    assert found(PathIndex(root), "app") == ["app.py"]
+
+
+def test_typing_narrows_to_the_same_results_as_a_fresh_search(tmp_path, monkeypatch):
+    words = ["src", "lib", "test", "utils", "api", "models", "views", "auth", "user", "admin"]
+    rng = random.Random(7)
+    paths = {
+        "/".join(rng.choice(words) for _ in range(rng.randint(1, 3))) + f"/{rng.choice(words)}_{rng.choice(words)}.py"
+        for _ in range(400)
+    }
+    root = make_tree(tmp_path, paths)
+    # A small cap makes short queries stop early, so narrowing starts from a partial scan
+    monkeypatch.setattr(PathIndex, "MAX_SCORED", 20)
+    typed = PathIndex(root)
+    for word in ("usradmin.py", "apiauth", "models/user", "tstvw"):
+        for length in range(1, len(word) + 1):
+            fresh = PathIndex(root)
+            fresh._last = None
+            expected = [(m.path, m.score) for m in fresh.search(word[:length], limit=50)]
+            assert [(m.path, m.score) for m in typed.search(word[:length], limit=50)] == expected, word[:length]
+
+
+def test_matches_are_exhaustive_below_the_cap(tmp_path):
+    paths = [f"pkg{n}/module_{n}.py" for n in range(50)]
+    index = PathIndex(make_tree(tmp_path, paths))
+    index.search("m")
+    assert sorted(found(index, "mod", limit=100)) == sorted(paths)
+
+
+def test_ide_changes_reach_the_index(tmp_path):
+    root = make_tree(tmp_path, ["a/x.py"])
+    index = get_path_index(root)
+    assert found(index, "x.py") == ["a/x.py"]
+
+    make_tree(tmp_path, ["a/newfile.py"])
+    dir_cache.invalidate_path(os.path.join(root, "a", "newfile.py"))
+    assert found(index, "newfile") == ["a/newfile.py"]
+
+    os.rename(os.path.join(root, "a"), os.path.join(root, "b"))
+    dir_cache.invalidate_path(os.path.join(root, "a"))
+    dir_cache.invalidate_path(os.path.join(root, "b"))
+    assert found(index, "py") == ["b/x.py", "b/newfile.py"]
+    assert len(index) == 2
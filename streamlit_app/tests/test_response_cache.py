@@ -0,0 +1,94 @@
+import os
+
+import dir_cache
+from context_assembler import ContextAssembler
+from response_cache import TREE_DEPENDENCY, ResponseCache, normalize_prompt
+
+
+def make_project(tmp_path):
+    project = tmp_path / "project"
+    (project / "src").mkdir(parents=True)
+    (project / "src" / "app.py").write_text("print('hi')\n")
+    (project / "README.md").write_text("readme\n")
+    return str(project)
+
+
+def test_prompts_differing_only_in_case_and_spacing_share_a_key(tmp_path):
+    project = make_project(tmp_path)
+    cache = ResponseCache(tmp_path / "cache")
+    assert normalize_prompt("  What  does\nIT do? ") == "what does it do?"
+    assert cache.make_key("m", "What does it do?", project) == \
+        cache.make_key("m", "  what DOES it   do? ", project)
+    assert cache.make_key("m", "hi", project) != cache.make_key("other", "hi", project)
+
+
+def test_key_includes_the_project_path(tmp_path):
+    first = make_project(tmp_path / "a")
+    second = make_project(tmp_path / "b")
+    cache = ResponseCache(tmp_path / "cache")
+    assert cache.make_key("m", "explain the build", first) != \
+        cache.make_key("m", "explain the build", second)
+    assert cache.make_key("m", "explain the build", first) == \
+        cache.make_key("m", "explain the build", first + os.sep + "src" + os.sep + "..")
+
+
+def test_key_changes_when_a_mentioned_file_changes(tmp_path):
+    project = make_project(tmp_path)
+    cache = ResponseCache(tmp_path / "cache")
+    known = ["src/app.py", "README.md"]
+    assert cache.referenced_files("what is in app.py and src/app.py?", project, known) == ["src/app.py"]
+
+    before = cache.make_key("m", "explain app.py", project, known)
+    with open(os.path.join(project, "src", "app.py"), "a") as f:
+        f.write("print('more')\n")
+    assert cache.make_key("m", "explain app.py", project, known) != before
+
+
+def test_entries_expire_with_their_dependencies(tmp_path):
+    project = make_project(tmp_path)
+    cache = ResponseCache(tmp_path / "cache")
+    messages = [{"role": "assistant", "content": "It prints hi."}]
+    cache.put("read", messages, project, ["src/app.py"])
+    cache.put("tree", messages, project, [TREE_DEPENDENCY])
+    assert cache.get("read", project) == messages
+    assert cache.get("tree", project) == messages
+
+    dir_cache.note_tree_changed()
+    assert cache.get("tree", project) is None
+    assert cache.get("read", project) == messages
+
+    with open(os.path.join(project, "src", "app.py"), "a") as f:
+        f.write("print('more')\n")
+    assert cache.get("read", project) is None
+    assert cache.stats()["hits"] == 3
+
+
+def test_entries_survive_on_disk_and_are_trimmed(tmp_path):
+    project = make_project(tmp_path)
+    cache = ResponseCache(tmp_path / "cache", max_memory_entries=1)
+    messages = [{"role": "assistant", "content": "x" * 100}]
+    cache.put("one", messages, project)
+    cache.put("two", messages, project)
+    assert cache.get("one", project) == messages
+    assert ResponseCache(tmp_path / "cache").get("two", project) == messages
+
+    small = ResponseCache(tmp_path / "small", max_disk_bytes=300)
+    for key in ("a", "b", "c"):
+        small.put(key, messages, project)
+    assert sorted(os.listdir(tmp_path / "small")) == ["c.json"]
+
+
+def test_cache_key_walk_shares_the_assemblers_snapshots(tmp_path):
+    project = make_project(tmp_path)
+    (tmp_path / "project" / "node_modules" / "pkg").mkdir(parents=True)
+    (tmp_path / "project" / "node_modules" / "pkg" / "index.js").write_text("")
+    # Old enough for the directory cache to trust the listings
+    for path, _, _ in os.walk(project):
+        os.utime(path, ns=(0, 10**18))
+    assembler = ContextAssembler()
+    assembler.assemble(project, 2000)
+    misses = assembler.structure_cache.misses
+
+    files = assembler.project_files(project)
+    assert sorted(files) == ["README.md", "src/app.py"]
+    assert assembler.structure_cache.misses == misses
@@ -0,0 +1,111 @@
+import os
+import threading
+
+import dir_cache
+from search_index import TrigramIndex, format_search_results, required_literals
+
+
+def make_project(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("def main():\n    print('hello world')\n")
+    (tmp_path / "notes.txt").write_text("nothing to see\n")
+    return str(tmp_path)
+
+
+def test_background_refresh_builds_off_the_calling_thread(tmp_path, monkeypatch):
+    index = TrigramIndex(make_project(tmp_path))
+    release = threading.Event()
+    scanning = []
+    rescan = index._rescan
+
+    def slow_rescan(initial=False):
+        scanning.append(threading.current_thread())
+        release.wait(5)
+        rescan(initial)
+
+    monkeypatch.setattr(index, "_rescan", slow_rescan)
+    index.refresh(background=True)
+    assert scanning and scanning[0] is not threading.current_thread()
+    # A second request while the first build runs starts nothing new
+    index.refresh(background=True)
+    assert len(scanning) == 1
+
+    release.set()
+    monkeypatch.setattr(index, "_rescan", rescan)
+    # A search waits for the build in progress rather than scanning alongside it
+    matches, _ = index.search("hello")
+    assert [(match.path, match.line_number) for match in matches] == [("src/app.py", 2)]
+    assert index.stats()["files"] == 2
+
+
+def test_required_literals():
+    assert required_literals("def main") == ["def main"]
+    assert required_literals(r"foo\.bar\(") == ["foo.bar("]
+    assert required_literals("abcd?efgh") == ["abc", "efgh"]
+    assert required_literals("read_(file|dir)") == []
+    assert required_literals("class [A-Z]\\w+Index") == ["class ", "Index"]
+    assert required_literals("x{2,3}yz") == []
+
+
+def test_literal_and_regex_search(tmp_path):
+    index = TrigramIndex(make_project(tmp_path))
+    matches, candidates = index.search("HELLO")
+    assert [match.path for match in matches] == ["src/app.py"]
+    assert candidates == 1
+    assert index.search("HELLO", case_sensitive=True)[0] == []
+
+    matches, _ = index.search(r"def \w+\(\)", regex=True)
+    assert [(match.line_number, match.line) for match in matches] == [(1, "def main():")]
+    assert matches[0].after == ["    print('hello world')"]
+    assert index.search("zzzz")[1] == 0
+
+
+def test_include_and_exclude(tmp_path):
+    index = TrigramIndex(make_project(tmp_path))
+    assert [m.path for m in index.search("o", include="*.txt")[0]] == ["notes.txt"]
+    assert [m.path for m in index.search("o", exclude=["src/*"])[0]] == ["notes.txt"]
+
+
+def test_saved_and_external_edits_are_picked_up(tmp_path, monkeypatch):
+    root = make_project(tmp_path)
+    index = TrigramIndex(root)
+    index.refresh()
+
+    (tmp_path / "notes.txt").write_text("a needle here\n")
+    index.update_file(os.path.join(root, "notes.txt"))
+    assert [m.path for m in index.search("needle")[0]] == ["notes.txt"]
+
+    # Changed behind the index's back: a candidate is reindexed before it is searched
+    (tmp_path / "notes.txt").write_text("no more\n")
+    assert index.search("needle")[0] == []
+
+    # A rescan finds new files and reports the change to tree-wide caches
+    (tmp_path / "new.py").write_text("needle = 1\n")
+    monkeypatch.setattr(TrigramIndex, "RESCAN_INTERVAL", 0.0)
+    generation = dir_cache.change_generation()
+    index.refresh(wait=True)
+    assert [m.path for m in index.search("needle")[0]] == ["new.py"]
+    assert dir_cache.change_generation() > generation
+
+
+def test_dead_ids_are_compacted(tmp_path):
+    root = make_project(tmp_path)
+    index = TrigramIndex(root)
+    index.refresh()
+    for number in range(1100):
+        (tmp_path / "notes.txt").write_text(f"version {number}\n")
+        index.update_file("notes.txt")
+    assert index._dead < 1000
+    assert [m.line for m in index.search("version")[0]] == ["version 1099"]
+    assert index.stats()["files"] == 2
+
+
+def test_format_search_results(tmp_path):
+    index = TrigramIndex(make_project(tmp_path))
+    matches, candidates = index.search("print")
+    assert format_search_results("print", matches, candidates).splitlines() == [
+        "1 matches for 'print':",
+        "src/app.py-1-def main():",
+        "src/app.py:2:    print('hello world')",
+    ]
+    assert format_search_results("x", [], 3) == "No matches for 'x' (3 candidate files searched)."
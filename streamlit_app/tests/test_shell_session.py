@@ -0,0 +1,47 @@
+import pytest
+
+from shell_session import PEXPECT_AVAILABLE, ShellSession
+
+pytestmark = pytest.mark.skipif(not PEXPECT_AVAILABLE, reason="needs pexpect and a POSIX pty")
+
+
+@pytest.fixture
+def session(tmp_path):
+    shell = ShellSession(str(tmp_path))
+    yield shell
+    shell.close()
+
+
+def test_state_carries_over_between_commands(session, tmp_path):
+    (tmp_path / "sub").mkdir()
+    session.run("cd sub; export GREETING=hi; f() { echo fn; }", timeout=10)
+    stdout, _, returncode, _ = session.run('echo "$GREETING" "$(basename "$PWD")"; f', timeout=10)
+    assert stdout == "hi sub\nfn\n"
+    assert returncode == 0
+    assert session.cwd == str(tmp_path / "sub")
+
+
+def test_stderr_and_exit_code(session):
+    stdout, stderr, returncode, timed_out = session.run("echo out; echo err >&2; (exit 3)", timeout=10)
+    assert (stdout, stderr, returncode, timed_out) == ("out\n", "err\n", 3, False)
+
+
+def test_unbalanced_quote_is_a_syntax_error(session):
+    _, stderr, returncode, timed_out = session.run('echo "foo', timeout=10)
+    assert returncode == 2
+    assert not timed_out
+    assert "unexpected EOF" in stderr or "Syntax error" in stderr
+    assert session.run("echo still alive", timeout=10)[0] == "still alive\n"
+
+
+def test_braces_in_the_command(session):
+    assert session.run('echo "}"; echo {a,b}', timeout=10)[0] == "}\na b\n"
+
+
+def test_timeout_resets_the_shell(session, tmp_path):
+    session.run("export KEPT=1", timeout=10)
+    _, _, _, timed_out = session.run("sleep 30", timeout=0.5)
+    assert timed_out
+    assert not session.alive
+    stdout, _, returncode, _ = session.run('echo "$KEPT"', timeout=10)
+    assert (stdout, returncode) == ("1\n", 0)
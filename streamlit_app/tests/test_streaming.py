@@ -0,0 +1,75 @@
+from streaming import StreamingReply, cancel_stream, iter_chunk_text
+
+
+class Chunk:
+    def __init__(self, text=None, error=None):
+        self._text = text
+        self._error = error
+
+    @property
+    def text(self):
+        if self._error is not None:
+            raise self._error
+        return self._text
+
+
+def test_reply_accumulates_chunks_and_times_them():
+    reply = StreamingReply()
+    assert reply.metrics()["time_to_first_token"] is None
+    reply.add("")
+    assert reply.first_token_at is None
+    reply.add("Hello, ")
+    reply.add("world")
+    reply.finish()
+    assert reply.text == "Hello, world"
+    assert not reply.stopped
+
+    metrics = reply.metrics()
+    assert metrics["tokens"] > 0
+    assert 0 <= metrics["time_to_first_token"] <= metrics["total_time"]
+
+
+def test_stopped_reply_keeps_its_text_and_first_finish_wins():
+    reply = StreamingReply()
+    reply.add("partial")
+    reply.finish(stopped=True)
+    finished_at = reply.finished_at
+    reply.finish()
+    assert reply.stopped
+    assert reply.finished_at == finished_at
+    assert reply.text == "partial"
+
+
+def test_chunks_without_text_are_skipped():
+    chunks = [Chunk("a"), Chunk(error=ValueError("blocked")), Chunk(""), Chunk(error=IndexError()), Chunk("b")]
+    assert list(iter_chunk_text(chunks)) == ["a", "b"]
+
+
+def test_cancel_prefers_the_underlying_iterator():
+    calls = []
+
+    class Iterator:
+        def cancel(self):
+            calls.append("iterator")
+
+    class Response:
+        _iterator = Iterator()
+
+        def cancel(self):
+            calls.append("response")
+
+    cancel_stream(Response())
+    assert calls == ["iterator"]
+
+
+def test_cancel_falls_back_to_the_response_and_swallows_errors():
+    calls = []
+
+    class Response:
+        def cancel(self):
+            calls.append("response")
+            raise RuntimeError("already closed")
+
+    cancel_stream(Response())
+    cancel_stream(object())
+    assert calls == ["response"]
@@ -0,0 +1,118 @@
+import os
+
+from symbol_index import SymbolIndex, format_references, format_symbols, parse_symbols
+
+SOURCE = '''import os.path
+from util import helper as assist
+
+LIMIT = 3
+
+
+class Store(Base):
+    kind = "store"
+
+    def save(self, item):
+        assist(item)
+        os.path.join("a", "b")
+
+    async def load(self):
+        def inner():
+            pass
+        return self.save(None)
+
+
+def main():
+    local = Store()
+    local.save(1)
+'''
+
+
+def make_index(tmp_path, source=SOURCE):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "app.py").write_text(source)
+    (root / "notes.txt").write_text("class NotPython: pass\n")
+    return SymbolIndex(str(root), tmp_path / "symbols.json")
+
+
+def test_parse_symbols():
+    defs, imports, calls = parse_symbols(SOURCE)
+    assert [(qualname, kind, line) for qualname, kind, line, _ in defs] == [
+        ("LIMIT", "variable", 4),
+        ("Store", "class", 7),
+        ("Store.kind", "variable", 8),
+        ("Store.save", "method", 10),
+        ("Store.load", "method", 14),
+        ("Store.load.inner", "function", 15),
+        ("main", "function", 20),
+    ]
+    assert defs[1][3] == "class Store(Base)"
+    assert imports == [["os", "os.path", 1], ["assist", "util.helper", 2]]
+    assert ["assist", 11, "assist"] in calls
+    assert ["join", 12, "os.path.join"] in calls
+    assert ["save", 22, "local.save"] in calls
+
+
+def test_find_symbol(tmp_path):
+    index = make_index(tmp_path)
+    assert [entry[:4] for entry in index.find_symbol("save")] == [("app.py", 10, "method", "Store.save")]
+    assert index.find_symbol("Store.save") == index.find_symbol("save")
+    assert index.find_symbol("Other.save") == []
+    # No exact match falls back to a case-insensitive substring search
+    assert [entry[3] for entry in index.find_symbol("LOA")] == ["Store.load", "Store.load.inner"]
+    assert index.stats() == {"files": 1, "definitions": 7}
+
+
+def test_find_references(tmp_path):
+    index = make_index(tmp_path)
+    assert [(line, kind) for _, line, kind, _ in index.find_references("save")] == [(17, "call"), (22, "call")]
+    # An aliased import is found under both names
+    assert index.find_references("helper") == index.find_references("assist")[:1]
+    text = format_references(index.root, "save", index.find_references("save"))
+    assert text.splitlines()[1] == "app.py:17: [call] return self.save(None)"
+
+
+def test_only_changed_files_are_parsed_again(tmp_path, monkeypatch):
+    index = make_index(tmp_path)
+    index.refresh(force=True)
+    path = os.path.join(index.root, "app.py")
+
+    parsed = []
+    import symbol_index
+    real_parse = symbol_index.parse_symbols
+    monkeypatch.setattr(symbol_index, "parse_symbols", lambda source: parsed.append(1) or real_parse(source))
+
+    # Touched without changing: hashed again but not parsed
+    os.utime(path, ns=(0, 10**18))
+    index.refresh(force=True)
+    assert parsed == []
+
+    with open(path, "a") as f:
+        f.write("\ndef extra():\n    pass\n")
+    index.update_file(path)
+    assert parsed == [1]
+    assert index.find_symbol("extra")[0][:2] == ("app.py", 24)
+
+
+def test_a_file_mid_edit_keeps_its_last_symbols(tmp_path):
+    index = make_index(tmp_path)
+    index.refresh(force=True)
+    with open(os.path.join(index.root, "app.py"), "a") as f:
+        f.write("\ndef broken(:\n")
+    index.update_file("app.py")
+    assert index.find_symbol("main")
+
+
+def test_index_is_reloaded_from_disk(tmp_path):
+    index = make_index(tmp_path)
+    index.refresh(force=True)
+    reloaded = SymbolIndex(index.root, tmp_path / "symbols.json")
+    assert reloaded.stats() == index.stats()
+    # A store written for another root is ignored
+    assert SymbolIndex(str(tmp_path), tmp_path / "symbols.json").stats()["files"] == 0
+
+
+def test_format_symbols():
+    assert format_symbols("x", []) == "No definition of 'x' found in the project's Python files."
+    assert format_symbols("main", [("app.py", 20, "function", "main", "def main()")]) == \
+        "Definitions of 'main':\napp.py:20: function main: def main()"
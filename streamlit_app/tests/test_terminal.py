@@ -0,0 +1,31 @@
+import sys
+
+import pytest
+
+import terminal
+from fake_streamlit import FakeStreamlit
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses POSIX shell commands")
+
+
+@pytest.fixture
+def term(tmp_path, monkeypatch):
+    monkeypatch.setattr(terminal, "st", FakeStreamlit())
+    term = terminal.Terminal(str(tmp_path))
+    yield term
+    term.jobs.shutdown()
+
+
+def test_long_output_is_reported_as_truncated(term):
+    stdout, _, returncode = term.execute_command("seq 1 20000", timeout=30, live=False)
+    assert returncode == 0
+    assert term.last_truncated
+    assert stdout.startswith("1\n2\n")
+    assert stdout.endswith("19999\n20000\n")
+    assert term.last_output.size("stdout") == len("".join(f"{n}\n" for n in range(1, 20001)))
+
+
+def test_output_that_looks_like_a_preview_is_not_truncated(term):
+    stdout, _, _ = term.execute_command("echo '[... 5 bytes omitted; 9 bytes in total ...]'", timeout=30, live=False)
+    assert "bytes omitted;" in stdout
+    assert not term.last_truncated
@@ -0,0 +1,53 @@
+from terminal_buffer import TerminalBuffer, ansi_to_html, collapse_carriage_returns
+
+
+def test_plain_text_is_escaped():
+    assert ansi_to_html("<b> & </b>") == "&lt;b&gt; &amp; &lt;/b&gt;"
+
+
+def test_colour_and_reset():
+    assert ansi_to_html("\x1b[31mred\x1b[0m plain") == '<span style="color:#cd3131">red</span> plain'
+
+
+def test_bold_bright_and_background():
+    assert ansi_to_html("\x1b[1;92;44mx") == \
+        '<span style="color:#23d18b;background-color:#2472c8;font-weight:bold">x</span>'
+
+
+def test_other_escapes_are_dropped():
+    assert ansi_to_html("\x1b[2K\x1b]0;title\x07done\x1b[?25h") == "done"
+
+
+def test_extended_colours_are_skipped_without_eating_later_codes():
+    assert ansi_to_html("\x1b[38;5;196;1mx") == '<span style="font-weight:bold">x</span>'
+    assert ansi_to_html("\x1b[38;2;1;2;3;31mx") == '<span style="color:#cd3131">x</span>'
+
+
+def test_carriage_returns_keep_what_stays_visible():
+    assert collapse_carriage_returns("10%\r50%\r100%\ndone") == "100%\ndone"
+    assert collapse_carriage_returns("abcdef\rXY") == "XYcdef"
+    assert collapse_carriage_returns("a\r\nb") == "a\nb"
+
+
+def test_buffer_drops_oldest_chunks_past_its_bounds():
+    buffer = TerminalBuffer(max_bytes=1000, max_lines=3)
+    for number in range(5):
+        buffer.append(f"line {number}")
+    assert len(buffer) == 3
+    assert "line 0" not in buffer.html()
+    assert "line 4" in buffer.html()
+
+
+def test_oversized_chunk_keeps_its_tail():
+    buffer = TerminalBuffer(max_bytes=10)
+    buffer.append("0123456789abcdef")
+    assert "abcdef" in buffer.html()
+    assert "6 earlier bytes not shown" in buffer.html()
+
+
+def test_kinds_are_styled():
+    buffer = TerminalBuffer()
+    buffer.append("$ ls", kind="prompt")
+    buffer.append("oops", kind="error")
+    assert '<span class="terminal-prompt">$ ls</span>' in buffer.html()
+    assert '<span class="terminal-error">oops</span>' in buffer.html()
@@ -0,0 +1,69 @@
+import json
+
+from tool_parser import IncrementalToolCallParser, parse_tool_calls
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalToolCallParser()
+    calls = []
+    for start in range(0, len(text), size):
+        calls.extend(parser.feed(text[start:start + size]))
+    return calls, parser
+
+
+def call_block(call, tag="function_call"):
+    return f"```{tag}\n{json.dumps(call)}\n```"
+
+
+def test_complete_reply():
+    call = {"name": "read_file", "args": {"path": "app.py"}}
+    calls, errors = parse_tool_calls(f"Let me look.\n\n{call_block(call)}\n\nDone.")
+    assert calls == [call]
+    assert errors == []
+
+
+def test_every_chunk_size_gives_the_same_calls():
+    first = {"name": "read_file", "args": {"path": "a.py"}}
+    second = {"name": "search_files", "args": {"query": "x"}}
+    text = f"one {call_block(first)} two {call_block(second, 'json')} end"
+    for size in range(1, 12):
+        calls, _ = feed_in_chunks(text, size)
+        assert calls == [first, second], size
+
+
+def test_call_is_returned_when_its_closing_fence_arrives():
+    parser = IncrementalToolCallParser()
+    text = call_block({"name": "list_directory", "args": {}})
+    assert parser.feed(text[:-3]) == []
+    assert parser.feed(text[-3:]) == [{"name": "list_directory", "args": {}}]
+
+
+def test_braces_backticks_and_escapes_inside_strings():
+    content = 'def f():\n    return {"a": "}"}\n```\nprint("\\"quoted\\" {")'
+    call = {"name": "write_file", "args": {"path": "f.py", "content": content}}
+    for size in (1, 3, 7, 64):
+        calls, parser = feed_in_chunks(call_block(call), size)
+        assert calls == [call], size
+        assert parser.errors == []
+
+
+def test_nested_objects():
+    call = {"name": "apply_edit", "args": {"path": "x", "options": {"a": {"b": 1}}}}
+    assert parse_tool_calls(call_block(call))[0] == [call]
+
+
+def test_other_code_blocks_are_skipped():
+    text = (
+        "```python\nx = {'name': 'read_file'}\n```\n"
+        '```json\n[1, 2, 3]\n```\n'
+        + call_block({"name": "read_file", "args": {"path": "b"}})
+    )
+    for size in (1, 5, 1000):
+        calls, _ = feed_in_chunks(text, size)
+        assert calls == [{"name": "read_file", "args": {"path": "b"}}]
+
+
+def test_invalid_json_is_reported():
+    calls, errors = parse_tool_calls('```function_call\n{"name": "read_file", "args": {path}}\n```')
+    assert calls == []
+    assert errors == ['{"name": "read_file", "args": {path}}']
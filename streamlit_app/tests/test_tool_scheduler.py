@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+from tool_scheduler import ToolScheduler, paths_overlap
+
+
+def call(name, path=None, **extra):
+    return dict({"name": name, "path": path}, **extra)
+
+
+def make_scheduler(log, delay=0.05):
+    lock = threading.Lock()
+
+    def execute(tool_call):
+        with lock:
+            log.append(("start", tool_call["name"], tool_call["path"], threading.current_thread().name))
+        if tool_call["name"] == "read":
+            time.sleep(delay)
+        with lock:
+            log.append(("end", tool_call["name"], tool_call["path"]))
+        return {"call": tool_call["name"], "path": tool_call["path"]}
+
+    return ToolScheduler(
+        execute,
+        lambda tool_call: tool_call["name"] == "read",
+        lambda tool_call: None if tool_call["name"] == "run" else {tool_call["path"]},
+    )
+
+
+def test_paths_overlap():
+    assert paths_overlap({"a"}, {"a"})
+    assert paths_overlap({"."}, {"b"})
+    assert paths_overlap({"src"}, {os.path.join("src", "app.py")})
+    assert not paths_overlap({"src"}, {"srcs"})
+    assert not paths_overlap(set(), {"a"})
+    assert paths_overlap(None, set())
+
+
+def test_reads_overlap_and_results_keep_call_order():
+    log = []
+    scheduler = make_scheduler(log, delay=0.2)
+    calls = [call("read", "a"), call("read", "b"), call("read", "c")]
+    started = time.perf_counter()
+    try:
+        results = scheduler.run(calls)
+    finally:
+        scheduler.close()
+    assert time.perf_counter() - started < 0.5
+    assert [result["path"] for result in results] == ["a", "b", "c"]
+    assert all(result["elapsed"] >= 0.2 for result in results)
+
+
+def test_writes_wait_for_earlier_reads_of_the_same_path():
+    log = []
+    scheduler = make_scheduler(log)
+    calls = [call("read", "a"), call("write", "a"), call("write", "b"), call("read", "a")]
+    try:
+        scheduler.run(calls)
+    finally:
+        scheduler.close()
+    events = [entry[:3] for entry in log]
+    assert events.index(("end", "read", "a")) < events.index(("start", "write", "a"))
+    # The second read of a sees the write
+    assert events.index(("end", "write", "a")) < events.index(("start", "read", "a"), 1)
+    # Inline calls run on the calling thread
+    main = threading.current_thread().name
+    assert all(entry[3] == main for entry in log if entry[0] == "start" and entry[1] == "write")
+
+
+def test_commands_wait_for_everything_before_them():
+    log = []
+    scheduler = make_scheduler(log)
+    try:
+        scheduler.run([call("read", "a"), call("run"), call("read", "b")])
+    finally:
+        scheduler.close()
+    events = [entry[:3] for entry in log]
+    assert events.index(("end", "read", "a")) < events.index(("start", "run", None))
+    assert events.index(("end", "run", None)) < events.index(("start", "read", "b"))
+
+
+def test_offered_reads_start_early_and_are_not_run_twice():
+    log = []
+    scheduler = make_scheduler(log)
+    calls = [call("read", "a"), call("write", "b"), call("read", "c")]
+    try:
+        for tool_call in calls:
+            scheduler.offer(tool_call)
+        # Only the read before the write started while the reply streamed
+        time.sleep(0.01)
+        assert [entry[1:3] for entry in log if entry[0] == "start"] == [("read", "a")]
+        results = scheduler.run(calls)
+    finally:
+        scheduler.close()
+    assert [result["path"] for result in results] == ["a", "b", "c"]
+    assert len([entry for entry in log if entry[0] == "start"]) == 3
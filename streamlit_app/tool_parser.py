@@ -0,0 +1,169 @@
+import json
+import re
+
+FENCE = "```"
+TOOL_FENCE_TAGS = ("function_call", "json")
+
+# Characters that matter while scanning JSON, outside and inside strings
+_JSON_STRUCTURE = re.compile(r'[{}"]')
+_JSON_STRING_END = re.compile(r'["\\]')
+
+
+class IncrementalToolCallParser:
+    """Find ```function_call blocks in a model reply as it streams in.
+
+    feed() takes each chunk of text and returns the tool calls whose closing
+    fence has just arrived. Every character is examined once: brace depth is
+    tracked outside JSON strings only, so nested objects and backticks or
+    braces inside string values do not end a call early. Other fenced code
+    blocks are skipped whole, so their contents are never mistaken for calls.
+    Text is discarded once scanned, so only an open call is buffered.
+    """
+
+    _OUTSIDE, _FENCE_TAG, _BEFORE_JSON, _JSON, _JSON_STRING, _AFTER_JSON, _CODE = range(7)
+
+    def __init__(self):
+        # Unconsumed tail of the reply; text before it is no longer needed
+        self._buffer = ""
+        self.errors = []
+        self.calls = []
+        self._state = self._OUTSIDE
+        self._pos = 0
+        self._depth = 0
+        self._json_start = 0
+        self._json_end = 0
+
+    def feed(self, chunk):
+        """Consume a chunk of reply text and return any tool calls it completed."""
+        self._buffer += chunk
+        completed = []
+        text = self._buffer
+
+        while True:
+            state = self._state
+            if state == self._OUTSIDE:
+                index = text.find(FENCE, self._pos)
+                if index < 0:
+                    # Keep a possible partial fence at the end for the next chunk
+                    self._pos = max(self._pos, len(text) - len(FENCE) + 1)
+                    break
+                self._pos = index + len(FENCE)
+                self._state = self._FENCE_TAG
+
+            elif state == self._FENCE_TAG:
+                rest = text[self._pos:self._pos + len(TOOL_FENCE_TAGS[0]) + 1]
+                tag = next((t for t in TOOL_FENCE_TAGS if rest.startswith(t)), None)
+                if tag is None and any(t.startswith(rest) for t in TOOL_FENCE_TAGS) \
+                        and len(rest) <= len(TOOL_FENCE_TAGS[0]):
+                    # Not enough text yet to tell which kind of block this is
+                    break
+                if tag is None:
+                    self._state = self._CODE
+                else:
+                    self._pos += len(tag)
+                    self._state = self._BEFORE_JSON
+
+            elif state == self._BEFORE_JSON:
+                while self._pos < len(text) and text[self._pos].isspace():
+                    self._pos += 1
+                if self._pos >= len(text):
+                    break
+                if text[self._pos] == "{":
+                    self._json_start = self._pos
+                    self._depth = 1
+                    self._pos += 1
+                    self._state = self._JSON
+                else:
+                    # A json block that is not a call object, e.g. an array
+                    self._state = self._CODE
+
+            elif state == self._JSON:
+                match = _JSON_STRUCTURE.search(text, self._pos)
+                if match is None:
+                    self._pos = len(text)
+                    break
+                self._pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self._state = self._JSON_STRING
+                elif char == "{":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._json_end = self._pos
+                        self._state = self._AFTER_JSON
+
+            elif state == self._JSON_STRING:
+                match = _JSON_STRING_END.search(text, self._pos)
+                if match is None:
+                    self._pos = len(text)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(text):
+                        # The escaped character has not arrived yet
+                        self._pos = match.start()
+                        break
+                    self._pos = match.end() + 1
+                else:
+                    self._pos = match.end()
+                    self._state = self._JSON
+
+            elif state == self._AFTER_JSON:
+                while self._pos < len(text) and text[self._pos].isspace():
+                    self._pos += 1
+                if len(text) - self._pos < len(FENCE):
+                    if not FENCE.startswith(text[self._pos:]):
+                        self._state = self._CODE
+                        continue
+                    break
+                if text.startswith(FENCE, self._pos):
+                    self._pos += len(FENCE)
+                    self._state = self._OUTSIDE
+                    call = self._decode(text[self._json_start:self._json_end])
+                    if call is not None:
+                        completed.append(call)
+                else:
+                    # Trailing text after the object; treat it as an ordinary block
+                    self._state = self._CODE
+
+            elif state == self._CODE:
+                index = text.find(FENCE, self._pos)
+                if index < 0:
+                    self._pos = max(self._pos, len(text) - len(FENCE) + 1)
+                    break
+                self._pos = index + len(FENCE)
+                self._state = self._OUTSIDE
+
+        # Drop consumed text so the buffer never holds more than one open block
+        if self._state in (self._JSON, self._JSON_STRING, self._AFTER_JSON):
+            keep = self._json_start
+        else:
+            keep = self._pos
+        if keep:
+            self._buffer = text[keep:]
+            self._pos -= keep
+            self._json_start -= keep
+            self._json_end -= keep
+
+        self.calls.extend(completed)
+        return completed
+
+    def _decode(self, raw):
+        """Decode one call object, recording it in errors if it is not valid JSON."""
+        try:
+            call = json.loads(raw)
+        except json.JSONDecodeError:
+            self.errors.append(raw)
+            return None
+        if not isinstance(call, dict):
+            self.errors.append(raw)
+            return None
+        return call
+
+
+def parse_tool_calls(text):
+    """Return (calls, errors) for a complete reply."""
+    parser = IncrementalToolCallParser()
+    parser.feed(text)
+    return parser.calls, parser.errors
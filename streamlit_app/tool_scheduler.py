@@ -0,0 +1,113 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def paths_overlap(first, second):
+    """Return True if two sets of project paths can touch the same files.
+
+    None stands for "any path" (e.g. a shell command). Paths overlap when
+    they are equal or one is a directory containing the other.
+    """
+    if first is None or second is None:
+        return True
+    for a in first:
+        for b in second:
+            if a == b or a == "." or b == "." or \
+                    a.startswith(b + os.sep) or b.startswith(a + os.sep):
+                return True
+    return False
+
+
+class ToolScheduler:
+    """Run a batch of tool calls, overlapping the independent read-only ones.
+
+    Read-only calls run on a bounded thread pool. Every other call runs on
+    the calling thread (it may need the Streamlit script context), and only
+    after all earlier calls touching overlapping paths have finished; a
+    read-only call likewise waits for earlier writes to its paths. Results
+    come back in the original call order, each with its own timing.
+
+    execute(call) returns a result dict; is_read_only(call) and
+    touched_paths(call) classify a call (touched_paths may return None for
+    "anything").
+    """
+
+    def __init__(self, execute, is_read_only, touched_paths, max_workers=4):
+        self.execute = execute
+        self.is_read_only = is_read_only
+        self.touched_paths = touched_paths
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        # Calls seen while the reply was still streaming, and those started early
+        self._offered = []
+        self._prefetched = {}
+
+    def offer(self, call):
+        """Start a call parsed from a reply that is still arriving, if that is safe.
+
+        Only read-only calls preceded by nothing but read-only calls start
+        early; anything after a write or command waits for run().
+        """
+        index = len(self._offered)
+        self._offered.append(call)
+        if all(self.is_read_only(earlier) for earlier in self._offered):
+            self._prefetched[index] = self._pool.submit(self._timed, call)
+
+    def run(self, calls):
+        """Execute calls and return their results in order."""
+        read_only = [self.is_read_only(call) for call in calls]
+        paths = [self.touched_paths(call) for call in calls]
+        depends_on = []
+        for index in range(len(calls)):
+            depends_on.append({
+                earlier for earlier in range(index)
+                if not (read_only[index] and read_only[earlier])
+                and paths_overlap(paths[index], paths[earlier])
+            })
+
+        results = [None] * len(calls)
+        finished = set()
+        running = {}
+        pending = []
+        for index, call in enumerate(calls):
+            future = self._prefetched.get(index)
+            if future is not None and self._offered[index] == call:
+                running[future] = index
+            else:
+                pending.append(index)
+
+        while pending or running:
+            # Start every ready read-only call before doing any inline work
+            for index in [i for i in pending if read_only[i] and depends_on[i] <= finished]:
+                pending.remove(index)
+                running[self._pool.submit(self._timed, calls[index])] = index
+
+            inline = next(
+                (i for i in pending if not read_only[i] and depends_on[i] <= finished), None
+            )
+            if inline is not None:
+                pending.remove(inline)
+                results[inline] = self._timed(calls[inline])
+                finished.add(inline)
+
+            if running:
+                # Block only when nothing else can make progress
+                timeout = 0 if inline is not None else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    results[index] = future.result()
+                    finished.add(index)
+
+        return results
+
+    def close(self):
+        """Release the worker threads; calls already started run to completion."""
+        self._pool.shutdown(wait=False)
+
+    def _timed(self, call):
+        """Run one call and record how long it took."""
+        started = time.perf_counter()
+        result = self.execute(call)
+        result["elapsed"] = time.perf_counter() - started
+        return result